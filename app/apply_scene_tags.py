@@ -4,32 +4,95 @@
 Merge manually labeled consumer scene tags with restaurant-level topic assignments.
 This script reads the LDA topic file with human-labeled consumer scene metadata,
 and merges the labels back into the Michelin dataset.
+Restaurant tables are read and written through the Parquet artifact layer;
+the Excel copy of the result is optional.
+merge_manual_scene_labels() builds the Marketing Map's table the same way from
+the curated manual_scene_labels.csv.
+Topics are small integers, so the join is a lookup: SceneLookup indexes dense
+label arrays with each restaurant's dominant_topic, and both merges stream the
+restaurants through it in chunks, writing the output incrementally with
+constant memory.
+Labels are keyed by topic ID, which only means something for the model they
+were written for: a labels file with a top_words column is checked against
+the current model's top words before it is applied (required for the
+Marketing Map's labels).
+Load, merge and save are wrapped in instrumentation spans.
 """
 
 import os
+import numpy as np
 import pandas as pd
+from app.artifacts import ArtifactWriter, iter_artifact_batches, read_artifact, write_artifact
+from app.instrumentation import span
 
-def merge_scene_labels():
-    # Paths
-    PROCESSED_DIR = os.path.join("data", "processed")
-    topics_path = os.path.join(PROCESSED_DIR, "lda_topic_keywords.csv")
-    michelin_path = os.path.join(PROCESSED_DIR, "michelin_with_topics.xlsx")
-    output_path = os.path.join(PROCESSED_DIR, "michelin_with_scene.xlsx")
+# Curated labels used by the Marketing Map
+MANUAL_LABELS_PATH = os.path.join("data", "manual_scene_labels.csv")
+
+# Restaurants labelled per chunk when streaming
+SCENE_CHUNK_SIZE = 50_000
+
+# Columns copied from the labels onto each restaurant
+LABEL_COLUMNS = ["consumer_type", "consumer_scene"]
+
+def load_scene_labels(topics_path):
+    """
+    Load manually labeled topic info.
+
+    Args:
+        topics_path (str): CSV with topic_id, consumer_type and consumer_scene columns.
 
-    # Load manually labeled topic info
+    Returns:
+        pd.DataFrame: Labels with missing consumer_type filled from topic_id.
+    """
     topics_df = pd.read_csv(topics_path)
 
     # Check required columns
     if "consumer_type" not in topics_df.columns or "consumer_scene" not in topics_df.columns:
-        raise ValueError("Missing 'consumer_type' or 'consumer_scene' column in lda_topic_keywords.csv.")
+        raise ValueError(f"Missing 'consumer_type' or 'consumer_scene' column in {os.path.basename(topics_path)}.")
 
     # Fill missing consumer_type with topic_id as default
     topics_df["consumer_type"] = topics_df["consumer_type"].fillna(topics_df["topic_id"])
+    return topics_df
 
-    # Load restaurant-level topic assignments
-    michelin_df = pd.read_excel(michelin_path)
+def check_topic_words(labels, top_words, labels_path, model_name, required=False):
+    """
+    Check that labels were written for a model, by the top words they list per topic.
 
-    # Merge scene labels
+    Args:
+        labels (pd.DataFrame): Labels from load_scene_labels().
+        top_words (list): The model's top words per topic, as lists of strings.
+        labels_path (str): Where the labels came from (for messages).
+        model_name (str): The model (for messages), e.g. "topic model v0003".
+        required (bool): Fail when the labels have no top_words column to compare.
+
+    Raises:
+        ValueError: If the labels list other top words, or none when required.
+    """
+    if "top_words" not in labels.columns:
+        if required:
+            raise ValueError(
+                f"{labels_path} has no top_words column, so it cannot be checked against {model_name}; "
+                "copy each labelled topic's top_words from lda_topic_keywords.csv."
+            )
+        return
+    saved_words = [", ".join(words) for words in top_words]
+    if labels["top_words"].tolist() != saved_words:
+        raise ValueError(
+            f"{labels_path} was written for a different topic model than {model_name}; "
+            "its topic IDs would not match. Relabel the topics from lda_topic_keywords.csv."
+        )
+
+def attach_scene_labels(michelin_df, topics_df):
+    """
+    Add consumer_type and consumer_scene to restaurants by their dominant topic.
+
+    Args:
+        michelin_df (pd.DataFrame): Restaurants with a dominant_topic column.
+        topics_df (pd.DataFrame): Labels from load_scene_labels().
+
+    Returns:
+        pd.DataFrame: The restaurants with the scene columns added.
+    """
     merged_df = michelin_df.merge(
         topics_df[["topic_id", "consumer_type", "consumer_scene"]],
         left_on="dominant_topic",
@@ -39,10 +102,161 @@ def merge_scene_labels():
 
     # Drop redundant topic_id after merge
     merged_df.drop(columns=["topic_id"], inplace=True)
+    return merged_df
+
+class SceneLookup:
+    """
+    Topic -> label table for labelling restaurants by array indexing.
+
+    Gives the same columns and dtypes as attach_scene_labels(): restaurants
+    whose dominant_topic has no label (or is missing) get NaN.
+
+    Args:
+        topics_df (pd.DataFrame): Labels from load_scene_labels().
+
+    Raises:
+        ValueError: If a topic_id is listed more than once or is not a whole number.
+    """
+
+    def __init__(self, topics_df):
+        labels = topics_df.dropna(subset=["topic_id"]).reset_index(drop=True)
+        ids = labels["topic_id"].to_numpy(dtype=np.float64)
+        if len(np.unique(ids)) < len(ids):
+            raise ValueError("Each topic_id may only be labelled once.")
+        if not np.array_equal(ids, np.floor(ids)):
+            raise ValueError("topic_id values must be whole numbers.")
+
+        # Dense over [min id, max id]: position of each topic's label row, -1 where unlabelled
+        self.offset = int(ids.min()) if len(ids) else 0
+        self.positions = np.full(int(ids.max()) - self.offset + 1 if len(ids) else 0, -1, dtype=np.intp)
+        self.positions[ids.astype(np.int64) - self.offset] = np.arange(len(ids))
+        self.columns = {column: labels[column].array for column in LABEL_COLUMNS}
+
+    def rows(self, topics):
+        """
+        Label row for each topic id, or -1 where there is none.
+
+        Args:
+            topics (array-like): dominant_topic values.
+
+        Returns:
+            np.ndarray: Integer positions into the label columns.
+        """
+        codes = np.asarray(topics, dtype=np.float64) - self.offset
+        labelled = (codes >= 0) & (codes < len(self.positions)) & (codes == np.floor(codes))
+        rows = np.full(len(codes), -1, dtype=np.intp)
+        rows[labelled] = self.positions[codes[labelled].astype(np.intp)]
+        return rows
+
+    def holds_missing(self):
+        """True if every label column keeps its dtype when a restaurant has no label."""
+        return all(values.take([-1], allow_fill=True).dtype == values.dtype for values in self.columns.values())
+
+    def allow_missing(self):
+        """Convert label columns to the dtype they take once NaN is present (int -> float, as a merge would)."""
+        for column, values in self.columns.items():
+            self.columns[column] = values.astype(values.take([-1], allow_fill=True).dtype)
+
+    def apply(self, michelin_df):
+        """
+        Add consumer_type and consumer_scene to restaurants by their dominant topic.
+
+        Args:
+            michelin_df (pd.DataFrame): Restaurants with a dominant_topic column.
+
+        Returns:
+            pd.DataFrame: A copy with the label columns added.
+        """
+        rows = self.rows(pd.to_numeric(michelin_df["dominant_topic"], errors="coerce"))
+        labelled = michelin_df.reset_index(drop=True)
+        for column, values in self.columns.items():
+            labelled[column] = values.take(rows, allow_fill=True)
+        return labelled
+
+def stream_scene_labels(labels_path, source, target, chunk_size=SCENE_CHUNK_SIZE, span_prefix="scene", model=None):
+    """
+    Label an artifact's restaurants chunk by chunk and write the result incrementally.
+
+    Memory depends on the chunk size, not the number of restaurants.
+
+    Args:
+        labels_path (str): CSV with topic_id, consumer_type and consumer_scene columns.
+        source (str): Artifact with a dominant_topic column.
+        target (str): Artifact to write.
+        chunk_size (int): Restaurants per chunk.
+        span_prefix (str): Instrumentation span prefix.
+        model (TopicModel): The model that assigned source's topics. When given,
+            the labels must list its top words (see check_topic_words()).
+
+    Returns:
+        str: Path of the written artifact.
+
+    Raises:
+        ValueError: If the labels were written for a different model.
+    """
+    labels = load_scene_labels(labels_path)
+    if model is not None:
+        check_topic_words(labels, model.manifest["top_words"], labels_path, f"topic model {model.version}",
+                          required=True)
+    lookup = SceneLookup(labels)
+    with span(f"{span_prefix}.stream", chunk_size=chunk_size) as s:
+        # Integer labels turn float wherever a topic is unlabelled; decide once for the
+        # whole table (from the topic column alone) so every chunk has the same schema
+        if not lookup.holds_missing():
+            batches = iter_artifact_batches(source, columns=["dominant_topic"], batch_size=chunk_size)
+            if any((lookup.rows(pd.to_numeric(batch["dominant_topic"], errors="coerce")) < 0).any() for batch in batches):
+                lookup.allow_missing()
+
+        with ArtifactWriter(target) as writer:
+            for chunk in iter_artifact_batches(source, batch_size=chunk_size):
+                writer.write(lookup.apply(chunk))
+        s.rows = writer.rows
+    return writer.path
+
+def merge_scene_labels(export_excel=False, chunk_size=SCENE_CHUNK_SIZE):
+    # Paths
+    topics_path = os.path.join("data", "lda_topic_keywords.csv")
+
+    if not export_excel:
+        output_path = stream_scene_labels(topics_path, "michelin_with_topics", "michelin_with_scene", chunk_size)
+        print(f"Updated file saved to {output_path}")
+        return
+
+    # The Excel copy needs the whole table (and must be written before the artifact)
+    excel_path = os.path.join("data", "michelin_with_scene.xlsx")
+    with span("scene.load") as s:
+        # Load manually labeled topic info
+        lookup = SceneLookup(load_scene_labels(topics_path))
+
+        # Load restaurant-level topic assignments
+        michelin_df = read_artifact("michelin_with_topics")
+        s.rows = len(michelin_df)
+
+    # Merge scene labels
+    with span("scene.merge", rows=len(michelin_df)):
+        merged_df = lookup.apply(michelin_df)
 
     # Save final output
-    merged_df.to_excel(output_path, index=False)
+    with span("scene.save", rows=len(merged_df)):
+        output_path = write_artifact(merged_df, "michelin_with_scene", excel_path=excel_path)
     print(f"Updated file saved to {output_path}")
 
+def merge_manual_scene_labels(model, labels_path=MANUAL_LABELS_PATH, chunk_size=SCENE_CHUNK_SIZE):
+    """
+    Write merged_michelin_data, the Marketing Map's table, from the curated
+    manual_scene_labels.csv and the latest topic assignments.
+
+    Args:
+        model (TopicModel): The model that assigned michelin_with_topics' topics.
+        labels_path (str): CSV with topic_id, top_words, consumer_type and consumer_scene columns.
+        chunk_size (int): Restaurants labelled per chunk.
+
+    Raises:
+        ValueError: If the labels were written for a different model (nothing is written).
+    """
+    output_path = stream_scene_labels(labels_path, "michelin_with_topics", "merged_michelin_data", chunk_size,
+                                      span_prefix="scene_map", model=model)
+    print(f"Map data saved to {output_path}")
+
 if __name__ == "__main__":
     merge_scene_labels()
\ No newline at end of file
@@ -0,0 +1,215 @@
+# app/artifacts.py
+
+"""
+Columnar artifact layer shared by the pipeline stages and the Streamlit pages.
+- Tables are stored as Parquet files under data/artifacts/.
+- Reads support column projection and memory-mapped I/O.
+- Large tables can be read in row batches and written incrementally.
+- The input spreadsheet (michelin_full.xlsx) is imported on first read and
+  again whenever it is edited, so it remains the editable source of record.
+- Pipeline outputs that also ship as spreadsheets only seed a missing
+  artifact on a first run; a newer spreadsheet (after a checkout, say) never
+  replaces what the pipeline wrote.
+- Excel export is an optional side output only.
+"""
+
+import ast
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Paths (resolved from the repository root so pages and CLI agree)
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+ARTIFACT_DIR = os.path.join(DATA_DIR, "artifacts")
+
+# Hand-edited inputs: re-imported whenever the spreadsheet is newer than the artifact
+LEGACY_SOURCES = {
+    "michelin_full": "michelin_full.xlsx",
+}
+
+# Pipeline outputs kept as spreadsheets: imported only while the artifact does not exist
+SEED_SOURCES = {
+    "michelin_with_topics": "michelin_with_topics.xlsx",
+    "michelin_with_scene": "michelin_with_scene.xlsx",
+    "merged_michelin_data": "merged_michelin_data.csv",
+}
+
+def artifact_path(name):
+    """Return the Parquet path for an artifact name."""
+    return os.path.join(ARTIFACT_DIR, f"{name}.parquet")
+
+def legacy_path(name):
+    """Return the input spreadsheet an artifact is imported from, or None."""
+    filename = LEGACY_SOURCES.get(name)
+    return os.path.join(DATA_DIR, filename) if filename else None
+
+def seed_path(name):
+    """Return the spreadsheet/CSV copy that seeds a missing pipeline output, or None."""
+    filename = SEED_SOURCES.get(name)
+    return os.path.join(DATA_DIR, filename) if filename else None
+
+def _read_legacy(path):
+    if path.endswith(".csv"):
+        df = pd.read_csv(path, index_col=0) if _has_index_column(path) else pd.read_csv(path)
+    else:
+        df = pd.read_excel(path)
+
+    # Token lists round-trip through spreadsheets as their string repr
+    if "tokens" in df.columns:
+        df["tokens"] = df["tokens"].apply(lambda t: ast.literal_eval(t) if isinstance(t, str) else t)
+    return df
+
+def _has_index_column(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.readline().startswith(",")
+
+def write_artifact(df, name, excel_path=None):
+    """
+    Save a DataFrame as a Parquet artifact.
+
+    Args:
+        df (pd.DataFrame): Table to store. The index is not saved.
+        name (str): Artifact name (file stem under data/artifacts/).
+        excel_path (str): Optional path for an additional .xlsx copy.
+
+    Returns:
+        str: Path of the written Parquet file.
+    """
+    # Write the side output first so the artifact is never older than it
+    if excel_path:
+        df.to_excel(excel_path, index=False)
+
+    path = artifact_path(name)
+    os.makedirs(ARTIFACT_DIR, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+def import_legacy(name):
+    """
+    Convert an artifact's spreadsheet/CSV source (or seed) to Parquet.
+
+    Args:
+        name (str): Artifact name listed in LEGACY_SOURCES or SEED_SOURCES.
+
+    Returns:
+        pd.DataFrame: The imported table.
+    """
+    source = legacy_path(name) or seed_path(name)
+    if source is None or not os.path.exists(source):
+        raise FileNotFoundError(f"No artifact or legacy source found for '{name}'.")
+    df = _read_legacy(source)
+    try:
+        write_artifact(df, name)
+    except OSError:
+        # Read-only deployments can still serve the legacy file
+        pass
+    return df
+
+def is_stale(name):
+    """True if the artifact is missing or older than its input spreadsheet (seeds never make it stale)."""
+    path = artifact_path(name)
+    if not os.path.exists(path):
+        return True
+    source = legacy_path(name)
+    return bool(source) and os.path.exists(source) and os.path.getmtime(source) > os.path.getmtime(path)
+
+def read_artifact(name, columns=None, memory_map=True):
+    """
+    Load an artifact, importing it from its legacy source when needed.
+
+    Args:
+        name (str): Artifact name.
+        columns (list): Optional subset of columns to read.
+        memory_map (bool): Memory-map the Parquet file instead of reading it
+            into a buffer first.
+
+    Returns:
+        pd.DataFrame: The requested columns.
+    """
+    if is_stale(name):
+        df = import_legacy(name)
+        return df[columns] if columns else df
+    table = pq.read_table(artifact_path(name), columns=columns, memory_map=memory_map)
+    return table.to_pandas()
+
+def iter_artifact_batches(name, columns=None, batch_size=10_000):
+    """
+    Stream an artifact as a sequence of DataFrames.
+
+    Args:
+        name (str): Artifact name.
+        columns (list): Optional subset of columns to read.
+        batch_size (int): Maximum rows per yielded DataFrame.
+
+    Yields:
+        pd.DataFrame: Consecutive row batches.
+    """
+    if is_stale(name):
+        df = import_legacy(name)
+        if not os.path.exists(artifact_path(name)):
+            for start in range(0, len(df), batch_size):
+                yield (df[columns] if columns else df).iloc[start:start + batch_size]
+            return
+    parquet_file = pq.ParquetFile(artifact_path(name), memory_map=True)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas()
+
+def artifact_num_rows(name):
+    """Return the row count of an artifact from its Parquet metadata."""
+    if is_stale(name):
+        return len(import_legacy(name))
+    return pq.ParquetFile(artifact_path(name)).metadata.num_rows
+
+class ArtifactWriter:
+    """
+    Write a Parquet artifact incrementally, one DataFrame chunk at a time.
+
+    The file only replaces the existing artifact once the writer is closed
+    without error. Every chunk must have the same columns as the first.
+
+    Args:
+        name (str): Artifact name.
+    """
+
+    def __init__(self, name):
+        self.path = artifact_path(name)
+        self.tmp_path = f"{self.path}.tmp"
+        self.rows = 0
+        self._writer = None
+
+    def write(self, df):
+        """Append a chunk of rows to the artifact."""
+        if self._writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            os.makedirs(ARTIFACT_DIR, exist_ok=True)
+            self._writer = pq.ParquetWriter(self.tmp_path, table.schema)
+        else:
+            table = pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False)
+        self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        """Finish the file and move it into place."""
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(self.tmp_path, self.path)
+            self._writer = None
+
+    def abort(self):
+        """Discard everything written so far."""
+        if self._writer is not None:
+            self._writer.close()
+            os.remove(self.tmp_path)
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
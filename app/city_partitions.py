@@ -0,0 +1,518 @@
+# app/city_partitions.py
+
+"""
+City-partitioned restaurant tables.
+- Each city (or region) has its own directory under data/artifacts/cities/
+  holding its restaurants (michelin_full.parquet) and, once modelled, its map
+  table with topics and scenes (merged_michelin_data.parquet)
+- cities/manifest.json lists every city: display name, row count, lat/lon
+  bounds, the file its rows came from, a hash of those rows and its topic-model
+  mode; each city's last modelling run is recorded next to its tables
+  (model.json), so modelling never rewrites the manifest
+- The city comes from a `city` column when there is one, otherwise from the
+  address ("…, Brooklyn, 11211, USA"), with the NYC boroughs folded into New York
+- Splitting or importing rewrites only the partitions whose rows changed, and
+  modelling skips cities whose rows, model and labels are unchanged, so adding
+  a city never rewrites or remodels the others
+- Cities are modelled in parallel across a process pool, each either with the
+  saved global topic model (shared topic IDs and scene labels) or with its own
+  LDA model (saved under the city's directory, with keywords to label)
+- Scene labels are applied only if their top_words match the model's; a city
+  whose labels are missing or were written for another model gets empty
+  scene columns
+- Pages read the manifest first and load only the partitions of the chosen
+  city, or of the cities whose bounds overlap the viewport
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.artifacts import ARTIFACT_DIR, read_artifact
+from app.instrumentation import span
+
+# Paths
+CITY_DIR = os.path.join(ARTIFACT_DIR, "cities")
+CITY_MANIFEST_PATH = os.path.join(CITY_DIR, "manifest.json")
+
+# Bump when the layout changes
+MANIFEST_FORMAT = 1
+
+# Tables kept per city: the restaurants, and the map table written by modelling
+SOURCE_TABLE = "michelin_full"
+MAP_TABLE = "merged_michelin_data"
+
+# Per-city files used when a city has its own topic model
+CITY_MODEL_DIR = "models"
+CITY_KEYWORDS = "topic_keywords.csv"
+CITY_LABELS = "scene_labels.csv"
+MODEL_STATUS = "model.json"
+
+# "global": the saved topic model of the main pipeline; "city": one LDA model per city
+MODEL_MODES = ("global", "city")
+DEFAULT_MODEL = "global"
+
+# Random seed for per-city LDA fits (as in run_lda_on_descriptions)
+LDA_RANDOM_STATE = 42
+
+# Degrees added around a city whose restaurants share one latitude or longitude
+BOUNDS_PAD = 0.01
+
+# Columns a restaurant table needs to be partitioned and modelled
+REQUIRED_COLUMNS = ["restaurant", "lat", "lon", "address", "description"]
+
+# Districts listed under their Guide city
+CITY_ALIASES = {
+    "Brooklyn": "New York",
+    "Queens": "New York",
+    "Bronx": "New York",
+    "Staten Island": "New York",
+    "Long Island City": "New York",
+}
+
+def city_of(address):
+    """
+    City named in an address such as "16 W. 22nd St., New York, 10010, USA".
+
+    The country (last part) is dropped, then the last part with letters left
+    once postal codes are removed is the city.
+
+    Args:
+        address (str): Comma-separated address.
+
+    Returns:
+        str: City name (after CITY_ALIASES), or "Unknown".
+    """
+    parts = [part.strip() for part in str(address).split(",") if part.strip()] if pd.notna(address) else []
+    for part in reversed(parts[1:-1] if len(parts) > 2 else parts[1:]):
+        name = " ".join(word for word in part.split() if not any(c.isdigit() for c in word))
+        if name:
+            return CITY_ALIASES.get(name, name)
+    return "Unknown"
+
+def city_slug(name):
+    """Directory name for a city, e.g. "New York" -> "new-york"."""
+    return re.sub(r"[^a-z0-9]+", "-", str(name).lower()).strip("-") or "unknown"
+
+def assign_cities(df):
+    """
+    City of every restaurant: its `city` column where filled in, else parsed from the address.
+
+    Args:
+        df (pd.DataFrame): Restaurant table with an address column.
+
+    Returns:
+        pd.Series: City name per row, aligned with df.
+    """
+    parsed = df["address"].map(city_of)
+    if "city" not in df.columns:
+        return parsed
+    return df["city"].where(df["city"].notna() & (df["city"].astype(str).str.strip() != ""), parsed).astype(str)
+
+def city_path(slug, filename=""):
+    """Path of a city's directory, or of a file inside it."""
+    return os.path.join(CITY_DIR, slug, filename)
+
+def partition_path(slug, table=SOURCE_TABLE):
+    """Parquet path of one of a city's tables."""
+    return city_path(slug, f"{table}.parquet")
+
+def read_manifest(path=CITY_MANIFEST_PATH):
+    """The partition manifest (an empty one if there is none yet)."""
+    if not os.path.exists(path):
+        return {"format": MANIFEST_FORMAT, "cities": {}}
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != MANIFEST_FORMAT:
+        raise ValueError(f"{path} uses format {manifest.get('format')}, expected {MANIFEST_FORMAT}.")
+    return manifest
+
+def _write_json(data, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+def cities_exist(path=CITY_MANIFEST_PATH):
+    """True if the partitioned layout has at least one city."""
+    return os.path.exists(path) and bool(read_manifest(path)["cities"])
+
+def _write_table(df, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+
+def _table_hash(df):
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+def _bounds(df):
+    # [south, west, north, east]; None when no restaurant has coordinates
+    lat, lon = pd.to_numeric(df["lat"], errors="coerce"), pd.to_numeric(df["lon"], errors="coerce")
+    if lat.notna().sum() == 0 or lon.notna().sum() == 0:
+        return None
+    return [float(lat.min()), float(lon.min()), float(lat.max()), float(lon.max())]
+
+def write_partitions(df, source, model=None, path=CITY_MANIFEST_PATH):
+    """
+    Split a restaurant table by city and write the partitions that changed.
+
+    Cities whose rows are unchanged are left as they are (only their model mode
+    is updated if one is given), and cities that came from the same source but
+    are no longer in it are removed. A city that belongs to another source is
+    skipped.
+
+    Args:
+        df (pd.DataFrame): Restaurants with the michelin_full columns (and
+            optionally `city`).
+        source (str): Name of the file the rows came from.
+        model (str): Topic-model mode for these cities ("global" or "city");
+            None keeps each city's current mode (DEFAULT_MODEL for new cities).
+        path (str): Manifest path.
+
+    Returns:
+        list: Slugs of the partitions written.
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"{source} is missing column(s): {', '.join(missing)}.")
+    if model is not None and model not in MODEL_MODES:
+        raise ValueError(f"Unknown model mode '{model}'. Choose from: {', '.join(MODEL_MODES)}.")
+
+    manifest = read_manifest(path)
+    cities = assign_cities(df)
+    table = df.drop(columns=["city"], errors="ignore")
+    written, seen = [], set()
+    with span("cities.partition", rows=len(df)) as s:
+        for name, rows in table.groupby(cities.to_numpy(), sort=True):
+            slug = city_slug(name)
+            seen.add(slug)
+            entry = manifest["cities"].get(slug)
+            if entry is not None and entry["source"] != source:
+                print(f"Skipping {name}: its restaurants come from {entry['source']}, not {source}.")
+                continue
+            rows = rows.reset_index(drop=True)
+            digest = _table_hash(rows)
+            mode = model or (entry["model"] if entry else DEFAULT_MODEL)
+            if entry is None or entry["hash"] != digest or not os.path.exists(partition_path(slug)):
+                _write_table(rows, partition_path(slug))
+                written.append(slug)
+            manifest["cities"][slug] = {
+                "name": str(name),
+                "rows": len(rows),
+                "bounds": _bounds(rows),
+                "source": source,
+                "hash": digest,
+                "model": mode,
+                "updated": entry["updated"] if entry and slug not in written else time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+
+        removed = [slug for slug, entry in manifest["cities"].items() if entry["source"] == source and slug not in seen]
+        for slug in removed:
+            shutil.rmtree(city_path(slug), ignore_errors=True)
+            del manifest["cities"][slug]
+        s.written = len(written)
+
+    _write_json(manifest, path)
+    print(f"Partitioned {len(df)} restaurants from {source}: {len(written)} of {len(seen)} cities written"
+          + (f", {len(removed)} removed" if removed else ""))
+    return written
+
+def partition_dataset(source=SOURCE_TABLE, path=CITY_MANIFEST_PATH):
+    """
+    Split the main restaurant artifact into city partitions.
+
+    Args:
+        source (str): Artifact to split.
+        path (str): Manifest path.
+
+    Returns:
+        list: Slugs of the partitions written.
+    """
+    return write_partitions(read_artifact(source), source, path=path)
+
+def import_city(path, city=None, model=None, manifest_path=CITY_MANIFEST_PATH):
+    """
+    Add (or replace) the restaurants of a spreadsheet or CSV as city partitions.
+
+    Args:
+        path (str): .xlsx or .csv file with the michelin_full columns.
+        city (str): City of every row; None reads it from a `city` column or the addresses.
+        model (str): Topic-model mode for the imported cities ("global" or "city").
+        manifest_path (str): Manifest path.
+
+    Returns:
+        list: Slugs of the partitions written.
+    """
+    df = pd.read_csv(path) if path.endswith(".csv") else pd.read_excel(path)
+    if city:
+        df["city"] = city
+    return write_partitions(df, os.path.basename(path), model=model, path=manifest_path)
+
+def read_partition(slug, table=SOURCE_TABLE, columns=None):
+    """One city's table, memory-mapped."""
+    return pq.read_table(partition_path(slug, table), columns=columns, memory_map=True).to_pandas()
+
+def read_partitions(slugs, table=SOURCE_TABLE, columns=None):
+    """
+    Several cities' tables, one after another.
+
+    Args:
+        slugs (iterable): City slugs.
+        table (str): SOURCE_TABLE or MAP_TABLE.
+        columns (list): Optional subset of columns to read.
+
+    Returns:
+        pd.DataFrame: The rows of every city, in the order given.
+    """
+    frames = [read_partition(slug, table, columns) for slug in slugs]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+def view_bounds(manifest, slugs=None):
+    """
+    [south, west, north, east] around the given cities (all by default).
+
+    A box with no height or width (one restaurant, or several at the same
+    latitude/longitude) is padded by BOUNDS_PAD so range sliders stay usable.
+
+    Returns:
+        list: Bounds, or None if no city has coordinates.
+    """
+    slugs = manifest["cities"] if slugs is None else slugs
+    boxes = np.array([manifest["cities"][slug]["bounds"] for slug in slugs
+                      if manifest["cities"][slug]["bounds"] is not None], dtype=np.float64)
+    if len(boxes) == 0:
+        return None
+    south, west = float(boxes[:, 0].min()), float(boxes[:, 1].min())
+    north, east = float(boxes[:, 2].max()), float(boxes[:, 3].max())
+    if north - south < BOUNDS_PAD:
+        south, north = south - BOUNDS_PAD, north + BOUNDS_PAD
+    if east - west < BOUNDS_PAD:
+        west, east = west - BOUNDS_PAD, east + BOUNDS_PAD
+    return [south, west, north, east]
+
+def cities_in_view(manifest, south, west, north, east, slugs=None):
+    """
+    Cities whose bounds overlap a lat/lon box.
+
+    Args:
+        manifest (dict): Output of read_manifest.
+        south, west, north, east (float): The viewport.
+        slugs (iterable): Cities to choose from (all by default).
+
+    Returns:
+        list: Matching slugs, in manifest order.
+    """
+    slugs = manifest["cities"] if slugs is None else slugs
+    found = []
+    for slug in slugs:
+        bounds = manifest["cities"][slug]["bounds"]
+        if bounds is not None and bounds[0] <= north and bounds[2] >= south and bounds[1] <= east and bounds[3] >= west:
+            found.append(slug)
+    return found
+
+def modelled_cities(manifest):
+    """Cities whose map table has been written."""
+    return [slug for slug in manifest["cities"] if os.path.exists(partition_path(slug, MAP_TABLE))]
+
+def _file_sha1(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def _labels_path(slug, mode):
+    from app.apply_scene_tags import MANUAL_LABELS_PATH
+    return MANUAL_LABELS_PATH if mode == "global" else city_path(slug, CITY_LABELS)
+
+def read_model_status(slug):
+    """A city's last modelling run (signature, model version, topics, rows), or None."""
+    path = city_path(slug, MODEL_STATUS)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+def city_signature(slug, entry, n_topics, global_version, stopwords_custom):
+    """
+    Hash of everything a city's map table depends on.
+
+    Args:
+        slug (str): City slug.
+        entry (dict): The city's manifest entry.
+        n_topics (int): Topics of a per-city model.
+        global_version (str): Latest saved global topic model.
+        stopwords_custom (set): Stopwords used by per-city models.
+
+    Returns:
+        str: Hex digest.
+    """
+    from app.nlp_topic_modeling import tokenizer_fingerprint
+
+    mode = entry["model"]
+    payload = {
+        "rows": entry["hash"],
+        "model": mode,
+        "labels": _file_sha1(_labels_path(slug, mode)),
+        "global_version": global_version if mode == "global" else None,
+        "n_topics": n_topics if mode == "city" else None,
+        "tokenizer": tokenizer_fingerprint(stopwords_custom) if mode == "city" else None,
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _attach_labels(df, labels_path, model):
+    from app.apply_scene_tags import SceneLookup, check_topic_words, load_scene_labels
+
+    labels = load_scene_labels(labels_path) if os.path.exists(labels_path) else None
+    if labels is not None:
+        try:
+            check_topic_words(labels, model.manifest["top_words"], labels_path, f"topic model {model.version}",
+                              required=True)
+        except ValueError as exc:
+            # Labels of another model's topics would put restaurants in the wrong scenes
+            print(f"⚠ {exc} Leaving the scenes empty.")
+            labels = None
+    if labels is None:
+        # Unlabelled topics: the columns a labelled city has, with nothing in them
+        df["consumer_type"] = np.nan
+        # A string dtype so the empty column stays a string column in Parquet
+        df["consumer_scene"] = pd.Series(None, index=df.index, dtype="string")
+        return df, "none"
+    lookup = SceneLookup(labels)
+    if not lookup.holds_missing() and (lookup.rows(df["dominant_topic"]) < 0).any():
+        lookup.allow_missing()
+    return lookup.apply(df), "applied"
+
+def model_city(slug, mode, n_topics, global_version=None):
+    """
+    Assign topics and scenes to one city's restaurants and write its map table.
+
+    Runs in a pool worker.
+
+    Args:
+        slug (str): City slug.
+        mode (str): "global" transforms with the saved global topic model;
+            "city" fits and saves the city's own LDA model.
+        n_topics (int): Topics of a per-city model.
+        global_version (str): Global model version to use.
+
+    Returns:
+        dict: model_version, n_topics, rows and labels ("applied", or "none"
+        when the topics are unlabelled or the labels are another model's).
+    """
+    from app.topic_model import load_topic_model, save_topic_model
+
+    df = read_partition(slug)
+    descriptions = df["description"].fillna("").astype(str)
+    with span("cities.model", city=slug, mode=mode, rows=len(df)):
+        if mode == "global":
+            model = load_topic_model(global_version)
+            X_topics = model.transform(descriptions)
+        else:
+            from sklearn.decomposition import LatentDirichletAllocation
+            from app.nlp_topic_modeling import STOPWORDS_PATH, load_stopwords, save_topic_keywords, vectorize_descriptions
+
+            stopwords_custom = load_stopwords(STOPWORDS_PATH)
+            vectorizer, X = vectorize_descriptions(descriptions, stopwords_custom)
+            lda = LatentDirichletAllocation(n_components=n_topics, random_state=LDA_RANDOM_STATE).fit(X)
+            X_topics = lda.transform(X)
+            model_dir = city_path(slug, CITY_MODEL_DIR)
+            model = load_topic_model(save_topic_model(vectorizer, lda, stopwords_custom, model_dir=model_dir), model_dir)
+            save_topic_keywords(lda, vectorizer.get_feature_names_out(), city_path(slug, CITY_KEYWORDS))
+        df["dominant_topic"] = np.argmax(X_topics, axis=1)
+        df, labels = _attach_labels(df, _labels_path(slug, mode), model)
+    _write_table(df, partition_path(slug, MAP_TABLE))
+    return {"model_version": model.version, "n_topics": int(model.n_topics), "rows": len(df), "labels": labels}
+
+def model_cities(slugs=None, n_jobs=-1, n_topics=None, global_version=None, force=False, path=CITY_MANIFEST_PATH):
+    """
+    Model every city whose rows, model or labels changed, several at a time.
+
+    Args:
+        slugs (iterable): Cities to consider (all by default).
+        n_jobs (int): Worker processes (-1 = all cores).
+        n_topics (int): Topics of per-city models (default NUM_TOPICS).
+        global_version (str): Saved topic model for cities in "global" mode
+            (default: the latest version).
+        force (bool): Remodel even unchanged cities.
+        path (str): Manifest path.
+
+    Returns:
+        dict: Slug -> "ran" or "skipped".
+
+    Raises:
+        RuntimeError: If any city failed (the others are still saved).
+    """
+    from app.nlp_topic_modeling import NUM_TOPICS, STOPWORDS_PATH, load_stopwords, pool_context
+    from app.topic_model import list_versions
+
+    manifest = read_manifest(path)
+    slugs = list(manifest["cities"] if slugs is None else slugs)
+    n_topics = n_topics or NUM_TOPICS
+    stopwords_custom = load_stopwords(STOPWORDS_PATH)
+    versions = list_versions()
+    global_version = global_version or (versions[-1] if versions else None)
+
+    status, pending = {}, {}
+    for slug in slugs:
+        entry = manifest["cities"][slug]
+        if entry["model"] == "global" and global_version is None:
+            raise FileNotFoundError(f"{entry['name']} uses the global topic model, but none is saved. Run the lda stage first.")
+        signature = city_signature(slug, entry, n_topics, global_version, stopwords_custom)
+        previous = read_model_status(slug)
+        current = previous is not None and previous["signature"] == signature
+        if current and os.path.exists(partition_path(slug, MAP_TABLE)) and not force:
+            status[slug] = "skipped"
+        else:
+            pending[slug] = signature
+    if not pending:
+        print(f"All {len(slugs)} cities are up to date.")
+        return status
+
+    workers = min(n_jobs if n_jobs and n_jobs > 0 else os.cpu_count() or 1, len(pending))
+    print(f"Modelling {len(pending)} of {len(slugs)} cities with {workers} worker(s)...")
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context()) as executor:
+        futures = {
+            executor.submit(model_city, slug, manifest["cities"][slug]["model"], n_topics, global_version): slug
+            for slug in pending
+        }
+        for future in as_completed(futures):
+            slug = futures[future]
+            name = manifest["cities"][slug]["name"]
+            try:
+                result = future.result()
+            except Exception as exc:
+                failed.append(name)
+                print(f"✖ {name} failed: {exc!r}")
+                continue
+            _write_json({"signature": pending[slug], "model": manifest["cities"][slug]["model"],
+                         "finished": time.strftime("%Y-%m-%dT%H:%M:%S"), **result}, city_path(slug, MODEL_STATUS))
+            status[slug] = "ran"
+            unlabelled = "" if result["labels"] == "applied" else ", no scene labels"
+            print(f"✔ {name}: {result['rows']} restaurants, model {result['model_version']}{unlabelled}")
+    if failed:
+        raise RuntimeError(f"Modelling failed for: {', '.join(failed)}")
+    return status
+
+def city_summary(path=CITY_MANIFEST_PATH):
+    """
+    One row per city: name, restaurants, source, model mode and whether it is modelled.
+
+    Returns:
+        pd.DataFrame: The summary.
+    """
+    manifest = read_manifest(path)
+    modelled = set(modelled_cities(manifest))
+    rows = [{"city": entry["name"], "slug": slug, "restaurants": entry["rows"], "source": entry["source"],
+             "model": entry["model"], "modelled": slug in modelled}
+            for slug, entry in manifest["cities"].items()]
+    return pd.DataFrame(rows, columns=["city", "slug", "restaurants", "source", "model", "modelled"])
@@ -0,0 +1,244 @@
+# app/data_access.py
+
+"""
+Shared, cached data access for the Streamlit pages.
+- Each dataset is loaded once per process and shared by every session
+- Entries are invalidated when a source file's mtime/size (or content hash) changes
+- Derived tables (e.g. cleaned scene columns) are cached the same way
+- City partitions are cached one city at a time, so a new city or a moved
+  viewport only loads the partitions not already in memory
+- Tables derived for a set of cities are cached per scope; only the MAX_SCOPES
+  most recently used scopes of each table are kept
+- Callers receive shallow read-only views; the cached copy is never handed out
+- Load time and hit-rate metrics are exposed for monitoring; loads are also
+  recorded as instrumentation spans ("data.load.<key>")
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+from app.artifacts import DATA_DIR, artifact_path, legacy_path, read_artifact
+from app.city_partitions import SOURCE_TABLE, partition_path, read_partition
+from app.instrumentation import span
+
+# How source files are checked for changes: "mtime" (stat only) or "hash" (file contents)
+DEFAULT_VALIDATION = "mtime"
+
+# Scopes (sets of cities in view) kept per derived table; older ones are evicted
+MAX_SCOPES = 8
+
+def _file_signature(path, validation):
+    if not os.path.exists(path):
+        return None
+    if validation == "hash":
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        return h.hexdigest()
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _readonly_view(value):
+    # Column additions or reassignment on a shallow copy never reach the cached frame
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    if isinstance(value, (list, dict, set)):
+        return type(value)(value)
+    return value
+
+class DataStore:
+    """
+    Process-wide cache of datasets keyed by name and validated against their source files.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._groups = {}
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _touch(self, key, group, limit):
+        # Mark key as the group's most recently used and evict the least recently used beyond limit
+        with self._lock:
+            keys = self._groups.setdefault(group, OrderedDict())
+            keys[key] = None
+            keys.move_to_end(key)
+            while len(keys) > limit:
+                oldest, _ = keys.popitem(last=False)
+                self._entries.pop(oldest, None)
+
+    def get(self, key, loader, sources, validation=DEFAULT_VALIDATION, group=None, limit=None):
+        """
+        Return a cached dataset, reloading it if any source file changed.
+
+        Args:
+            key (str): Cache key.
+            loader (callable): Zero-argument function that builds the dataset.
+            sources (list): File paths whose changes invalidate the entry.
+            validation (str): "mtime" or "hash".
+            group (str): Optional group of related keys (e.g. one table for different scopes).
+            limit (int): Most recently used keys kept in the group; older ones are evicted.
+
+        Returns:
+            object: A read-only view of the dataset.
+        """
+        signature = tuple(_file_signature(path, validation) for path in sources)
+        metrics = self._metrics.setdefault(key, {"hits": 0, "misses": 0, "loads": 0, "last_load_s": 0.0, "total_load_s": 0.0})
+        if group is not None:
+            self._touch(key, group, limit)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == signature:
+            metrics["hits"] += 1
+            return _readonly_view(entry[1])
+
+        # Only one session loads a given key; the others wait and reuse it
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                metrics["hits"] += 1
+                return _readonly_view(entry[1])
+
+            metrics["misses"] += 1
+            start = time.perf_counter()
+            with span(f"data.load.{key}") as s:
+                value = loader()
+                s.rows = len(value) if isinstance(value, (pd.DataFrame, pd.Series, list)) else None
+            elapsed = time.perf_counter() - start
+            metrics["loads"] += 1
+            metrics["last_load_s"] = elapsed
+            metrics["total_load_s"] += elapsed
+
+            # Re-sign after loading: a first read may itself create a source (e.g. a Parquet import)
+            signature = tuple(_file_signature(path, validation) for path in sources)
+            self._entries[key] = (signature, value)
+            return _readonly_view(value)
+
+    def invalidate(self, key=None):
+        """Drop one cached entry, or all of them."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._groups.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def metrics(self):
+        """
+        Per-dataset cache metrics.
+
+        Returns:
+            pd.DataFrame: One row per key with hits, misses, loads, hit rate and load times.
+        """
+        rows = []
+        for key, m in self._metrics.items():
+            lookups = m["hits"] + m["misses"]
+            rows.append({"dataset": key, **m, "hit_rate": m["hits"] / lookups if lookups else 0.0})
+        return pd.DataFrame(rows, columns=["dataset", "hits", "misses", "loads", "last_load_s", "total_load_s", "hit_rate"])
+
+# Shared by every Streamlit session in this process
+store = DataStore()
+
+def artifact_sources(name):
+    """Files whose changes invalidate an artifact: its Parquet file and legacy source."""
+    return [path for path in (artifact_path(name), legacy_path(name)) if path]
+
+def load_artifact(name, columns=None, validation=DEFAULT_VALIDATION):
+    """
+    Cached read_artifact.
+
+    Args:
+        name (str): Artifact name.
+        columns (list): Optional column projection (part of the cache key).
+        validation (str): "mtime" or "hash".
+
+    Returns:
+        pd.DataFrame: Read-only view of the artifact.
+    """
+    key = f"artifact:{name}:{','.join(columns) if columns else '*'}"
+    return store.get(key, lambda: read_artifact(name, columns=columns), artifact_sources(name), validation)
+
+def load_partition(slug, table=SOURCE_TABLE, columns=None, validation=DEFAULT_VALIDATION):
+    """
+    Cached read of one city's partition.
+
+    Args:
+        slug (str): City slug.
+        table (str): Partition table (see app.city_partitions).
+        columns (list): Optional column projection (part of the cache key).
+        validation (str): "mtime" or "hash".
+
+    Returns:
+        pd.DataFrame: Read-only view of the partition.
+    """
+    key = f"partition:{table}:{slug}:{','.join(columns) if columns else '*'}"
+    return store.get(key, lambda: read_partition(slug, table, columns), [partition_path(slug, table)], validation)
+
+def load_partitions(slugs, table=SOURCE_TABLE, columns=None, validation=DEFAULT_VALIDATION):
+    """
+    Several cities' partitions, one after another, each served from its own cache entry.
+
+    Args:
+        slugs (list): City slugs.
+        table (str): Partition table.
+        columns (list): Optional column projection.
+        validation (str): "mtime" or "hash".
+
+    Returns:
+        pd.DataFrame: The rows of every city, in the order given.
+    """
+    frames = [load_partition(slug, table, columns, validation) for slug in slugs]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+def partition_sources(slugs, table=SOURCE_TABLE):
+    """Files whose changes invalidate a table built from city partitions."""
+    return [partition_path(slug, table) for slug in slugs]
+
+def load_csv(filename, validation=DEFAULT_VALIDATION, **read_kwargs):
+    """
+    Cached pd.read_csv for a file in the data directory.
+
+    Args:
+        filename (str): File name relative to data/.
+        validation (str): "mtime" or "hash".
+        **read_kwargs: Passed to pd.read_csv.
+
+    Returns:
+        pd.DataFrame: Read-only view of the CSV.
+    """
+    path = os.path.join(DATA_DIR, filename)
+    return store.get(f"csv:{filename}", lambda: pd.read_csv(path, **read_kwargs), [path], validation)
+
+def load_derived(key, builder, sources, validation=DEFAULT_VALIDATION, scope=None):
+    """
+    Cache a table derived from other datasets.
+
+    Args:
+        key (str): Cache key for the derived table.
+        builder (callable): Zero-argument function that builds it.
+        sources (list): Files the derived table depends on.
+        validation (str): "mtime" or "hash".
+        scope (str): Optional scope the table was built for (e.g. the cities in view).
+            Each scope is cached separately; only the MAX_SCOPES most recently used are kept.
+
+    Returns:
+        object: Read-only view of the derived value.
+    """
+    if scope is None:
+        return store.get(f"derived:{key}", builder, sources, validation)
+    return store.get(f"derived:{key}{scope}", builder, sources, validation, group=f"derived:{key}", limit=MAX_SCOPES)
+
+def metrics():
+    """Cache metrics for every dataset loaded in this process."""
+    return store.metrics()
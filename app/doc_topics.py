@@ -0,0 +1,270 @@
+# app/doc_topics.py
+
+"""
+Compact, memory-mapped store of every restaurant's topic mixture.
+- lda.transform's full doc-topic matrix is kept (not just its argmax) as a
+  float16 .npy file (float32 optional) under data/artifacts/doc_topics/
+- Rows are keyed by a 64-bit restaurant ID hashed from name and address, so
+  tables with another row order or subset (e.g. the scene map) can be aligned
+- Topics are summed into scene shares with a topic → scene table, and scene
+  shares are filtered by per-scene minimums or a weighted mixture score, all
+  as vectorized NumPy over the aligned rows
+- Written chunk by chunk (sharded and streamed corpora never hold it whole);
+  the manifest is written last and marks a finished store
+"""
+
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from app.artifacts import ARTIFACT_DIR
+
+# Paths
+DOC_TOPIC_DIR = os.path.join(ARTIFACT_DIR, "doc_topics")
+
+# Storage precision of the topic shares (float16 keeps about 3 significant digits)
+DOC_TOPIC_DTYPE = np.float16
+
+# Columns hashed into a restaurant ID
+ID_COLUMNS = ["restaurant", "address"]
+
+def restaurant_ids(df):
+    """
+    Stable 64-bit IDs for restaurants, hashed from their name and address.
+
+    Args:
+        df (pd.DataFrame): Table with `restaurant` and `address` columns.
+
+    Returns:
+        np.ndarray: uint64 ID per row.
+    """
+    return pd.util.hash_pandas_object(df[ID_COLUMNS].astype(str), index=False).to_numpy()
+
+class IdIndex:
+    """
+    Row lookup for an array of restaurant IDs (sorted once, binary-searched per query).
+
+    Args:
+        ids (np.ndarray): Restaurant ID of each row.
+    """
+
+    def __init__(self, ids):
+        self._order = np.argsort(ids, kind="stable")
+        self._sorted_ids = np.asarray(ids)[self._order]
+
+    def positions(self, ids):
+        """
+        Row of each restaurant ID.
+
+        Args:
+            ids (np.ndarray): Restaurant IDs (see restaurant_ids).
+
+        Returns:
+            np.ndarray: int64 row per ID, -1 where there is no such restaurant.
+            Repeated IDs resolve to their first row.
+        """
+        ids = np.asarray(ids, dtype=np.uint64)
+        rows = np.full(len(ids), -1, dtype=np.int64)
+        if len(self._sorted_ids):
+            found = np.searchsorted(self._sorted_ids, ids)
+            found[found == len(self._sorted_ids)] = 0
+            hit = self._sorted_ids[found] == ids
+            rows[hit] = self._order[found[hit]]
+        return rows
+
+class DocTopicWriter:
+    """
+    Write the doc-topic matrix block by block into a preallocated memory map.
+
+    The store only replaces the existing one once the writer is closed
+    without error.
+
+    Args:
+        n_rows (int): Total number of restaurants.
+        n_topics (int): Number of topics.
+        directory (str): Store directory.
+        dtype (np.dtype): Storage precision (float16 or float32).
+    """
+
+    def __init__(self, n_rows, n_topics, directory=DOC_TOPIC_DIR, dtype=DOC_TOPIC_DTYPE):
+        self.directory = directory
+        self.rows = 0
+        os.makedirs(directory, exist_ok=True)
+        self._weights = np.lib.format.open_memmap(
+            os.path.join(directory, "weights.npy.tmp"), mode="w+", dtype=dtype, shape=(n_rows, n_topics)
+        )
+        self._ids = np.lib.format.open_memmap(
+            os.path.join(directory, "ids.npy.tmp"), mode="w+", dtype=np.uint64, shape=(n_rows,)
+        )
+
+    def write(self, doc_topic, ids):
+        """
+        Append the topic mixtures of the next rows.
+
+        Args:
+            doc_topic (np.ndarray): (rows, n_topics) output of lda.transform.
+            ids (np.ndarray): Restaurant IDs of these rows.
+        """
+        end = self.rows + len(doc_topic)
+        self._weights[self.rows:end] = doc_topic
+        self._ids[self.rows:end] = ids
+        self.rows = end
+
+    def close(self):
+        """Flush the files, move them into place and write the manifest."""
+        if self._weights is None:
+            return
+        if self.rows != len(self._ids):
+            raise ValueError(f"Wrote {self.rows} of {len(self._ids)} rows.")
+        manifest = {
+            "rows": self.rows,
+            "n_topics": int(self._weights.shape[1]),
+            "dtype": self._weights.dtype.name,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        for array in (self._weights, self._ids):
+            array.flush()
+        self._weights = self._ids = None
+
+        # The old manifest goes first, so a crash mid-swap never leaves it describing new files
+        manifest_path = os.path.join(self.directory, "manifest.json")
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        for name in ("weights.npy", "ids.npy"):
+            os.replace(os.path.join(self.directory, f"{name}.tmp"), os.path.join(self.directory, name))
+        with open(f"{manifest_path}.tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    def abort(self):
+        """Discard everything written so far."""
+        if self._weights is None:
+            return
+        self._weights = self._ids = None
+        for name in ("weights.npy", "ids.npy"):
+            os.remove(os.path.join(self.directory, f"{name}.tmp"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def doc_topics_exist(directory=DOC_TOPIC_DIR):
+    """True if the directory holds a finished doc-topic store."""
+    return os.path.exists(os.path.join(directory, "manifest.json"))
+
+class DocTopicStore:
+    """
+    Read-only, memory-mapped doc-topic matrix keyed by restaurant ID.
+
+    Args:
+        directory (str): Store directory written by DocTopicWriter.
+    """
+
+    def __init__(self, directory=DOC_TOPIC_DIR):
+        with open(os.path.join(directory, "manifest.json"), "r") as f:
+            self.manifest = json.load(f)
+        self.weights = np.load(os.path.join(directory, "weights.npy"), mmap_mode="r")
+        self.ids = np.load(os.path.join(directory, "ids.npy"), mmap_mode="r")
+        if self.weights.shape != (self.manifest["rows"], self.manifest["n_topics"]):
+            raise ValueError(f"Doc-topic store in {directory} does not match its manifest.")
+        self.n_topics = self.manifest["n_topics"]
+        self._index = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def positions(self, ids):
+        """Store row of each restaurant ID, -1 where missing (see IdIndex.positions)."""
+        if self._index is None:
+            self._index = IdIndex(self.ids)
+        return self._index.positions(ids)
+
+    def group_shares(self, ids, topic_groups, n_groups, block_rows=1 << 20):
+        """
+        Topic shares summed into groups (e.g. scenes), aligned with a list of restaurants.
+
+        Args:
+            ids (np.ndarray): Restaurant IDs of the rows wanted, in the caller's order.
+            topic_groups (sequence): Group index of each topic; -1 leaves a topic out.
+            n_groups (int): Number of groups.
+            block_rows (int): Rows converted to float32 at a time.
+
+        Returns:
+            np.ndarray: (len(ids), n_groups) float32 shares; all zeros for
+            restaurants missing from the store.
+        """
+        topic_groups = np.asarray(topic_groups)
+        membership = np.zeros((self.n_topics, n_groups), dtype=np.float32)
+        kept = topic_groups >= 0
+        membership[np.flatnonzero(kept), topic_groups[kept]] = 1.0
+
+        rows = self.positions(ids)
+        shares = np.zeros((len(rows), n_groups), dtype=np.float32)
+        present = np.flatnonzero(rows >= 0)
+        for start in range(0, len(present), block_rows):
+            block = present[start:start + block_rows]
+            shares[block] = self.weights[rows[block]].astype(np.float32) @ membership
+        return shares
+
+def topic_groups(topic_labels, groups):
+    """
+    Group index of each topic, for DocTopicStore.group_shares.
+
+    Args:
+        topic_labels (pd.Series): Group label (e.g. scene) indexed by topic_id.
+        groups (sequence): The groups, in column order.
+
+    Returns:
+        np.ndarray: Group index per topic (0..max topic_id), -1 for topics
+        without a label or whose label is not in groups.
+    """
+    position = {group: i for i, group in enumerate(groups)}
+    result = np.full(int(topic_labels.index.max()) + 1, -1, dtype=np.int64)
+    for topic_id, label in topic_labels.items():
+        result[int(topic_id)] = position.get(label, -1)
+    return result
+
+def select_mixture(shares, min_share=None, weights=None, min_score=0.0):
+    """
+    Rows whose group shares pass per-group minimums and a weighted mixture score.
+
+    Args:
+        shares (np.ndarray): (rows, n_groups) output of DocTopicStore.group_shares.
+        min_share (sequence): Minimum share per group (0 disables a group's check).
+        weights (sequence): Weight per group for the score shares @ weights.
+        min_score (float): Minimum mixture score; ignored when every weight is 0.
+
+    Returns:
+        np.ndarray: Boolean mask over the rows.
+    """
+    mask = np.ones(len(shares), dtype=bool)
+    if min_share is not None:
+        min_share = np.asarray(min_share, dtype=np.float32)
+        active = np.flatnonzero(min_share > 0)
+        if len(active):
+            mask &= (shares[:, active] >= min_share[active]).all(axis=1)
+    if weights is not None and min_score > 0 and np.any(np.asarray(weights) > 0):
+        mask &= mixture_scores(shares, weights) >= min_score
+    return mask
+
+def mixture_scores(shares, weights):
+    """
+    Weighted mixture score per row: the sum of each group's share times its weight.
+
+    With weights of 1 and 0 this is the combined share of the chosen groups
+    (e.g. Romantic + Gourmet); fractional weights discount a group.
+
+    Args:
+        shares (np.ndarray): (rows, n_groups) group shares.
+        weights (sequence): Non-negative weight per group.
+
+    Returns:
+        np.ndarray: float32 score per row.
+    """
+    return shares @ np.asarray(weights, dtype=np.float32)
@@ -0,0 +1,90 @@
+# app/filter_index.py
+
+"""
+Precomputed filter index for the map page's star, price and cuisine filters.
+- One packed row bitset per star value, price level and cuisine tag
+- A filter combination resolves with vectorized OR/AND over bitsets
+- Built once per dataset version (cache it through app.data_access)
+"""
+
+import numpy as np
+
+def _bitset(mask):
+    return np.packbits(np.asarray(mask, dtype=bool))
+
+class FilterIndex:
+    """
+    Bitset index over a restaurant table.
+
+    Args:
+        df (pd.DataFrame): Restaurant table; row positions in query results
+            refer to this frame.
+        star_col (str): Column with Michelin stars.
+        price_col (str): Column with the price level.
+        tag_col (str): Column with comma-separated cuisine tags.
+    """
+
+    def __init__(self, df, star_col="star", price_col="price($)", tag_col="tag"):
+        self.n_rows = len(df)
+        self.stars = self._value_bitsets(df[star_col].reset_index(drop=True))
+        self.prices = self._value_bitsets(df[price_col].reset_index(drop=True))
+        self.cuisines = self._tag_bitsets(df[tag_col].reset_index(drop=True))
+        self._all = _bitset(np.ones(self.n_rows, dtype=bool))
+        self._none = np.zeros_like(self._all)
+
+    def _value_bitsets(self, values):
+        return {
+            value.item() if hasattr(value, "item") else value: _bitset(values == value)
+            for value in values.dropna().unique()
+        }
+
+    def _tag_bitsets(self, tags):
+        # Explode "Korean, Steakhouse" into (row position, cuisine) pairs once
+        exploded = tags.dropna().astype(str).str.split(",").explode().str.strip()
+        exploded = exploded[exploded != ""]
+        bitsets = {}
+        for cuisine, positions in exploded.groupby(exploded).indices.items():
+            mask = np.zeros(self.n_rows, dtype=bool)
+            mask[exploded.index.to_numpy()[positions]] = True
+            bitsets[cuisine] = _bitset(mask)
+        return bitsets
+
+    def _union(self, bitsets, keys):
+        selected = [bitsets[key] for key in keys if key in bitsets]
+        if not selected:
+            return self._none
+        return np.bitwise_or.reduce(selected)
+
+    def query_bitset(self, stars=None, prices=None, cuisines=None):
+        """
+        Resolve a filter combination to a packed row bitset.
+
+        Each argument is a collection of accepted values; None (or an empty
+        collection for stars/prices) leaves that filter off. An empty cuisine
+        selection matches nothing, as on the map page.
+
+        Returns:
+            np.ndarray: Packed bitset of matching rows.
+        """
+        result = self._all
+        if stars:
+            result = result & self._union(self.stars, stars)
+        if prices:
+            result = result & self._union(self.prices, prices)
+        if cuisines is not None:
+            result = result & self._union(self.cuisines, cuisines)
+        return result
+
+    def query(self, stars=None, prices=None, cuisines=None):
+        """
+        Row positions matching a filter combination, in ascending order.
+
+        Returns:
+            np.ndarray: Positions usable with DataFrame.iloc.
+        """
+        bits = self.query_bitset(stars, prices, cuisines)
+        return np.flatnonzero(np.unpackbits(bits, count=self.n_rows))
+
+    def count(self, stars=None, prices=None, cuisines=None):
+        """Number of rows matching a filter combination."""
+        return int(np.unpackbits(self.query_bitset(stars, prices, cuisines), count=self.n_rows).sum())
@@ -0,0 +1,279 @@
+# app/instrumentation.py
+
+"""
+Lightweight stage-level instrumentation for the pipeline and the Streamlit pages.
+- span("lda.fit", rows=n) context manager and @instrumented("name") decorator
+- Records wall time, process CPU time, row counts and (optionally) peak traced allocations
+- Spans nest: each record carries its parent's name
+- Recent spans are kept in memory for the pages' debug panel, optionally appended
+  to a JSONL log, and optionally exposed on a local Prometheus-style endpoint
+- Disabled by default; a disabled span is a shared no-op object
+
+Enable with environment variables:
+    FW_INSTRUMENT=1          timing and row counts
+    FW_INSTRUMENT=memory     also peak allocations (tracemalloc; slower)
+    FW_INSTRUMENT_LOG=path   JSONL sink (default data/logs/spans.jsonl)
+    FW_METRICS_PORT=9464     serve aggregated metrics on http://127.0.0.1:<port>/metrics
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Paths
+SPAN_LOG_PATH = os.path.join("data", "logs", "spans.jsonl")
+
+# Spans kept in memory for the debug panel
+RECENT_SPANS = 500
+
+_state = {"enabled": False, "memory": False, "log_path": None, "server": None}
+_recent = deque(maxlen=RECENT_SPANS)
+_totals = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+class _NullSpan:
+    # Stand-in returned while instrumentation is disabled
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+# Span attributes that are not copied into the record as extra fields
+_SPAN_FIELDS = {"name", "rows", "attrs", "parent"}
+
+class Span:
+    """
+    One timed region. Set `rows`, or any other public attribute, inside the block to
+    add it to the record.
+
+    Args:
+        name (str): Dotted span name, e.g. "lda.fit".
+        rows (int): Number of rows the stage handled, if known.
+        **attrs: Extra JSON-serializable fields stored with the record.
+    """
+
+    def __init__(self, name, rows=None, **attrs):
+        self.name = name
+        self.rows = rows
+        self.attrs = attrs
+        self._peak = 0
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1] if stack else None
+        stack.append(self)
+
+        if _state["memory"]:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None:
+                self.parent._peak = max(self.parent._peak, peak)
+            tracemalloc.reset_peak()
+            self._start_mem = current
+
+        self._start_cpu = time.process_time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall_s = time.perf_counter() - self._start
+        cpu_s = time.process_time() - self._start_cpu
+        _local.stack.pop()
+
+        record = {
+            "name": self.name,
+            "parent": self.parent.name if self.parent is not None else None,
+            "start": time.time() - wall_s,
+            "wall_s": wall_s,
+            "cpu_s": cpu_s,
+            "rows": self.rows,
+            "peak_mb": None,
+            "error": exc_type.__name__ if exc_type else None,
+        }
+        if _state["memory"]:
+            self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+            record["peak_mb"] = max(self._peak - self._start_mem, 0) / 1e6
+            if self.parent is not None:
+                self.parent._peak = max(self.parent._peak, self._peak)
+        record.update(self.attrs)
+        record.update((k, v) for k, v in vars(self).items() if k not in _SPAN_FIELDS and not k.startswith("_"))
+        _record(record)
+        return False
+
+def _record(record):
+    with _lock:
+        _recent.append(record)
+        totals = _totals.setdefault(record["name"], {"count": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows": 0, "peak_mb": None})
+        totals["count"] += 1
+        totals["wall_s"] += record["wall_s"]
+        totals["cpu_s"] += record["cpu_s"]
+        totals["rows"] += record["rows"] or 0
+        if record["peak_mb"] is not None:
+            totals["peak_mb"] = max(totals["peak_mb"] or 0.0, record["peak_mb"])
+        if _state["log_path"]:
+            with open(_state["log_path"], "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+def enabled():
+    """Whether spans are currently recorded."""
+    return _state["enabled"]
+
+def enable(memory=False, log_path=None, metrics_port=None):
+    """
+    Turn instrumentation on.
+
+    Args:
+        memory (bool): Also record peak allocations with tracemalloc.
+        log_path (str): Append span records as JSON lines to this file.
+        metrics_port (int): Serve aggregated metrics on this local port.
+    """
+    _state["enabled"] = True
+    _state["memory"] = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if log_path:
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+    _state["log_path"] = log_path
+    if metrics_port and _state["server"] is None:
+        _state["server"] = serve_metrics(metrics_port)
+
+def disable():
+    """Turn instrumentation off (collected spans are kept)."""
+    _state["enabled"] = False
+    if _state["memory"] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _state["memory"] = False
+
+def span(name, rows=None, **attrs):
+    """
+    Time a block of code.
+
+    Example:
+        with span("lda.vectorize", rows=len(df)) as s:
+            ...
+            s.rows = X.shape[0]
+
+    Returns:
+        Span: A recording span, or a shared no-op when instrumentation is off.
+    """
+    if not _state["enabled"]:
+        return _NULL_SPAN
+    return Span(name, rows, **attrs)
+
+def instrumented(name=None):
+    """
+    Decorator that wraps every call of a function in a span.
+
+    Args:
+        name (str): Span name; defaults to module.function.
+    """
+    def decorator(func):
+        span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state["enabled"]:
+                return func(*args, **kwargs)
+            with Span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def recent_spans():
+    """Most recent span records, oldest first."""
+    with _lock:
+        return list(_recent)
+
+def summary():
+    """
+    Aggregated statistics per span name.
+
+    Returns:
+        pd.DataFrame: count, total and mean wall/CPU seconds, rows and max peak MB.
+    """
+    import pandas as pd
+    with _lock:
+        rows = [{"span": name, **t} for name, t in _totals.items()]
+    df = pd.DataFrame(rows, columns=["span", "count", "wall_s", "cpu_s", "rows", "peak_mb"])
+    df["mean_wall_s"] = df["wall_s"] / df["count"]
+    return df.sort_values("wall_s", ascending=False, ignore_index=True)
+
+def reset():
+    """Forget recorded spans and totals."""
+    with _lock:
+        _recent.clear()
+        _totals.clear()
+
+def prometheus_text():
+    """Aggregated metrics in the Prometheus text exposition format."""
+    lines = []
+    metrics = [("count", "fw_span_calls_total"), ("wall_s", "fw_span_wall_seconds_total"),
+               ("cpu_s", "fw_span_cpu_seconds_total"), ("rows", "fw_span_rows_total"),
+               ("peak_mb", "fw_span_peak_megabytes")]
+    with _lock:
+        for key, metric in metrics:
+            lines.append(f"# TYPE {metric} {'gauge' if key == 'peak_mb' else 'counter'}")
+            for name, totals in _totals.items():
+                if totals[key] is None:
+                    continue
+                lines.append(f'{metric}{{span="{name}"}} {totals[key]}')
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def serve_metrics(port, host="127.0.0.1"):
+    """
+    Serve aggregated span metrics from a background thread.
+
+    Args:
+        port (int): Local port.
+        host (str): Interface to bind; loopback only by default.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving span metrics on http://{host}:{port}/metrics")
+    return server
+
+def _configure_from_env():
+    mode = os.environ.get("FW_INSTRUMENT", "").strip().lower()
+    if mode in ("", "0", "false", "off"):
+        return
+    port = os.environ.get("FW_METRICS_PORT")
+    enable(
+        memory=mode == "memory",
+        log_path=os.environ.get("FW_INSTRUMENT_LOG", SPAN_LOG_PATH),
+        metrics_port=int(port) if port else None,
+    )
+
+_configure_from_env()
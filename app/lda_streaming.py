@@ -0,0 +1,232 @@
+# app/lda_streaming.py
+
+"""
+Streaming (online) LDA training with bounded memory.
+- Reads descriptions in chunks from the michelin_full artifact
+- Pass 1: tokenize each chunk, count document frequencies and spill tokens to disk
+- Pass 2: vectorize each chunk with the fixed TF-IDF vocabulary and call partial_fit
+- Pass 3: assign dominant topics chunk by chunk and write the output incrementally,
+  tallying per-topic counts and exemplars for the topic report and storing each
+  restaurant's topic mixture (app.doc_topics)
+- Peak memory depends on the chunk size and vocabulary, not the corpus size
+- Progress is checkpointed so an interrupted run resumes where it stopped
+"""
+
+import hashlib
+import os
+import pickle
+import shutil
+from collections import Counter
+from contextlib import nullcontext
+from itertools import islice
+import numpy as np
+from tqdm import tqdm
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.decomposition import LatentDirichletAllocation
+from app.artifacts import ArtifactWriter, artifact_num_rows, artifact_path, iter_artifact_batches
+from app.doc_topics import DocTopicWriter, restaurant_ids
+from app.instrumentation import span
+from app.nlp_topic_modeling import (
+    NUM_TOPICS, STOPWORDS_PATH, TOP_WORDS, TOPIC_KEYWORDS_PATH, display_topics, load_stopwords,
+    save_topic_keywords, tokenize_descriptions, tokenizer_fingerprint, tokenizer_pool,
+)
+from app.stemmer_custom import get_stem_cache
+from app.topic_model import save_topic_model
+from app.topic_report import TopicTally, build_topic_report, save_topic_report
+
+# Paths
+STREAM_DIR = os.path.join("data", "cache", "lda_stream")
+CHECKPOINT_PATH = os.path.join(STREAM_DIR, "checkpoint.pkl")
+
+# Defaults
+STREAM_CHUNK_SIZE = 1000
+CHECKPOINT_EVERY = 5
+
+def _token_chunk_path(index):
+    return os.path.join(STREAM_DIR, f"tokens_{index:06d}.pkl")
+
+def _write_pickle(obj, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+def _read_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def stream_fingerprint(source, stopwords_custom, chunk_size, n_topics, n_epochs):
+    """
+    Identify a streaming run so a checkpoint is only resumed with the same inputs.
+
+    Args:
+        source (str): Artifact the descriptions are read from.
+        stopwords_custom (set): Stopwords used by the tokenizer.
+        chunk_size (int): Descriptions per chunk.
+        n_topics (int): Number of LDA topics.
+        n_epochs (int): Passes over the corpus during training.
+
+    Returns:
+        str: Hash of the source file state and run configuration.
+    """
+    stat = os.stat(artifact_path(source))
+    key = f"{source}|{stat.st_size}|{stat.st_mtime_ns}|{tokenizer_fingerprint(stopwords_custom)}|{chunk_size}|{n_topics}|{n_epochs}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def iter_token_chunks(source, stopwords_custom, chunk_size=STREAM_CHUNK_SIZE, skip=0, executor=None):
+    """
+    Generator pipeline: read -> tokenize, one chunk at a time.
+
+    Args:
+        source (str): Artifact with a `description` column.
+        stopwords_custom (set): Stopwords to drop before stemming.
+        chunk_size (int): Descriptions per chunk.
+        skip (int): Number of leading chunks to skip without tokenizing.
+        executor (ProcessPoolExecutor): Optional pool from tokenizer_pool().
+
+    Yields:
+        tuple: (chunk DataFrame, list of token lists)
+    """
+    for chunk in islice(iter_artifact_batches(source, batch_size=chunk_size), skip, None):
+        tokens = tokenize_descriptions(chunk["description"], stopwords_custom, executor=executor)
+        yield chunk, tokens
+
+def build_vectorizer(doc_freq, n_docs):
+    """
+    Build a TF-IDF vectorizer from streamed document frequencies.
+
+    Produces the same vocabulary and IDF weights as fitting TfidfVectorizer()
+    on the whole corpus at once.
+
+    Args:
+        doc_freq (Counter): Number of documents containing each term.
+        n_docs (int): Number of documents seen.
+
+    Returns:
+        TfidfVectorizer: Vectorizer ready for transform().
+    """
+    vocabulary = sorted(doc_freq)
+    df = np.array([doc_freq[term] for term in vocabulary], dtype=np.float64)
+    vectorizer = TfidfVectorizer(vocabulary={term: i for i, term in enumerate(vocabulary)})
+    vectorizer.idf_ = np.log((1 + n_docs) / (1 + df)) + 1
+    return vectorizer
+
+def _new_state(fingerprint):
+    return {
+        "fingerprint": fingerprint,
+        "phase": "tokenize",
+        "chunks": 0,
+        "n_docs": 0,
+        "doc_freq": Counter(),
+        "epoch": 0,
+        "trained_chunks": 0,
+        "lda": None,
+    }
+
+def _load_state(fingerprint, resume):
+    if resume and os.path.exists(CHECKPOINT_PATH):
+        state = _read_pickle(CHECKPOINT_PATH)
+        if state.get("fingerprint") == fingerprint:
+            return state
+        print("Checkpoint belongs to a different run configuration; starting over.")
+    shutil.rmtree(STREAM_DIR, ignore_errors=True)
+    os.makedirs(STREAM_DIR, exist_ok=True)
+    return _new_state(fingerprint)
+
+def run_streaming_lda(chunk_size=STREAM_CHUNK_SIZE, n_topics=NUM_TOPICS, n_epochs=1, n_jobs=1,
+                      resume=True, checkpoint_every=CHECKPOINT_EVERY, source="michelin_full"):
+    """
+    Train LDA in online mode over a stream of description chunks.
+
+    Writes the michelin_with_topics artifact and lda_topic_keywords.csv,
+    like run_lda_on_descriptions, without holding the corpus in memory.
+
+    Args:
+        chunk_size (int): Descriptions per chunk; bounds peak memory.
+        n_topics (int): Number of LDA topics.
+        n_epochs (int): Passes over the corpus with partial_fit.
+        n_jobs (int): Worker processes for tokenization (-1 = all cores).
+        resume (bool): Continue from a matching checkpoint if one exists.
+        checkpoint_every (int): Save progress every this many chunks.
+        source (str): Artifact with the restaurant descriptions.
+    """
+    stopwords_custom = load_stopwords(STOPWORDS_PATH)
+    n_rows = artifact_num_rows(source)
+    n_chunks = (n_rows + chunk_size - 1) // chunk_size
+    state = _load_state(stream_fingerprint(source, stopwords_custom, chunk_size, n_topics, n_epochs), resume)
+    get_stem_cache()
+
+    pool = tokenizer_pool(stopwords_custom, n_jobs) if n_jobs != 1 else nullcontext()
+    with pool as executor:
+        # Pass 1: tokenize, count document frequencies, spill tokens
+        if state["phase"] == "tokenize":
+            with span("stream.tokenize", rows=n_rows, n_jobs=n_jobs):
+                analyze = TfidfVectorizer().build_analyzer()
+                progress = tqdm(total=n_chunks, initial=state["chunks"], desc="Tokenizing", unit="chunk")
+                for chunk, tokens in iter_token_chunks(source, stopwords_custom, chunk_size, state["chunks"], executor):
+                    _write_pickle(tokens, _token_chunk_path(state["chunks"]))
+                    for doc_tokens in tokens:
+                        state["doc_freq"].update(set(analyze(" ".join(doc_tokens))))
+                    state["n_docs"] += len(tokens)
+                    state["chunks"] += 1
+                    progress.update(1)
+                    if state["chunks"] % checkpoint_every == 0:
+                        _write_pickle(state, CHECKPOINT_PATH)
+                progress.close()
+            state["phase"] = "train"
+            _write_pickle(state, CHECKPOINT_PATH)
+
+    vectorizer = build_vectorizer(state["doc_freq"], state["n_docs"])
+
+    # Pass 2: vectorize each spilled chunk and update the model online
+    if state["phase"] == "train":
+        if state["lda"] is None:
+            state["lda"] = LatentDirichletAllocation(
+                n_components=n_topics, learning_method="online", total_samples=state["n_docs"], random_state=42
+            )
+        lda = state["lda"]
+        with span("stream.fit", rows=state["n_docs"], n_topics=n_topics, n_epochs=n_epochs):
+            while state["epoch"] < n_epochs:
+                progress = tqdm(total=state["chunks"], initial=state["trained_chunks"],
+                                desc=f"Training epoch {state['epoch'] + 1}/{n_epochs}", unit="chunk")
+                for index in range(state["trained_chunks"], state["chunks"]):
+                    tokens = _read_pickle(_token_chunk_path(index))
+                    lda.partial_fit(vectorizer.transform(" ".join(t) for t in tokens))
+                    state["trained_chunks"] = index + 1
+                    progress.update(1)
+                    if state["trained_chunks"] % checkpoint_every == 0:
+                        _write_pickle(state, CHECKPOINT_PATH)
+                progress.close()
+                state["epoch"] += 1
+                state["trained_chunks"] = 0
+                _write_pickle(state, CHECKPOINT_PATH)
+        state["phase"] = "assign"
+        _write_pickle(state, CHECKPOINT_PATH)
+
+    lda = state["lda"]
+    feature_names = vectorizer.get_feature_names_out()
+    print("\nTop words per topic:")
+    display_topics(lda, feature_names, TOP_WORDS)
+
+    # Pass 3: assign dominant topics and write the output incrementally
+    tally = TopicTally(lda.n_components)
+    with span("stream.transform", rows=n_rows), ArtifactWriter("michelin_with_topics") as writer, \
+            DocTopicWriter(n_rows, lda.n_components) as doc_topics:
+        batches = iter_artifact_batches(source, batch_size=chunk_size)
+        for index, chunk in enumerate(tqdm(batches, total=state["chunks"], desc="Assigning topics", unit="chunk")):
+            tokens = _read_pickle(_token_chunk_path(index))
+            chunk = chunk.assign(tokens=tokens)
+            X_topics = lda.transform(vectorizer.transform(" ".join(t) for t in tokens))
+            chunk["dominant_topic"] = tally.update(X_topics, chunk["restaurant"])
+            doc_topics.write(X_topics, restaurant_ids(chunk))
+            writer.write(chunk)
+    print(f"Saved processed data with topics to {writer.path}")
+
+    with span("stream.save"):
+        save_topic_keywords(lda, feature_names, TOPIC_KEYWORDS_PATH)
+        save_topic_report(build_topic_report(lda, feature_names, tally, top_n=TOP_WORDS))
+        save_topic_model(vectorizer, lda, stopwords_custom)
+        get_stem_cache().save()
+
+    # Run finished: drop the checkpoint and spilled tokens
+    shutil.rmtree(STREAM_DIR, ignore_errors=True)
@@ -5,46 +5,129 @@ Main entry point for the NYC Michelin Restaurants NLP and Mapping project (Manua
 
 This script allows you to:
 - Run LDA topic modeling on Michelin restaurant descriptions.
+- Train LDA in streaming (online) mode with bounded memory and resumable checkpoints.
+- Sweep topic counts in parallel and pick the best model.
 - Save topic keywords for manual labeling.
 - Manually assign consumer scenes (by editing a CSV).
 - Merge consumer scene labels back to the restaurant-level dataset.
 - Visualize spatial patterns by topic and Michelin stars.
+- Run the whole pipeline headlessly, skipping stages whose inputs are unchanged.
+- Add a city's restaurants as a new partition without touching the other cities.
+
+Each task imports its own modules when chosen, so the menu and `run --dry-run`
+start without loading scikit-learn or nltk.
 
 Instructions:
-- This script does NOT execute all steps automatically.
-- Please select a task from the menu to run it explicitly.
+- Without arguments, select a task from the interactive menu.
+- For scheduled jobs, use the non-interactive runner:
+    python -m app.main run                      # every stage that is out of date
+    python -m app.main run scene_map --jobs 2   # one stage and what it depends on
+    python -m app.main run --force lda          # rerun a stage even if nothing changed
+    python -m app.main run --dry-run            # show what would run
+    python -m app.main add-city data/michelin_chicago.xlsx --city Chicago --model city
 """
 
-import os
-from app import nlp_topic_modeling, apply_scene_tags, visualization
+import argparse
+import sys
 
 def print_menu():
     print("\nSelect a task to perform:")
     print("1. Run LDA Topic Modeling on Descriptions")
     print("2. Apply Manually Labeled Consumer Scene Tags")
     print("3. Visualize Restaurant Distributions on Map")
+    print("4. Run Streaming (Online) LDA Topic Modeling")
+    print("5. Sweep Topic Counts and Select the Best Model")
+    print("6. Run the Full Pipeline (skips unchanged stages)")
     print("0. Exit")
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Michelin restaurants NLP and mapping pipeline.")
+    commands = parser.add_subparsers(dest="command")
+    run = commands.add_parser("run", help="Run pipeline stages without prompts.")
+    run.add_argument("stages", nargs="*", help="Stages to bring up to date (default: all): count, vectorize, "
+                     "lda, assign_topics, keywords, similarity, partition, cities, search, scene_merge, scene_map.")
+    run.add_argument("--force", nargs="*", default=None, metavar="STAGE", help="Rerun these stages (no names = all).")
+    run.add_argument("--jobs", type=int, default=2, help="Stages run concurrently.")
+    run.add_argument("--tokenize-jobs", type=int, default=-1, help="Worker processes for tokenization (-1 = all cores).")
+    run.add_argument("--n-topics", type=int, default=None, help="Number of LDA topics (default: NUM_TOPICS).")
+    run.add_argument("--dry-run", action="store_true", help="Only show which stages would run.")
+    add_city = commands.add_parser("add-city", help="Add or replace a city's restaurants (then `run cities`).")
+    add_city.add_argument("path", help=".xlsx or .csv file with the michelin_full columns.")
+    add_city.add_argument("--city", default=None, help="City of every row (default: `city` column or the addresses).")
+    add_city.add_argument("--model", choices=["global", "city"], default=None,
+                          help="Topic model: the shared global one or the city's own (default: global).")
+    return parser.parse_args(argv)
+
+def run_headless(args):
+    from app import pipeline
+
+    # A bare --force reruns everything selected
+    force = ["all"] if args.force == [] else (args.force or [])
+    try:
+        status = pipeline.run_pipeline(
+            targets=args.stages, force=force, jobs=args.jobs, n_jobs=args.tokenize_jobs,
+            n_topics=args.n_topics or pipeline.NUM_TOPICS, dry_run=args.dry_run,
+        )
+    except ValueError as e:
+        sys.exit(str(e))
+    if any(result in ("failed", "not run") for result in status.values()):
+        sys.exit(1)
+
+def add_city(args):
+    from app import city_partitions
+
+    try:
+        city_partitions.import_city(args.path, city=args.city, model=args.model)
+    except (OSError, ValueError) as e:
+        sys.exit(str(e))
+    print(city_partitions.city_summary().to_string(index=False))
+    print("Run `python -m app.main run cities` to model the new or changed cities.")
+
+def interactive():
     while True:
         print_menu()
-        choice = input("\nEnter your choice (0-3): ").strip()
+        choice = input("\nEnter your choice (0-6): ").strip()
 
         if choice == "1":
-            nlp_topic_modeling.run_lda_on_descriptions()
+            from app import nlp_topic_modeling
+            nlp_topic_modeling.run_lda_on_descriptions(n_jobs=-1)
 
         elif choice == "2":
+            from app import apply_scene_tags
             apply_scene_tags.merge_scene_labels()
 
         elif choice == "3":
+            from app import visualization
             visualization.create_spatial_map()
 
+        elif choice == "4":
+            from app import lda_streaming
+            lda_streaming.run_streaming_lda(n_jobs=-1)
+
+        elif choice == "5":
+            from app import topic_sweep
+            save_best = input("Save the best model's topics and keywords? (y/n): ").strip().lower() == "y"
+            topic_sweep.run_topic_sweep(n_jobs=-1, save_best=save_best)
+
+        elif choice == "6":
+            from app import pipeline
+            pipeline.run_pipeline(n_jobs=-1)
+
         elif choice == "0":
             print("Exiting the program. Goodbye!")
             break
 
         else:
-            print("Invalid choice. Please enter a number from 0 to 3.")
+            print("Invalid choice. Please enter a number from 0 to 6.")
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "run":
+        run_headless(args)
+    elif args.command == "add-city":
+        add_city(args)
+    else:
+        interactive()
 
 if __name__ == "__main__":
     main()
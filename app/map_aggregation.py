@@ -0,0 +1,179 @@
+# app/map_aggregation.py
+
+"""
+Level-of-detail aggregation for the map pages.
+- Restaurants are assigned to hexagonal bins in Web Mercator pixel space,
+  once per zoom level, so a hexagon keeps the same on-screen size at every zoom
+- Any filtered row set aggregates with bincount: counts, star mix and
+  dominant scene per bin, plus the hexagon outline for a PolygonLayer
+- choose_detail() picks raw points or hexbins from the point count and zoom
+- Built once per dataset version (cache it through app.data_access)
+"""
+
+import numpy as np
+import pandas as pd
+
+# On-screen hexagon radius and the zoom levels bins are precomputed for
+HEX_RADIUS_PX = 24
+ZOOM_LEVELS = range(3, 16)
+
+# Above this many points the pages switch to hexbins (unless zoomed in past ZOOM_LEVELS)
+MAX_RAW_POINTS = 5000
+
+TILE_SIZE = 256
+SQRT3 = np.sqrt(3)
+AXIAL_OFFSET = 1 << 30
+
+def _to_world(lat, lon):
+    # Web Mercator, scaled to [0, 1) in both axes
+    x = (lon + 180) / 360
+    lat_rad = np.radians(np.clip(lat, -85.0511, 85.0511))
+    y = (1 - np.log(np.tan(lat_rad) + 1 / np.cos(lat_rad)) / np.pi) / 2
+    return x, y
+
+def _from_world(x, y):
+    lon = x * 360 - 180
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y))))
+    return lat, lon
+
+def _hex_round(q, r):
+    # Round fractional axial coordinates to the containing hexagon (cube rounding)
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+def _category_counts(bins, codes, n_bins, n_categories):
+    # (n_bins, n_categories) counts; code -1 (missing value) is skipped
+    known = codes >= 0
+    counts = np.bincount(bins[known] * n_categories + codes[known], minlength=n_bins * n_categories)
+    return counts.reshape(n_bins, n_categories)
+
+def choose_detail(n_points, zoom, mode="auto"):
+    """
+    Decide whether a map draws raw points or hexbins.
+
+    Args:
+        n_points (int): Number of restaurants to show.
+        zoom (float): Zoom level of the view.
+        mode (str): "auto", "points" or "hexbins".
+
+    Returns:
+        str: "points" or "hexbins".
+    """
+    if mode != "auto":
+        return mode
+    if n_points <= MAX_RAW_POINTS or zoom >= ZOOM_LEVELS[-1] + 1:
+        return "points"
+    return "hexbins"
+
+class HexBinIndex:
+    """
+    Per-zoom hexbin assignments over a restaurant table.
+
+    Args:
+        df (pd.DataFrame): Restaurant table; row positions passed to aggregate() refer to it.
+        lat_col (str): Latitude column.
+        lon_col (str): Longitude column.
+        star_col (str): Column with Michelin stars (counted per bin).
+        scene_col (str): Optional column whose most common value per bin is reported.
+        zoom_levels (range): Zoom levels to precompute.
+        radius_px (float): Hexagon radius in screen pixels.
+    """
+
+    def __init__(self, df, lat_col="lat", lon_col="lon", star_col="star", scene_col=None,
+                 zoom_levels=ZOOM_LEVELS, radius_px=HEX_RADIUS_PX):
+        self.n_rows = len(df)
+        self.zoom_levels = zoom_levels
+        self.radius_px = radius_px
+
+        lat = df[lat_col].to_numpy(dtype=float)
+        lon = df[lon_col].to_numpy(dtype=float)
+        self.valid = np.isfinite(lat) & np.isfinite(lon)
+        x, y = _to_world(np.where(self.valid, lat, 0.0), np.where(self.valid, lon, 0.0))
+
+        star_codes, self.star_values = pd.factorize(df[star_col], sort=True)
+        self.star_codes = star_codes.astype(np.int32)
+        if scene_col is not None:
+            scene_codes, self.scene_values = pd.factorize(df[scene_col])
+            self.scene_codes = scene_codes.astype(np.int32)
+        else:
+            self.scene_codes, self.scene_values = None, None
+
+        # For each zoom: bin of every row, and the axial coordinates of each bin
+        self.levels = {}
+        for zoom in zoom_levels:
+            size = self._hex_size(zoom)
+            px, py = x / size, y / size
+            q, r = _hex_round(SQRT3 / 3 * px - py / 3, 2 / 3 * py)
+            # Offset so both axial coordinates pack into one non-negative key
+            keys, bins = np.unique((q + AXIAL_OFFSET) * (1 << 32) + (r + AXIAL_OFFSET), return_inverse=True)
+            self.levels[zoom] = (bins.astype(np.int32), (keys >> 32) - AXIAL_OFFSET, (keys & 0xFFFFFFFF) - AXIAL_OFFSET)
+
+    def _hex_size(self, zoom):
+        # Hexagon radius in world units ([0, 1) spans TILE_SIZE * 2**zoom pixels)
+        return self.radius_px / (TILE_SIZE * 2 ** zoom)
+
+    def level_for(self, zoom):
+        """Precomputed zoom level closest to a view's zoom."""
+        return int(np.clip(round(zoom), self.zoom_levels[0], self.zoom_levels[-1]))
+
+    def aggregate(self, rows, zoom, decimals=None):
+        """
+        Aggregate a set of rows into hexbins.
+
+        Args:
+            rows (array): Row positions (e.g. from FilterIndex.query or SpatialIndex.bbox).
+            zoom (float): Zoom level of the view.
+            decimals (int): Decimals kept for the outline coordinates. None keeps full precision.
+
+        Returns:
+            pd.DataFrame: One row per non-empty bin with lat, lon, polygon,
+            count, stars_<value> counts, star_mix and (if a scene column was
+            given) dominant_scene.
+        """
+        level = self.level_for(zoom)
+        bins_all, q_all, r_all = self.levels[level]
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[self.valid[rows]]
+        n_bins = len(q_all)
+
+        bins = bins_all[rows]
+        counts = np.bincount(bins, minlength=n_bins)
+        occupied = np.flatnonzero(counts)
+
+        # Hexagon centres and outlines, back in lat/lon
+        size = self._hex_size(level)
+        q, r = q_all[occupied], r_all[occupied]
+        cx, cy = size * SQRT3 * (q + r / 2), size * 1.5 * r
+        lat, lon = _from_world(cx, cy)
+        angles = np.radians(np.arange(6) * 60 - 30)
+        vx = cx[:, None] + size * np.cos(angles)[None, :]
+        vy = cy[:, None] + size * np.sin(angles)[None, :]
+        vlat, vlon = _from_world(vx, vy)
+        outlines = np.stack([vlon, vlat], axis=2)
+        if decimals is not None:
+            outlines = outlines.round(decimals)
+
+        result = pd.DataFrame({
+            "lat": lat,
+            "lon": lon,
+            "polygon": outlines.tolist(),
+            "count": counts[occupied],
+        })
+
+        star_counts = _category_counts(bins, self.star_codes[rows], n_bins, len(self.star_values))[occupied]
+        for i, value in enumerate(self.star_values):
+            result[f"stars_{value}"] = star_counts[:, i]
+        result["star_mix"] = [
+            " · ".join(f"{value}★ {n}" for value, n in zip(self.star_values, mix) if n) for mix in star_counts
+        ]
+
+        if self.scene_codes is not None:
+            scene_counts = _category_counts(bins, self.scene_codes[rows], n_bins, len(self.scene_values))[occupied]
+            result["dominant_scene"] = np.asarray(self.scene_values, dtype=object)[scene_counts.argmax(axis=1)]
+        return result
@@ -0,0 +1,55 @@
+# app/map_payload.py
+
+"""
+Compact pydeck payloads for the map pages.
+- st.pydeck_chart ships each Deck to the browser as a JSON spec (no binary transport)
+- Layers get only the fields their accessors and tooltip read, with coordinates
+  rounded to about a metre
+- CompactDeck serializes that spec without indentation, which is smaller and lets
+  the json module use its C encoder
+- payload_stats() measures the spec size and serialization time
+"""
+
+import json
+import time
+import pydeck as pdk
+from pydeck.bindings.json_tools import default_serialize
+
+# Decimals kept for coordinates sent to the browser (5 decimals ≈ 1 m)
+COORD_DECIMALS = 5
+
+def layer_data(df, columns, decimals=COORD_DECIMALS):
+    """
+    Project a table to the fields a layer and its tooltip use.
+
+    Args:
+        df (pd.DataFrame): Rows to draw.
+        columns (list): Columns to keep.
+        decimals (int): Decimals kept for `lat`/`lon`. None keeps full precision.
+
+    Returns:
+        pd.DataFrame: The projected rows with a fresh index.
+    """
+    data = df[columns].reset_index(drop=True)
+    if decimals is not None:
+        for col in ("lat", "lon"):
+            if col in data.columns:
+                data[col] = data[col].round(decimals)
+    return data
+
+class CompactDeck(pdk.Deck):
+    """pdk.Deck whose JSON spec, as sent by st.pydeck_chart, has no whitespace."""
+
+    def to_json(self):
+        return json.dumps(self, sort_keys=True, default=default_serialize, separators=(",", ":"))
+
+def payload_stats(deck):
+    """
+    Size and serialization time of the spec Streamlit would send for a deck.
+
+    Returns:
+        tuple: (bytes, seconds)
+    """
+    start = time.perf_counter()
+    spec = deck.to_json()
+    return len(spec.encode("utf-8")), time.perf_counter() - start
@@ -2,97 +2,655 @@
 
 """
 NLP Topic Modeling for Michelin Restaurant Descriptions
-- Tokenization with custom stopwords
+- Tokenization with custom stopwords (optionally across a process pool)
 - Stemming with custom stemmer
 - TF-IDF vectorization
+- Fused path: raw descriptions straight to sparse term counts in one pass, with the
+  same vocabulary and matrix but no intermediate token lists
+- Masked path: the same matrix from cached pre-stopword counts (app.stopword_mask),
+  so stopword edits skip tokenization
 - LDA topic modeling
-- Assign dominant topic back to each restaurant
+- Assign dominant topic back to each restaurant, and keep every restaurant's full
+  topic mixture in a memory-mapped store (app.doc_topics)
+- Topic summaries (top words, relevance, counts, exemplars) come from app.topic_report
+- Read/write tables through the Parquet artifact layer (Excel export optional)
+- Stages are wrapped in instrumentation spans (no-ops unless FW_INSTRUMENT is set)
+- nltk and scikit-learn are imported when first needed, so importing this module
+  for its settings and helpers stays cheap
 """
 
 import os
+import hashlib
+import multiprocessing
+import threading
+from functools import partial
 import pandas as pd
 import numpy as np
 import re
-import nltk
-from tqdm import tqdm
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.decomposition import LatentDirichletAllocation
-from app.stemmer_custom import stem_tokens
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from app.nltk_resources import ensure_nltk_data
+from app.stemmer_custom import stem_tokens, get_stem_cache, STEMMER_VERSION
+from app.token_store import TokenStore
+from app.artifacts import read_artifact, write_artifact
+from app.instrumentation import span
+from app.doc_topics import DocTopicWriter, restaurant_ids
+from app.topic_report import TopicTally, build_topic_report, save_topic_report, top_terms
 
-def run_lda_on_descriptions():
-    nltk.download('punkt')
-    nltk.download('punkt_tab')
+# Paths
+STOPWORDS_PATH = os.path.join("data", "stopwords_custom.txt")
 
-    # Paths
-    RAW_DATA_PATH = os.path.join("data", "michelin_full.xlsx")
-    STOPWORDS_PATH = os.path.join("data", "stopwords_custom.txt")
-    os.makedirs("data", exist_ok=True)
+# Default number of descriptions handed to a worker at a time
+TOKENIZE_CHUNK_SIZE = 256
 
+# LDA settings
+NUM_TOPICS = 8
+TOP_WORDS = 10
+TOPIC_KEYWORDS_PATH = os.path.join("data", "lda_topic_keywords.csv")
+
+# Bump whenever custom_tokenizer changes so cached tokens are invalidated
+TOKENIZER_VERSION = "1"
+
+def load_stopwords(path=STOPWORDS_PATH):
+    """
+    Load the custom stopword list.
+
+    Args:
+        path (str): Path to a newline-separated stopword file.
+
+    Returns:
+        set: Stopwords as lowercase strings.
+    """
+    with open(path, "r") as f:
+        return set(word.strip() for word in f.readlines())
+
+# Tokenizer function
+def custom_tokenizer(text, stopwords_custom):
+    from nltk.tokenize import word_tokenize  # a dict lookup once nltk is loaded
+    text = text.lower()
+    text = re.sub(r"[^a-zA-Z\s]", "", text)
+    tokens = word_tokenize(text)
+    tokens = [t for t in tokens if t not in stopwords_custom and len(t) > 2]
+    tokens = stem_tokens(tokens)
+    return tokens
+
+def tokenizer_fingerprint(stopwords_custom):
+    """
+    Identify the tokenizer configuration for cached tokens.
+
+    Args:
+        stopwords_custom (set): Stopwords used by custom_tokenizer.
+
+    Returns:
+        str: Hash of the tokenizer version, stemmer version and stopword list.
+    """
+    h = hashlib.sha1()
+    h.update(f"{TOKENIZER_VERSION}|{STEMMER_VERSION}|".encode("utf-8"))
+    h.update("\n".join(sorted(stopwords_custom)).encode("utf-8"))
+    return h.hexdigest()
+
+# Stopwords for pool workers, set once per process by the initializer
+_worker_stopwords = None
+
+def _init_tokenizer_worker(stopwords_custom):
+    global _worker_stopwords
+    _worker_stopwords = stopwords_custom
+    ensure_nltk_data("punkt_tab")
+    # Stems computed here go back to the parent with each chunk's result
+    get_stem_cache().record_new()
+
+def _tokenize_chunk(texts):
+    tokens = [custom_tokenizer(text, _worker_stopwords) for text in texts]
+    return tokens, get_stem_cache().pop_new()
+
+def merge_worker_stems(new_stems):
+    """Add stems a pool worker computed (returned with its chunk) to this process's cache."""
+    get_stem_cache().update(new_stems)
+
+def _resolve_n_jobs(n_jobs):
+    if n_jobs is None or n_jobs < 1:
+        return os.cpu_count() or 1
+    return n_jobs
+
+def pool_context():
+    """
+    Start method for worker pools: the platform default, except fork when other threads run.
+
+    A process forked while another thread holds a lock (the import lock during
+    a lazy import, for one) starts with it held and can hang; the pipeline runs
+    stages in threads, so there workers come from a forkserver instead.
+
+    Returns:
+        multiprocessing context: Pass as `mp_context` to ProcessPoolExecutor.
+    """
+    method = multiprocessing.get_start_method()
+    if method == "fork" and threading.active_count() > 1:
+        method = "forkserver"
+    return multiprocessing.get_context(method)
+
+def tokenizer_pool(stopwords_custom, n_jobs=-1):
+    """
+    Create a process pool whose workers are ready to tokenize.
+
+    Useful when tokenize_descriptions is called many times (e.g. per chunk of
+    a stream), so worker startup is paid once.
+
+    Args:
+        stopwords_custom (set): Stopwords to drop before stemming.
+        n_jobs (int): Number of worker processes (-1 = all cores).
+
+    Returns:
+        ProcessPoolExecutor: Pool to pass as `executor` to tokenize_descriptions.
+    """
+    return ProcessPoolExecutor(
+        max_workers=_resolve_n_jobs(n_jobs),
+        initializer=_init_tokenizer_worker,
+        initargs=(stopwords_custom,),
+        mp_context=pool_context(),
+    )
+
+def tokenize_descriptions(descriptions, stopwords_custom, n_jobs=1, chunk_size=TOKENIZE_CHUNK_SIZE, executor=None):
+    """
+    Tokenize and stem a sequence of descriptions, optionally in parallel.
+
+    Descriptions are split into contiguous chunks and handed to a process
+    pool; results are reassembled in input order, so the output is identical
+    to tokenizing serially.
+
+    Args:
+        descriptions (iterable): Raw description strings.
+        stopwords_custom (set): Stopwords to drop before stemming.
+        n_jobs (int): Number of worker processes. 1 runs in-process,
+            -1 (or None) uses every available core.
+        chunk_size (int): Number of descriptions sent to a worker per task.
+        executor (ProcessPoolExecutor): Existing pool from tokenizer_pool();
+            overrides n_jobs. It must use the same stopwords.
+
+    Returns:
+        list: One list of stemmed tokens per description.
+    """
+    descriptions = list(descriptions)
+    n_jobs = _resolve_n_jobs(n_jobs)
+    chunk_size = max(1, int(chunk_size))
+
+    ensure_nltk_data("punkt_tab")
+
+    # Not worth paying for process startup on a single chunk
+    if (executor is None and n_jobs == 1) or len(descriptions) <= chunk_size:
+        return [custom_tokenizer(text, stopwords_custom) for text in descriptions]
+
+    chunks = [descriptions[i:i + chunk_size] for i in range(0, len(descriptions), chunk_size)]
+    if executor is not None:
+        results = list(executor.map(_tokenize_chunk, chunks))
+    else:
+        with tokenizer_pool(stopwords_custom, min(n_jobs, len(chunks))) as executor:
+            results = list(executor.map(_tokenize_chunk, chunks))
+    tokenized = []
+    for chunk_tokens, new_stems in results:
+        merge_worker_stems(new_stems)
+        tokenized.extend(chunk_tokens)
+    return tokenized
+
+# ---------------------- Fused tokenize + count ----------------------
+# On lowercase letters-and-whitespace text, nltk.word_tokenize reduces to a
+# whitespace split plus these Treebank contraction splits (no other rule can fire)
+TREEBANK_SPLITS = {
+    "cannot": ("can", "not"), "gimme": ("gim", "me"), "gonna": ("gon", "na"),
+    "gotta": ("got", "ta"), "lemme": ("lem", "me"), "wanna": ("wan", "na"),
+}
+_NON_LETTERS = re.compile(r"[^a-zA-Z\s]")
+
+def normalize_terms(text, stopwords_custom, stem=None):
+    """
+    custom_tokenizer's stems for a text, in order, without NLTK's tokenizer.
+
+    Args:
+        text (str): Raw text (a description or a search query).
+        stopwords_custom (set): Stopwords to drop before stemming.
+        stem (callable): Token -> stem; defaults to the shared stem cache.
+
+    Returns:
+        list: Stemmed tokens, as custom_tokenizer returns them.
+    """
+    stem = get_stem_cache().stem if stem is None else stem
+    return [
+        stem(token)
+        for word in _NON_LETTERS.sub("", text.lower()).split()
+        for token in TREEBANK_SPLITS.get(word, (word,))
+        if len(token) > 2 and token not in stopwords_custom
+    ]
+
+def _count_chunk(texts, stopwords_custom=None):
+    """
+    Term counts for a chunk of descriptions, with chunk-local term ids.
+
+    Applies exactly custom_tokenizer's steps, then keeps stems of two or more
+    characters (what TfidfVectorizer's token pattern accepts), without building
+    token lists or joined strings.
+
+    Returns:
+        tuple: (terms in first-seen order, term ids, counts, row pointers,
+        (token, stem) pairs computed in a pool worker)
+    """
+    stopwords_custom = _worker_stopwords if stopwords_custom is None else stopwords_custom
+    stem_cache = get_stem_cache()
+    stem = stem_cache.stem
+    splits = TREEBANK_SPLITS
+    vocab = {}
+    indices, counts, indptr = array("i"), array("i"), array("q", [0])
+    for text in texts:
+        doc = {}
+        for word in _NON_LETTERS.sub("", text.lower()).split():
+            for token in splits.get(word, (word,)):
+                if len(token) > 2 and token not in stopwords_custom:
+                    term = stem(token)
+                    if len(term) > 1:
+                        j = vocab.setdefault(term, len(vocab))
+                        doc[j] = doc.get(j, 0) + 1
+        indices.extend(doc.keys())
+        counts.extend(doc.values())
+        indptr.append(len(indices))
+    return list(vocab), indices, counts, indptr, stem_cache.pop_new()
+
+def _surface_chunk(texts, stopwords_custom=None):
+    """
+    Like _count_chunk, but counts the tokens custom_tokenizer would stem
+    (lowercase, letters only, longer than two characters) before the stopword
+    filter and stemming.
+    """
+    splits = TREEBANK_SPLITS
+    vocab = {}
+    indices, counts, indptr = array("i"), array("i"), array("q", [0])
+    for text in texts:
+        doc = {}
+        for word in _NON_LETTERS.sub("", text.lower()).split():
+            for token in splits.get(word, (word,)):
+                if len(token) > 2:
+                    j = vocab.setdefault(token, len(vocab))
+                    doc[j] = doc.get(j, 0) + 1
+        indices.extend(doc.keys())
+        counts.extend(doc.values())
+        indptr.append(len(indices))
+    return list(vocab), indices, counts, indptr, []
+
+def count_terms_into(descriptions, stopwords_custom, vocab, n_jobs=1, chunk_size=TOKENIZE_CHUNK_SIZE, executor=None,
+                     dtype=np.int64, surface=False):
+    """
+    Count terms of descriptions against a growing, first-seen-ordered vocabulary.
+
+    New terms are appended to `vocab` in the order they are first seen, so
+    calling this on consecutive batches with the same dict numbers terms
+    exactly as one call on the whole corpus would.
+
+    Args:
+        descriptions (iterable): Raw description strings.
+        stopwords_custom (set): Stopwords to drop before stemming.
+        vocab (dict): Term -> id, extended in place.
+        n_jobs (int): Worker processes (-1 = all cores).
+        chunk_size (int): Descriptions per worker task.
+        executor (ProcessPoolExecutor): Existing pool from tokenizer_pool().
+        dtype (type): Matrix dtype.
+        surface (bool): Count the unstemmed tokens before the stopword filter
+            (the pre-stopword matrix of app.stopword_mask); stopwords_custom is unused.
+
+    Returns:
+        scipy.sparse.csr_matrix: Counts with columns numbered as in `vocab`
+        (rows have sorted indices).
+    """
+    from scipy import sparse
+
+    descriptions = list(descriptions)
+    n_jobs = _resolve_n_jobs(n_jobs)
+    chunk_size = max(1, int(chunk_size))
+    count_chunk = _surface_chunk if surface else _count_chunk
+
+    # Not worth paying for process startup on a single chunk
+    if (executor is None and n_jobs == 1) or len(descriptions) <= chunk_size:
+        results = [count_chunk(descriptions, stopwords_custom)]
+    else:
+        chunks = [descriptions[i:i + chunk_size] for i in range(0, len(descriptions), chunk_size)]
+        if executor is not None:
+            results = list(executor.map(count_chunk, chunks))
+        else:
+            with tokenizer_pool(stopwords_custom, min(n_jobs, len(chunks))) as pool:
+                results = list(pool.map(count_chunk, chunks))
+
+    # Map chunk-local term ids to vocabulary ids straight into preallocated CSR
+    # arrays, releasing each chunk once it is copied
+    nnz = sum(len(result[1]) for result in results)
+    index_dtype = np.int32 if nnz <= np.iinfo(np.int32).max else np.int64
+    data = np.empty(nnz, dtype=dtype)
+    indices = np.empty(nnz, dtype=index_dtype)
+    indptr = np.zeros(len(descriptions) + 1, dtype=index_dtype)
+    row = pos = 0
+    for i, (terms, chunk_indices, chunk_counts, chunk_indptr, new_stems) in enumerate(results):
+        results[i] = None
+        merge_worker_stems(new_stems)
+        local_to_global = np.fromiter((vocab.setdefault(t, len(vocab)) for t in terms), dtype=index_dtype, count=len(terms))
+        end = pos + len(chunk_indices)
+        np.take(local_to_global, np.frombuffer(chunk_indices, dtype=np.int32), out=indices[pos:end])
+        data[pos:end] = np.frombuffer(chunk_counts, dtype=np.int32)
+        n_rows = len(chunk_indptr) - 1
+        indptr[row + 1:row + n_rows + 1] = np.frombuffer(chunk_indptr, dtype=np.int64)[1:] + pos
+        row, pos = row + n_rows, end
+
+    X = sparse.csr_matrix((data, indices, indptr), shape=(len(descriptions), len(vocab)))
+    X.sort_indices()
+    return X
+
+def count_terms(descriptions, stopwords_custom, n_jobs=1, chunk_size=TOKENIZE_CHUNK_SIZE, executor=None,
+                dtype=np.int64):
+    """
+    Tokenize, stem and count descriptions in one pass, straight into a sparse matrix.
+
+    Equivalent to CountVectorizer().fit_transform(" ".join(t) for t in
+    tokenize_descriptions(...)) - same sorted vocabulary, same matrix - but
+    without the intermediate token lists and strings, and without NLTK's
+    sentence tokenizer.
+
+    Args:
+        descriptions (iterable): Raw description strings.
+        stopwords_custom (set): Stopwords to drop before stemming.
+        n_jobs (int): Worker processes (-1 = all cores).
+        chunk_size (int): Descriptions per worker task.
+        executor (ProcessPoolExecutor): Existing pool from tokenizer_pool().
+        dtype (type): Matrix dtype (TfidfVectorizer counts in float64).
+
+    Returns:
+        tuple: (np.ndarray of terms in sorted order, scipy.sparse.csr_matrix of counts)
+    """
+    vocab = {}
+    X = count_terms_into(descriptions, stopwords_custom, vocab, n_jobs=n_jobs, chunk_size=chunk_size,
+                         executor=executor, dtype=dtype)
+    return sort_vocabulary(vocab, X)
+
+def sort_vocabulary(vocab, X):
+    """
+    Rename first-seen-numbered columns alphabetically, as CountVectorizer numbers them.
+
+    Like CountVectorizer, rows stay sorted by first-seen term id and only the
+    column numbers change, so the TF-IDF row norms are summed in the same
+    order and match bit for bit.
+
+    Args:
+        vocab (dict): Term -> first-seen column id.
+        X (scipy.sparse.csr_matrix): Counts with sorted row indices; renamed in place.
+
+    Returns:
+        tuple: (np.ndarray of terms in sorted order, X)
+    """
+    terms = np.array(list(vocab), dtype=object)
+    order = np.argsort(terms, kind="stable")
+    rank = np.empty(len(terms), dtype=X.indices.dtype)
+    rank[order] = np.arange(len(terms), dtype=X.indices.dtype)
+    np.take(rank, X.indices, out=X.indices, mode="clip")
+    X.has_sorted_indices = False
+    return terms[order], X
+
+# Show topics
+def display_topics(model, feature_names, no_top_words):
+    for topic_idx, words in enumerate(top_terms(model, feature_names, no_top_words)):
+        print(f"Topic {topic_idx}: " + " ".join(words))
+
+def save_topic_keywords(model, feature_names, path=TOPIC_KEYWORDS_PATH, no_top_words=TOP_WORDS):
+    """
+    Save the top words of each topic to CSV for manual scene labeling.
+
+    Args:
+        model (LatentDirichletAllocation): Fitted LDA model.
+        feature_names (array): Vocabulary aligned with the model's columns.
+        path (str): Output CSV path.
+        no_top_words (int): Number of words listed per topic.
+    """
+    topic_keywords = []
+    for topic_idx, top_words in enumerate(top_terms(model, feature_names, no_top_words)):
+        topic_keywords.append({
+            "topic_id": topic_idx,
+            "top_words": ", ".join(top_words),
+            "consumer_type": topic_idx,
+            "consumer_scene": ""
+        })
+
+    pd.DataFrame(topic_keywords).to_csv(path, index=False)
+    print(f"Saved topic keywords to {path}")
+
+def load_descriptions():
+    """
+    Load the michelin_full artifact, untokenized.
+
+    Returns:
+        pd.DataFrame: Restaurant table.
+    """
+    with span("lda.load") as s:
+        df = read_artifact("michelin_full")
+        s.rows = len(df)
+    return df
+
+def load_tokenized_corpus(n_jobs=1, chunk_size=TOKENIZE_CHUNK_SIZE, incremental=True):
+    """
+    Load the michelin_full artifact and add a `tokens` column.
+
+    Args:
+        n_jobs (int): Worker processes used for tokenization (-1 = all cores).
+        chunk_size (int): Descriptions per tokenization task.
+        incremental (bool): Reuse tokens cached from earlier runs and only
+            tokenize new or edited descriptions.
+
+    Returns:
+        pd.DataFrame: Restaurant table with stemmed tokens per description.
+    """
     # Load data
-    df = pd.read_excel(RAW_DATA_PATH)
+    df = load_descriptions()
 
     # Load custom stopwords
-    with open(STOPWORDS_PATH, "r") as f:
-        stopwords_custom = set(word.strip() for word in f.readlines())
-
-    # Tokenizer function
-    def custom_tokenizer(text):
-        text = text.lower()
-        text = re.sub(r"[^a-zA-Z\s]", "", text)
-        tokens = nltk.word_tokenize(text)
-        tokens = [t for t in tokens if t not in stopwords_custom and len(t) > 2]
-        tokens = stem_tokens(tokens)
-        return tokens
-
-    # Tokenize descriptions
+    stopwords_custom = load_stopwords(STOPWORDS_PATH)
+
+    # Tokenize descriptions (stems persisted from earlier runs are reused)
     print("Tokenizing and stemming descriptions...")
-    df["tokens"] = df["description"].apply(custom_tokenizer)
+    stem_cache = get_stem_cache()
+    tokenize_fn = partial(tokenize_descriptions, stopwords_custom=stopwords_custom, n_jobs=n_jobs, chunk_size=chunk_size)
+    with span("lda.tokenize", rows=len(df), n_jobs=n_jobs, incremental=incremental):
+        if incremental:
+            token_store = TokenStore(tokenizer_fingerprint(stopwords_custom))
+            df["tokens"] = token_store.tokenize(df["description"], tokenize_fn)
+            token_store.retain(df["description"])
+            token_store.save()
+            print(f"Token store: {token_store.stats()}")
+        else:
+            df["tokens"] = tokenize_fn(df["description"])
+        stem_cache.save()
+    print(f"Stem cache: {stem_cache.stats()}")
+    return df
+
+def vectorize_tokens(tokens):
+    """
+    Fit a TF-IDF vectorizer on tokenized descriptions.
 
+    Args:
+        tokens (iterable): One list of stemmed tokens per description.
+
+    Returns:
+        tuple: (fitted TfidfVectorizer, sparse TF-IDF matrix)
+    """
     # Join tokens back to text for TF-IDF
-    texts_for_tfidf = df["tokens"].apply(lambda x: " ".join(x))
+    texts_for_tfidf = [" ".join(x) for x in tokens]
 
     # TF-IDF Vectorization
     print("Vectorizing with TF-IDF...")
-    tfidf_vectorizer = TfidfVectorizer()
-    X = tfidf_vectorizer.fit_transform(texts_for_tfidf)
-
-    # LDA Modeling
-    NUM_TOPICS = 8
-    print(f"Training LDA model with {NUM_TOPICS} topics...")
-    lda = LatentDirichletAllocation(n_components=NUM_TOPICS, random_state=42)
-    lda.fit(X)
-
-    # Show topics
-    def display_topics(model, feature_names, no_top_words):
-        for topic_idx, topic in enumerate(model.components_):
-            message = f"Topic {topic_idx}: "
-            message += " ".join([feature_names[i] for i in topic.argsort()[:-no_top_words - 1:-1]])
-            print(message)
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    with span("lda.vectorize", rows=len(texts_for_tfidf)) as s:
+        tfidf_vectorizer = TfidfVectorizer()
+        X = tfidf_vectorizer.fit_transform(texts_for_tfidf)
+        s.vocabulary = X.shape[1]
+    return tfidf_vectorizer, X
 
-    print("\nTop words per topic:")
-    display_topics(lda, tfidf_vectorizer.get_feature_names_out(), 10)
+def vectorize_descriptions(descriptions, stopwords_custom, n_jobs=1, chunk_size=TOKENIZE_CHUNK_SIZE, executor=None):
+    """
+    Fit TF-IDF straight from raw descriptions with the fused tokenizer.
+
+    Produces the same vocabulary and matrix as
+    vectorize_tokens(tokenize_descriptions(descriptions, stopwords_custom)).
 
-    # Assign dominant topic back to each restaurant
+    Args:
+        descriptions (iterable): Raw description strings.
+        stopwords_custom (set): Stopwords to drop before stemming.
+        n_jobs (int): Worker processes (-1 = all cores).
+        chunk_size (int): Descriptions per worker task.
+        executor (ProcessPoolExecutor): Existing pool from tokenizer_pool().
+
+    Returns:
+        tuple: (fitted TfidfVectorizer, sparse TF-IDF matrix)
+    """
+    print("Tokenizing and vectorizing with TF-IDF (fused)...")
+    with span("lda.vectorize_fused", n_jobs=n_jobs) as s:
+        terms, counts = count_terms(descriptions, stopwords_custom, n_jobs=n_jobs, chunk_size=chunk_size,
+                                    executor=executor, dtype=np.float64)
+        tfidf_vectorizer, X = tfidf_from_counts(terms, counts)
+        s.rows, s.vocabulary = X.shape
+    return tfidf_vectorizer, X
+
+def tfidf_from_counts(terms, counts):
+    """
+    Fit TF-IDF on a term-count matrix, as TfidfVectorizer.fit_transform would on the same tokens.
+
+    Args:
+        terms (np.ndarray): Terms in column order (sorted, as from count_terms).
+        counts (scipy.sparse.csr_matrix): float64 counts; transformed in place.
+
+    Returns:
+        tuple: (fitted TfidfVectorizer, sparse TF-IDF matrix)
+    """
+    from sklearn.feature_extraction.text import TfidfTransformer, TfidfVectorizer
+
+    # fit then transform(copy=False), exactly as TfidfVectorizer.fit_transform does
+    transformer = TfidfTransformer().fit(counts)
+    X = transformer.transform(counts, copy=False)
+
+    # A vectorizer equivalent to one fitted on the joined tokens, for transform() and saving
+    tfidf_vectorizer = TfidfVectorizer(vocabulary={term: i for i, term in enumerate(terms)})
+    tfidf_vectorizer.idf_ = transformer.idf_
+    return tfidf_vectorizer, X
+
+def assign_dominant_topics(df, lda, X, tally=None, doc_topics=None):
+    """
+    Add a `dominant_topic` column (argmax of each row's topic mixture).
+
+    Args:
+        df (pd.DataFrame): Restaurant table aligned with X.
+        lda (LatentDirichletAllocation): Fitted model.
+        X (sparse matrix or ShardedMatrix): TF-IDF matrix.
+        tally (TopicTally): Optional; also collects per-topic counts and exemplars
+            for the topic report.
+        doc_topics (DocTopicWriter): Optional; also stores every row's full topic
+            mixture, keyed by restaurant ID.
+
+    Returns:
+        pd.DataFrame: df, with the column added in place.
+    """
     print("Assigning dominant topic to each description...")
-    X_topics = lda.transform(X)
-    df["dominant_topic"] = np.argmax(X_topics, axis=1)
+    tally = tally or TopicTally(lda.n_components)
+    ids = restaurant_ids(df) if doc_topics is not None else None
+    dominant, start = [], 0
+    with span("lda.transform", rows=X.shape[0]):
+        # Memory-mapped shards (sparse_shards.ShardedMatrix) are transformed one at a time
+        for block in (X.iter_shards() if hasattr(X, "iter_shards") else [X]):
+            X_topics = lda.transform(block)
+            dominant.append(tally.update(X_topics))
+            if doc_topics is not None:
+                doc_topics.write(X_topics, ids[start:start + len(X_topics)])
+            start += len(X_topics)
+        df["dominant_topic"] = np.concatenate(dominant)
+    return df
+
+def save_lda_outputs(df, lda, X, feature_names, export_excel=False):
+    """
+    Assign dominant topics and save the michelin_with_topics artifact and keyword CSV.
+
+    Args:
+        df (pd.DataFrame): Tokenized restaurant table aligned with X.
+        lda (LatentDirichletAllocation): Fitted model.
+        X (sparse matrix): TF-IDF matrix the model was trained on.
+        feature_names (array): Vocabulary aligned with X's columns.
+        export_excel (bool): Also write michelin_with_topics.xlsx.
+    """
+    print("\nTop words per topic:")
+    display_topics(lda, feature_names, TOP_WORDS)
+
+    tally = TopicTally(lda.n_components)
+    with DocTopicWriter(len(df), lda.n_components) as doc_topics:
+        assign_dominant_topics(df, lda, X, tally, doc_topics)
 
     # Save processed file
-    output_path = os.path.join("data", "michelin_with_topics.xlsx")
-    df.to_excel(output_path, index=False)
-    print(f"Saved processed data with topics to {output_path}")
+    with span("lda.save", rows=len(df)):
+        os.makedirs("data", exist_ok=True)
+        excel_path = os.path.join("data", "michelin_with_topics.xlsx") if export_excel else None
+        output_path = write_artifact(df, "michelin_with_topics", excel_path=excel_path)
+        print(f"Saved processed data with topics to {output_path}")
 
-    # Save topics to CSV for manual labeling
-    topics_out_path = os.path.join("data", "lda_topic_keywords.csv")
-    topic_keywords = []
-    for topic_idx, topic in enumerate(lda.components_):
-        top_words = [tfidf_vectorizer.get_feature_names_out()[i] for i in topic.argsort()[:-11:-1]]
-        topic_keywords.append({
-            "topic_id": topic_idx,
-            "top_words": ", ".join(top_words),
-            "consumer_type": topic_idx,
-            "consumer_scene": ""
-        })
+        # Save topics to CSV for manual labeling, and the summary shown on the Marketing Map page
+        save_topic_keywords(lda, feature_names, TOPIC_KEYWORDS_PATH)
+        save_topic_report(build_topic_report(lda, feature_names, tally, df["restaurant"], TOP_WORDS))
+
+def run_lda_on_descriptions(n_jobs=1, chunk_size=TOKENIZE_CHUNK_SIZE, incremental=True, export_excel=False,
+                            n_topics=NUM_TOPICS, fused=False, out_of_core=False, min_df=1, max_df=1.0,
+                            max_features=None, masked=False):
+    """
+    Run the full topic modeling pipeline on the michelin_full artifact.
+
+    Args:
+        n_jobs (int): Worker processes used for tokenization (-1 = all cores).
+        chunk_size (int): Descriptions per tokenization task.
+        incremental (bool): Reuse tokens cached from earlier runs and only
+            tokenize new or edited descriptions.
+        export_excel (bool): Also write michelin_with_topics.xlsx.
+        n_topics (int): Number of LDA topics.
+        fused (bool): Count terms straight from the descriptions (same model,
+            less memory; no `tokens` column and no token store).
+        out_of_core (bool): Keep the TF-IDF matrix in memory-mapped shards
+            (see app/sparse_shards.py) and train online LDA one shard at a time.
+        min_df, max_df, max_features: Vocabulary pruning for out_of_core runs,
+            as in TfidfVectorizer.
+        masked (bool): Vectorize from the cached pre-stopword counts (see
+            app/stopword_mask.py), recounting only when the descriptions change;
+            a stopword edit then costs a column mask, not a re-tokenization.
+    """
+    with span("lda.pipeline") as pipeline:
+        if out_of_core:
+            from app.sparse_shards import build_tfidf_shards
+            df = load_descriptions()
+            tfidf_vectorizer, X = build_tfidf_shards("michelin_full", n_jobs=n_jobs, min_df=min_df, max_df=max_df,
+                                                     max_features=max_features)
+            get_stem_cache().save()
+        elif masked:
+            from app.stopword_mask import load_surface_counts  # builds on this module
+            df = load_descriptions()
+            surface_counts = load_surface_counts(df["description"], n_jobs=n_jobs, chunk_size=chunk_size)
+            tfidf_vectorizer, X = surface_counts.vectorize(load_stopwords(STOPWORDS_PATH))
+        elif fused:
+            df = load_descriptions()
+            tfidf_vectorizer, X = vectorize_descriptions(df["description"], load_stopwords(STOPWORDS_PATH),
+                                                         n_jobs=n_jobs, chunk_size=chunk_size)
+            get_stem_cache().save()
+        else:
+            df = load_tokenized_corpus(n_jobs=n_jobs, chunk_size=chunk_size, incremental=incremental)
+            tfidf_vectorizer, X = vectorize_tokens(df["tokens"])
+        pipeline.rows = len(df)
+
+        # LDA Modeling
+        print(f"Training LDA model with {n_topics} topics...")
+        with span("lda.fit", rows=X.shape[0], n_topics=n_topics, out_of_core=out_of_core):
+            if out_of_core:
+                from app.sparse_shards import fit_lda_on_shards
+                lda = fit_lda_on_shards(X, n_topics, random_state=42)
+            else:
+                from sklearn.decomposition import LatentDirichletAllocation
+                lda = LatentDirichletAllocation(n_components=n_topics, random_state=42)
+                lda.fit(X)
+
+        save_lda_outputs(df, lda, X, tfidf_vectorizer.get_feature_names_out(), export_excel=export_excel)
 
-    pd.DataFrame(topic_keywords).to_csv(topics_out_path, index=False)
-    print(f"Saved topic keywords to {topics_out_path}")
+        # Persist the fitted model so new restaurants can be assigned without a refit
+        # (imported here because topic_model builds on this module)
+        from app.topic_model import save_topic_model
+        with span("lda.save_model"):
+            save_topic_model(tfidf_vectorizer, lda, load_stopwords(STOPWORDS_PATH))
@@ -0,0 +1,106 @@
+# app/nltk_resources.py
+
+"""
+One-time, offline-friendly bootstrap for the NLTK data the project uses.
+- Resources are looked up locally first (data/nltk_data/ and NLTK's usual paths)
+- Each resource is checked at most once per process, so pipeline runs and
+  Streamlit reruns pay nothing after the first check
+- A missing resource is downloaded once into data/nltk_data/, unless
+  FW_OFFLINE=1 is set, in which case a clear error says how to provision it
+- `python -m app.nltk_resources` collects everything into data/nltk_data/ ahead
+  of time; copy that directory to offline workers (or point NLTK_DATA at a shared copy)
+"""
+
+import os
+import shutil
+import sys
+
+# Project-local NLTK data directory
+NLTK_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "nltk_data")
+
+# Resource name -> path checked with nltk.data.find
+RESOURCES = {
+    "punkt_tab": "tokenizers/punkt_tab",
+    "stopwords": "corpora/stopwords",
+}
+
+_ready = set()
+
+def is_offline():
+    """True when downloads are disabled with FW_OFFLINE=1."""
+    return os.environ.get("FW_OFFLINE", "").strip().lower() in ("1", "true", "yes")
+
+def ensure_nltk_data(*names):
+    """
+    Make sure NLTK resources are available, downloading missing ones at most once.
+
+    Args:
+        *names (str): Resource names from RESOURCES (default: all of them).
+
+    Raises:
+        LookupError: If a resource is missing and cannot be downloaded.
+    """
+    names = [name for name in (names or RESOURCES) if name not in _ready]
+    if not names:
+        return
+
+    import nltk
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+
+    for name in names:
+        try:
+            nltk.data.find(RESOURCES[name])
+        except LookupError:
+            if is_offline() or not nltk.download(name, download_dir=NLTK_DATA_DIR, quiet=True, raise_on_error=False):
+                raise LookupError(
+                    f"NLTK resource '{name}' is not installed. Run `python -m app.nltk_resources` where "
+                    f"network access is available and copy {NLTK_DATA_DIR} to this machine."
+                ) from None
+            nltk.data.find(RESOURCES[name])
+        _ready.add(name)
+
+def _copy_installed(path, download_dir):
+    # Copy a resource installed elsewhere on this machine; False if there is none
+    import nltk
+    try:
+        pointer = nltk.data.find(path)
+    except LookupError:
+        return False
+    target = os.path.join(download_dir, os.path.dirname(path))
+    os.makedirs(target, exist_ok=True)
+    if isinstance(pointer, nltk.data.ZipFilePathPointer):
+        shutil.copy2(pointer.zipfile.filename, target)
+    else:
+        shutil.copytree(pointer.path, os.path.join(download_dir, path), dirs_exist_ok=True)
+    return True
+
+def bootstrap(download_dir=NLTK_DATA_DIR):
+    """
+    Put every resource in the project-local directory (skipping ones already
+    there), so the directory can be copied to offline machines. Resources
+    installed elsewhere on this machine are copied; others are downloaded.
+
+    Args:
+        download_dir (str): Target directory.
+
+    Returns:
+        list: Names of resources that could not be provided.
+    """
+    import nltk
+    failed = []
+    for name, path in RESOURCES.items():
+        try:
+            nltk.data.find(path, paths=[download_dir])
+        except LookupError:
+            if _copy_installed(path, download_dir):
+                continue
+            if not nltk.download(name, download_dir=download_dir, quiet=True, raise_on_error=False):
+                failed.append(name)
+    return failed
+
+if __name__ == "__main__":
+    failed = bootstrap()
+    if failed:
+        sys.exit(f"Could not download: {', '.join(failed)}")
+    print(f"NLTK resources ready in {NLTK_DATA_DIR}: {', '.join(RESOURCES)}")
@@ -0,0 +1,414 @@
+# app/pipeline.py
+
+"""
+Headless, dependency-aware runner for the topic modeling pipeline.
+- Stages form a DAG with declared input and output files:
+  count → vectorize → lda → (assign_topics, keywords) → (similarity, scene_merge, scene_map),
+  plus search (the full-text index, updated incrementally), partition (the
+  per-city layout, app.city_partitions) and cities (per-city topics and scenes)
+- assign_topics also writes the topic report (counts, relevance, exemplars) and
+  the doc-topic store behind the scene-mix filters; similarity precomputes each
+  restaurant's nearest neighbours from the TF-IDF rows and that store
+- count tallies every token before the stopword filter (app.stopword_mask),
+  and vectorize masks the stopwords out of those counts, so editing
+  stopwords_custom.txt reruns vectorize in seconds and never the tokenizer;
+  no tokens column is materialized or stored
+- A stage is skipped when its inputs (by content hash) and its config match
+  its last successful run and its outputs still exist; they are hashed just
+  before it runs, so an input edited during the run makes the next run redo it
+- An upstream rerun that rewrites identical outputs does not force its
+  dependents to rerun
+- scene_map checks the hand-written labels' top words against the fitted
+  model and fails rather than label a refit model's topics by the old IDs
+- cities models only the cities whose rows, model or labels changed, several
+  at a time in a process pool, so adding a city leaves the others alone
+- Stages whose dependencies are done run concurrently in a thread pool
+- Intermediate results and run state live under data/cache/pipeline/
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import numpy as np
+from app import apply_scene_tags
+from app.artifacts import (
+    LEGACY_SOURCES, artifact_path, import_legacy, is_stale, legacy_path, read_artifact, write_artifact,
+)
+from app.city_partitions import CITY_DIR, CITY_LABELS, CITY_MANIFEST_PATH, model_cities, partition_dataset
+from app.doc_topics import DOC_TOPIC_DIR, DocTopicStore, DocTopicWriter
+from app.instrumentation import span
+from app.nlp_topic_modeling import (
+    NUM_TOPICS, STOPWORDS_PATH, TOKENIZE_CHUNK_SIZE, TOP_WORDS, TOPIC_KEYWORDS_PATH, assign_dominant_topics,
+    TOKENIZER_VERSION, display_topics, load_descriptions, load_stopwords, save_topic_keywords, tokenizer_fingerprint,
+)
+from app.search_index import MAX_POSITIONS, SEARCH_DIR, build_search_index
+from app.similarity_index import (
+    APPROXIMATE_ROWS, CANDIDATE_FRACTION, SIMILAR_K, SIMILARITY_DIR, TOPIC_WEIGHT, build_similarity_index,
+)
+from app.stemmer_custom import STEMMER_VERSION, get_stem_cache
+from app.stopword_mask import SurfaceCounts
+from app.topic_report import N_EXEMPLARS, RELEVANCE_LAMBDA, TOPIC_REPORT_PATH, TopicTally, build_topic_report, save_topic_report
+
+# Paths
+PIPELINE_DIR = os.path.join("data", "cache", "pipeline")
+STATE_PATH = os.path.join(PIPELINE_DIR, "state.json")
+SURFACE_COUNTS_PATH = os.path.join(PIPELINE_DIR, "surface_counts.pkl")
+TFIDF_PATH = os.path.join(PIPELINE_DIR, "tfidf.pkl")
+LDA_MODEL_PATH = os.path.join(PIPELINE_DIR, "lda.pkl")
+LDA_VERSION_PATH = os.path.join(PIPELINE_DIR, "lda_version.txt")
+DOC_TOPIC_MANIFEST = os.path.join(DOC_TOPIC_DIR, "manifest.json")
+DOC_TOPIC_WEIGHTS = os.path.join(DOC_TOPIC_DIR, "weights.npy")
+DOC_TOPIC_IDS = os.path.join(DOC_TOPIC_DIR, "ids.npy")
+SIMILARITY_MANIFEST = os.path.join(SIMILARITY_DIR, "manifest.json")
+SEARCH_MANIFEST = os.path.join(SEARCH_DIR, "manifest.json")
+
+# Random seed for the LDA fit (as in run_lda_on_descriptions)
+LDA_RANDOM_STATE = 42
+
+def _write_pickle(obj, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+def _read_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+class Stage:
+    """
+    One pipeline step.
+
+    Args:
+        name (str): Stage name used on the command line.
+        run (callable): Function of the options dict that produces the outputs.
+        inputs (list): Files the stage reads.
+        outputs (list): Files the stage writes.
+        deps (list): Names of stages that must finish first.
+        config (callable): Function of the options dict returning the settings
+            that affect the outputs (a change forces a rerun).
+    """
+
+    def __init__(self, name, run, inputs, outputs, deps=(), config=None):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.config = config or (lambda options: {})
+
+# ---------------------- Stages ----------------------
+def _count(options):
+    df = load_descriptions()
+    counts = SurfaceCounts.build(df["description"], n_jobs=options["n_jobs"], chunk_size=options["chunk_size"])
+    counts.save(SURFACE_COUNTS_PATH)
+    get_stem_cache().save()
+
+def _vectorize(options):
+    vectorizer, X = SurfaceCounts.load(SURFACE_COUNTS_PATH).vectorize(load_stopwords(STOPWORDS_PATH))
+
+    # A memory address sklearn caches (and recomputes when missing); dropped so
+    # identical fits pickle to identical bytes and downstream stages can be skipped
+    vectorizer.__dict__.pop("_stop_words_id", None)
+    _write_pickle((vectorizer, X), TFIDF_PATH)
+
+def _fit_lda(options):
+    vectorizer, X = _read_pickle(TFIDF_PATH)
+    print(f"Training LDA model with {options['n_topics']} topics...")
+    from sklearn.decomposition import LatentDirichletAllocation
+    with span("lda.fit", rows=X.shape[0], n_topics=options["n_topics"]):
+        lda = LatentDirichletAllocation(n_components=options["n_topics"], random_state=LDA_RANDOM_STATE).fit(X)
+    _write_pickle(lda, LDA_MODEL_PATH)
+
+    # Keep the versioned model used by assign_topics() in step with the pipeline
+    from app.topic_model import save_topic_model
+    version = save_topic_model(vectorizer, lda, load_stopwords(STOPWORDS_PATH))
+    with open(LDA_VERSION_PATH, "w") as f:
+        f.write(version)
+
+def _assign_topics(options):
+    df = read_artifact("michelin_full")
+    vectorizer, X = _read_pickle(TFIDF_PATH)
+    lda = _read_pickle(LDA_MODEL_PATH)
+    tally = TopicTally(lda.n_components)
+    with DocTopicWriter(len(df), lda.n_components) as doc_topics:
+        assign_dominant_topics(df, lda, X, tally, doc_topics)
+    with span("lda.save", rows=len(df)):
+        output_path = write_artifact(df, "michelin_with_topics")
+    print(f"Saved processed data with topics to {output_path}")
+    save_topic_report(build_topic_report(lda, vectorizer.get_feature_names_out(), tally, df["restaurant"], TOP_WORDS))
+
+def _keywords(options):
+    vectorizer, _ = _read_pickle(TFIDF_PATH)
+    lda = _read_pickle(LDA_MODEL_PATH)
+    feature_names = vectorizer.get_feature_names_out()
+    print("\nTop words per topic:")
+    display_topics(lda, feature_names, TOP_WORDS)
+    save_topic_keywords(lda, feature_names, TOPIC_KEYWORDS_PATH)
+
+def _similarity(options):
+    _, X = _read_pickle(TFIDF_PATH)
+    store = DocTopicStore()
+    build_similarity_index(X, np.asarray(store.weights), store.ids)
+
+def _search(options):
+    build_search_index(n_jobs=options["n_jobs"], chunk_size=options["chunk_size"])
+    get_stem_cache().save()
+
+def _partition(options):
+    partition_dataset()
+
+def _lda_version():
+    # The saved model version this pipeline fitted, not just the newest saved one
+    with open(LDA_VERSION_PATH, "r") as f:
+        return f.read().strip()
+
+def _cities(options):
+    model_cities(n_jobs=options["n_jobs"], n_topics=options["n_topics"], global_version=_lda_version())
+
+def _file_sha1(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def _city_labels():
+    # Hand-written labels for per-city models live next to each city's tables
+    if not os.path.isdir(CITY_DIR):
+        return {}
+    paths = (os.path.join(CITY_DIR, slug, CITY_LABELS) for slug in sorted(os.listdir(CITY_DIR)))
+    return {path: _file_sha1(path) for path in paths if os.path.exists(path)}
+
+def _scene_merge(options):
+    apply_scene_tags.merge_scene_labels()
+
+def _scene_map(options):
+    # Fails (writing nothing) if the labels were written for another model's topics
+    from app.topic_model import load_topic_model
+    apply_scene_tags.merge_manual_scene_labels(load_topic_model(_lda_version()))
+
+STAGES = [
+    Stage("count", _count,
+          inputs=[legacy_path("michelin_full"), artifact_path("michelin_full")],
+          outputs=[SURFACE_COUNTS_PATH],
+          config=lambda options: {"tokenizer": TOKENIZER_VERSION, "stemmer": STEMMER_VERSION}),
+    Stage("vectorize", _vectorize,
+          inputs=[SURFACE_COUNTS_PATH, STOPWORDS_PATH],
+          outputs=[TFIDF_PATH],
+          deps=["count"],
+          config=lambda options: {"tokenizer": tokenizer_fingerprint(load_stopwords(STOPWORDS_PATH))}),
+    Stage("lda", _fit_lda,
+          inputs=[TFIDF_PATH],
+          outputs=[LDA_MODEL_PATH, LDA_VERSION_PATH],
+          deps=["vectorize"],
+          config=lambda options: {"n_topics": options["n_topics"], "random_state": LDA_RANDOM_STATE}),
+    Stage("assign_topics", _assign_topics,
+          inputs=[artifact_path("michelin_full"), TFIDF_PATH, LDA_MODEL_PATH],
+          outputs=[artifact_path("michelin_with_topics"), TOPIC_REPORT_PATH, DOC_TOPIC_MANIFEST],
+          deps=["vectorize", "lda"],
+          config=lambda options: {"top_words": TOP_WORDS, "lambda": RELEVANCE_LAMBDA, "exemplars": N_EXEMPLARS}),
+    Stage("keywords", _keywords,
+          inputs=[TFIDF_PATH, LDA_MODEL_PATH],
+          outputs=[TOPIC_KEYWORDS_PATH],
+          deps=["vectorize", "lda"],
+          config=lambda options: {"top_words": TOP_WORDS}),
+    Stage("similarity", _similarity,
+          inputs=[TFIDF_PATH, DOC_TOPIC_WEIGHTS, DOC_TOPIC_IDS],
+          outputs=[SIMILARITY_MANIFEST],
+          deps=["vectorize", "assign_topics"],
+          config=lambda options: {"k": SIMILAR_K, "topic_weight": TOPIC_WEIGHT, "approximate_rows": APPROXIMATE_ROWS,
+                                  "candidate_fraction": CANDIDATE_FRACTION}),
+    Stage("partition", _partition,
+          inputs=[legacy_path("michelin_full"), artifact_path("michelin_full")],
+          outputs=[CITY_MANIFEST_PATH]),
+    Stage("cities", _cities,
+          inputs=[CITY_MANIFEST_PATH, LDA_VERSION_PATH, apply_scene_tags.MANUAL_LABELS_PATH, STOPWORDS_PATH],
+          outputs=[],
+          deps=["partition", "lda"],
+          config=lambda options: {"n_topics": options["n_topics"], "city_labels": _city_labels()}),
+    Stage("search", _search,
+          inputs=[artifact_path("michelin_full"), STOPWORDS_PATH, CITY_MANIFEST_PATH],
+          outputs=[SEARCH_MANIFEST],
+          deps=["count", "partition"],
+          config=lambda options: {"tokenizer": tokenizer_fingerprint(load_stopwords(STOPWORDS_PATH)),
+                                  "max_positions": int(MAX_POSITIONS)}),
+    Stage("scene_merge", _scene_merge,
+          inputs=[artifact_path("michelin_with_topics"), TOPIC_KEYWORDS_PATH],
+          outputs=[artifact_path("michelin_with_scene")],
+          deps=["assign_topics", "keywords"]),
+    Stage("scene_map", _scene_map,
+          inputs=[artifact_path("michelin_with_topics"), LDA_VERSION_PATH, apply_scene_tags.MANUAL_LABELS_PATH],
+          outputs=[artifact_path("merged_michelin_data")],
+          deps=["assign_topics"]),
+]
+
+# ---------------------- Runner ----------------------
+def load_state(path=STATE_PATH):
+    """Last successful run of each stage and cached file hashes."""
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {"stages": {}, "files": {}}
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def file_hash(path, state):
+    """
+    Content hash of a file, reusing the hash cached for an unchanged mtime/size.
+
+    Returns:
+        str: Hex digest, or None if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    cached = state["files"].get(path)
+    if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+        return cached["sha1"]
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    state["files"][path] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha1": h.hexdigest()}
+    return h.hexdigest()
+
+def stage_signature(stage, options, state):
+    """Hash of a stage's code-level config and the contents of its inputs."""
+    payload = {"config": stage.config(options), "inputs": {path: file_hash(path, state) for path in stage.inputs}}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def is_current(stage, options, state, signature=None):
+    """True if the stage's last run used the same inputs and config and its outputs exist."""
+    previous = state["stages"].get(stage.name)
+    return (
+        previous is not None
+        and all(os.path.exists(path) for path in stage.outputs)
+        and previous["signature"] == (signature or stage_signature(stage, options, state))
+    )
+
+def import_inputs(stage):
+    """Import the stage's input artifacts that are older than their legacy spreadsheet, so they can be hashed."""
+    for name in LEGACY_SOURCES:
+        source = legacy_path(name)
+        if artifact_path(name) in stage.inputs and os.path.exists(source) and is_stale(name):
+            print(f"Importing {name} from {source}")
+            import_legacy(name)
+
+def select_stages(targets=None, stages=STAGES):
+    """
+    The requested stages and everything upstream of them, in pipeline order.
+
+    Args:
+        targets (list): Stage names; None selects every stage.
+
+    Returns:
+        list: Stage objects.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    if not targets:
+        return list(stages)
+    unknown = [name for name in targets if name not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)}. Choose from: {', '.join(by_name)}.")
+    needed, pending = set(), list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in needed:
+            needed.add(name)
+            pending.extend(by_name[name].deps)
+    return [stage for stage in stages if stage.name in needed]
+
+def run_pipeline(targets=None, force=(), jobs=2, n_jobs=1, n_topics=NUM_TOPICS, chunk_size=TOKENIZE_CHUNK_SIZE,
+                 dry_run=False):
+    """
+    Run the pipeline, skipping stages whose inputs and config are unchanged.
+
+    Args:
+        targets (list): Stages to bring up to date (with their upstream stages); None runs all.
+        force (iterable): Stage names to rerun regardless, or ["all"].
+        jobs (int): Stages run concurrently.
+        n_jobs (int): Worker processes used for tokenization (-1 = all cores).
+        n_topics (int): Number of LDA topics.
+        chunk_size (int): Descriptions per tokenization task.
+        dry_run (bool): Only report which stages would run.
+
+    Returns:
+        dict: Stage name -> "ran", "skipped", "would run", "failed" or "not run".
+    """
+    options = {"n_jobs": n_jobs, "n_topics": n_topics, "chunk_size": chunk_size}
+    selected = select_stages(targets)
+    force = {stage.name for stage in selected} if "all" in force else set(force)
+    state = load_state()
+    lock = threading.Lock()
+    status = {}
+
+    if dry_run:
+        for stage in selected:
+            upstream_runs = any(status.get(dep) == "would run" for dep in stage.deps)
+            stale = stage.name in force or upstream_runs or not is_current(stage, options, state)
+            status[stage.name] = "would run" if stale else "skipped"
+            print(f"  {stage.name:<14} {status[stage.name]}")
+        return status
+
+    def execute(stage):
+        # Signed before running, so inputs edited while the stage runs are not taken as processed
+        with lock:
+            import_inputs(stage)
+            signature = stage_signature(stage, options, state)
+            if stage.name not in force and is_current(stage, options, state, signature):
+                return "skipped", 0.0
+        print(f"\n▶ {stage.name}")
+        start = time.perf_counter()
+        with span(f"pipeline.{stage.name}"):
+            stage.run(options)
+        elapsed = time.perf_counter() - start
+
+        with lock:
+            state["stages"][stage.name] = {
+                "signature": signature,
+                "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "seconds": round(elapsed, 3),
+            }
+            for path in stage.outputs:
+                file_hash(path, state)
+            save_state(state)
+        return "ran", elapsed
+
+    remaining = {stage.name: stage for stage in selected}
+    running = {}
+    failed = False
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        while remaining or running:
+            if not failed:
+                for name, stage in list(remaining.items()):
+                    if all(status.get(dep) in ("ran", "skipped") for dep in stage.deps):
+                        running[executor.submit(execute, stage)] = name
+                        del remaining[name]
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    status[name], elapsed = future.result()
+                except Exception as exc:
+                    status[name] = "failed"
+                    failed = True
+                    print(f"✖ {name} failed: {exc!r}")
+                    continue
+                if status[name] == "ran":
+                    print(f"✔ {name} finished in {elapsed:.1f}s")
+                else:
+                    print(f"• {name} is up to date, skipped")
+
+    for name in remaining:
+        status[name] = "not run"
+    return status
@@ -0,0 +1,578 @@
+# app/search_index.py
+
+"""
+Full-text search over restaurant descriptions.
+- Inverted index built with the topic pipeline's own normalisation (exactly
+  custom_tokenizer's tokens: lowercase, letters only, Treebank splits,
+  stopwords and short tokens dropped, Porter stems from the shared cache), so
+  "Tasting menus" finds "tasting menu"
+- Compact postings arrays per segment: term → slice of int32 document numbers
+  and uint16 term frequencies, plus uint16 token positions for phrase queries
+- BM25 ranking (k1=1.2, b=0.75) accumulated with vectorized NumPy over the
+  query terms' postings; "quoted phrases" must match as consecutive stems
+- Incremental: rows are keyed by restaurant ID and a hash of the description;
+  an update indexes only new or edited descriptions into a new segment and
+  marks removed ones deleted, and small segments are merged once there are
+  too many
+- Stored memory-mapped under data/artifacts/search/; the manifest is written
+  last and marks a finished index
+- City partitions (app.city_partitions) are indexed alongside the main table,
+  so a new city only adds a segment
+"""
+
+import json
+import os
+import re
+import shutil
+import time
+from array import array
+import numpy as np
+import pandas as pd
+from app.artifacts import ARTIFACT_DIR, read_artifact
+from app.city_partitions import cities_exist, read_manifest, read_partitions
+from app.doc_topics import IdIndex, restaurant_ids
+from app.instrumentation import span
+from app.nlp_topic_modeling import (
+    STOPWORDS_PATH, TOKENIZE_CHUNK_SIZE, load_stopwords, merge_worker_stems, normalize_terms, tokenizer_fingerprint,
+    tokenizer_pool,
+)
+from app.stemmer_custom import get_stem_cache
+
+# Paths
+SEARCH_DIR = os.path.join(ARTIFACT_DIR, "search")
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Descriptions tokenized and sorted into one segment at a time
+SEGMENT_DOCS = 100_000
+
+# More segments than this after an update merges the ones smaller than SEGMENT_DOCS
+MAX_SEGMENTS = 8
+
+# Positions are stored as uint16; tokens past this point of a description are not indexed
+MAX_POSITIONS = np.iinfo(np.uint16).max
+
+# Document number and position packed into one int64 key for phrase matching
+_POSITION_BITS = 17
+
+_PHRASES = re.compile(r'"([^"]*)"')
+_MARKDOWN_SPECIAL = re.compile(r"([\\`*_$\[\]<>|~#])")
+
+def _token_chunk(texts, stopwords_custom):
+    """
+    Term sequence of each description in a chunk, with chunk-local term ids.
+
+    Returns:
+        tuple: (terms in first-seen order, term id per token, tokens per description,
+        (token, stem) pairs computed in a pool worker)
+    """
+    stem_cache = get_stem_cache()
+    stem = stem_cache.stem
+    vocab = {}
+    term_ids, lengths = array("i"), array("q")
+    for text in texts:
+        terms = normalize_terms(text, stopwords_custom, stem)
+        term_ids.extend([vocab.setdefault(term, len(vocab)) for term in terms])
+        lengths.append(len(terms))
+    return list(vocab), term_ids, lengths, stem_cache.pop_new()
+
+def _tokenize(descriptions, stopwords_custom, vocab, n_jobs, chunk_size, executor):
+    # Global term id per token and tokens per description; new terms are appended to vocab
+    chunks = [descriptions[i:i + chunk_size] for i in range(0, len(descriptions), chunk_size)]
+    if executor is not None:
+        results = executor.map(_token_chunk, chunks, [stopwords_custom] * len(chunks))
+    else:
+        results = map(_token_chunk, chunks, [stopwords_custom] * len(chunks))
+    term_ids, lengths = [], []
+    for terms, chunk_ids, chunk_lengths, new_stems in results:
+        merge_worker_stems(new_stems)
+        local_to_global = np.fromiter((vocab.setdefault(t, len(vocab)) for t in terms), dtype=np.int32, count=len(terms))
+        term_ids.append(local_to_global[np.frombuffer(chunk_ids, dtype=np.int32)])
+        lengths.append(np.frombuffer(chunk_lengths, dtype=np.int64))
+    if not chunks:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+    return np.concatenate(term_ids), np.concatenate(lengths)
+
+def _postings(terms, docs, positions, n_terms):
+    """
+    Postings arrays from one entry per token occurrence.
+
+    Args:
+        terms, docs, positions (np.ndarray): Term id, document number and position of each token.
+        n_terms (int): Vocabulary size.
+
+    Returns:
+        dict: term_ptr and term_pos_ptr (n_terms + 1 offsets into the postings and
+        positions), docs (int32) and tf (uint16) per posting, positions (uint16).
+    """
+    order = np.lexsort((positions, docs, terms))
+    terms, docs, positions = terms[order], docs[order], positions[order]
+    new_posting = np.ones(len(terms), dtype=bool)
+    new_posting[1:] = (terms[1:] != terms[:-1]) | (docs[1:] != docs[:-1])
+    starts = np.flatnonzero(new_posting)
+    per_term = np.bincount(terms[starts], minlength=n_terms)
+    positions_per_term = np.bincount(terms, minlength=n_terms)
+    return {
+        "term_ptr": np.concatenate([[0], np.cumsum(per_term)]).astype(np.int64),
+        "term_pos_ptr": np.concatenate([[0], np.cumsum(positions_per_term)]).astype(np.int64),
+        "docs": docs[starts].astype(np.int32),
+        "tf": np.diff(np.append(starts, len(terms))).astype(np.uint16),
+        "positions": positions.astype(np.uint16),
+    }
+
+def _tokens_postings(term_ids, lengths, n_terms):
+    # Postings for freshly tokenized descriptions (one document per entry of lengths)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    docs = np.repeat(np.arange(len(lengths), dtype=np.int32), lengths)
+    positions = np.arange(len(term_ids), dtype=np.int64) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    kept = positions < MAX_POSITIONS
+    arrays = _postings(term_ids[kept], docs[kept], positions[kept], n_terms)
+    arrays["doc_len"] = np.minimum(lengths, MAX_POSITIONS).astype(np.uint16)
+    return arrays
+
+def _gather(starts, counts):
+    # Concatenated ranges starts[i] : starts[i] + counts[i]
+    counts = np.asarray(counts, dtype=np.int64)
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(np.asarray(starts, dtype=np.int64) - offsets, counts) + np.arange(counts.sum())
+
+class Segment:
+    """
+    One memory-mapped slice of the index: the postings of a batch of descriptions.
+
+    Args:
+        path (str): Segment directory.
+        deleted (str): Deleted-documents file (in the index directory), or None.
+    """
+
+    ARRAYS = ("term_ptr", "term_pos_ptr", "docs", "tf", "positions", "doc_len", "ids", "hashes")
+
+    def __init__(self, path, deleted=None):
+        self.path = path
+        self.name = os.path.basename(path)
+        for name in self.ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        self.n_docs = len(self.ids)
+        self.n_terms = len(self.term_ptr) - 1
+        if deleted is None:
+            self.deleted = np.zeros(self.n_docs, dtype=bool)
+        else:
+            self.deleted = np.load(os.path.join(os.path.dirname(path), deleted))
+        self.deleted_file = deleted
+        self.has_deleted = bool(self.deleted.any())
+
+    @staticmethod
+    def write(path, arrays):
+        """Save a segment's arrays into a new directory (replacing leftovers of an interrupted update)."""
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+        for name in Segment.ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), arrays[name])
+
+    def postings(self, term):
+        """Document numbers and term frequencies of one term (empty if the segment predates it)."""
+        if term >= self.n_terms:
+            return self.docs[:0], self.tf[:0]
+        start, end = self.term_ptr[term], self.term_ptr[term + 1]
+        return self.docs[start:end], self.tf[start:end]
+
+    def live_count(self, docs):
+        """Number of the given documents that are not deleted."""
+        if not self.has_deleted:
+            return len(docs)
+        return int(len(docs) - np.count_nonzero(self.deleted[docs]))
+
+    def tokens(self):
+        """Term id, document number and position of every indexed token."""
+        terms = np.repeat(np.arange(self.n_terms, dtype=np.int32), np.diff(self.term_pos_ptr))
+        docs = np.repeat(np.asarray(self.docs), np.asarray(self.tf, dtype=np.int64))
+        return terms, docs, np.asarray(self.positions)
+
+    def phrase_matches(self, terms):
+        """
+        Documents where the terms occur consecutively.
+
+        Args:
+            terms (list): Term ids of the phrase, in order.
+
+        Returns:
+            tuple: (document numbers, occurrences of the phrase in each).
+        """
+        postings = [self.postings(term) for term in terms]
+        candidates = None
+        for docs, _ in sorted(postings, key=lambda p: len(p[0])):
+            candidates = docs if candidates is None else np.intersect1d(candidates, docs, assume_unique=True)
+            if len(candidates) == 0:
+                return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+
+        # Keys doc·2^bits + (position - offset) agree across terms exactly at phrase starts
+        keys = None
+        for offset, (term, (docs, tf)) in enumerate(zip(terms, postings)):
+            found = np.searchsorted(docs, candidates)
+            tf = np.asarray(tf, dtype=np.int64)
+            starts = self.term_pos_ptr[term] + (np.cumsum(tf) - tf)[found]
+            positions = self.positions[_gather(starts, tf[found])].astype(np.int64) - offset
+            term_keys = (np.repeat(candidates.astype(np.int64), tf[found]) << _POSITION_BITS) + positions
+            term_keys = term_keys[positions >= 0]
+            keys = term_keys if keys is None else np.intersect1d(keys, term_keys, assume_unique=True)
+        return np.unique(keys >> _POSITION_BITS, return_counts=True)
+
+class SearchIndex:
+    """
+    BM25 search over every indexed description, keyed by restaurant ID.
+
+    Args:
+        directory (str): Index directory written by update_search_index.
+    """
+
+    def __init__(self, directory=SEARCH_DIR):
+        with open(os.path.join(directory, "manifest.json"), "r") as f:
+            self.manifest = json.load(f)
+        with open(os.path.join(directory, self.manifest["vocabulary"]), "r") as f:
+            self.vocabulary = {term: i for i, term in enumerate(json.load(f))}
+        self.stopwords = set(self.manifest["stopwords"])
+        self.segments = [
+            Segment(os.path.join(directory, segment["name"]), segment["deleted"]) for segment in self.manifest["segments"]
+        ]
+        live = [~segment.deleted for segment in self.segments]
+        self.n_docs = int(sum(mask.sum() for mask in live))
+        total_len = sum(int(segment.doc_len[mask].astype(np.int64).sum()) for segment, mask in zip(self.segments, live))
+        self.avg_len = total_len / max(self.n_docs, 1)
+        # BM25's length normalisation k1·(1 - b + b·len/avg_len), per document
+        for segment in self.segments:
+            segment.norm = (BM25_K1 * (1 - BM25_B + BM25_B * segment.doc_len / max(self.avg_len, 1e-9))).astype(np.float32)
+
+    def __len__(self):
+        return self.n_docs
+
+    def parse(self, query):
+        """
+        Split a query into loose words and "quoted phrases", normalised as the index is.
+
+        Args:
+            query (str): e.g. 'tasting menu "sea urchin"'.
+
+        Returns:
+            tuple: (list of terms, list of phrases as lists of terms).
+        """
+        phrases = [normalize_terms(phrase, self.stopwords) for phrase in _PHRASES.findall(query)]
+        words = normalize_terms(_PHRASES.sub(" ", query), self.stopwords)
+        # A phrase of one stem is just a required word
+        words += [phrase[0] for phrase in phrases if len(phrase) == 1]
+        return list(dict.fromkeys(words)), [phrase for phrase in phrases if len(phrase) > 1]
+
+    def _idf(self, df):
+        return np.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def _bm25(self, segment, docs, tf, idf):
+        tf = np.asarray(tf, dtype=np.float32)
+        return idf * tf * (BM25_K1 + 1) / (tf + segment.norm[docs])
+
+    def search(self, query, k=None, require_all=True):
+        """
+        Restaurants whose descriptions match a query, best BM25 score first.
+
+        Args:
+            query (str): Words and "quoted phrases". Phrases must always match.
+            k (int): Results returned; None returns every match.
+            require_all (bool): Every word must occur (False: any word, ranked by BM25).
+
+        Returns:
+            tuple: (restaurant IDs, float32 scores), best first.
+        """
+        words, phrases = self.parse(query)
+        empty = np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.float32)
+        if not words and not phrases:
+            return empty
+        term_ids = [self.vocabulary.get(word) for word in words]
+        phrase_ids = [[self.vocabulary.get(term) for term in phrase] for phrase in phrases]
+        if any(None in phrase for phrase in phrase_ids) or (require_all and None in term_ids):
+            return empty
+        term_ids = [term for term in term_ids if term is not None]
+        n_required = len(phrase_ids) + (len(term_ids) if require_all else 0)
+
+        # Phrases are scored as pseudo-terms, so their document frequency needs every segment first
+        phrase_hits = [[segment.phrase_matches(phrase) for phrase in phrase_ids] for segment in self.segments]
+        phrase_idf = [
+            self._idf(sum(segment.live_count(hits[i][0]) for segment, hits in zip(self.segments, phrase_hits)))
+            for i in range(len(phrase_ids))
+        ]
+        term_idf = [self._idf(sum(segment.live_count(segment.postings(term)[0]) for segment in self.segments))
+                    for term in term_ids]
+
+        ids, scores = [], []
+        for segment, hits in zip(self.segments, phrase_hits):
+            doc_parts, score_parts = [], []
+            for term, idf in zip(term_ids, term_idf):
+                docs, tf = segment.postings(term)
+                doc_parts.append(docs)
+                score_parts.append(self._bm25(segment, docs, tf, idf))
+            for (docs, tf), idf in zip(hits, phrase_idf):
+                doc_parts.append(docs)
+                score_parts.append(self._bm25(segment, docs, tf, idf))
+            docs = np.concatenate(doc_parts) if doc_parts else np.empty(0, dtype=np.int32)
+            if len(docs) == 0:
+                continue
+
+            # Sum per document: sparse (sort-based) for a few postings, dense bincount otherwise
+            if len(doc_parts) == 1:
+                found, total, matched = docs, score_parts[0], np.ones(len(docs), dtype=np.int64)
+            elif len(docs) * 8 < segment.n_docs:
+                found, inverse = np.unique(docs, return_inverse=True)
+                total = np.bincount(inverse, weights=np.concatenate(score_parts))
+                matched = np.bincount(inverse)
+            else:
+                total = np.bincount(docs, weights=np.concatenate(score_parts), minlength=segment.n_docs)
+                matched = np.bincount(docs, minlength=segment.n_docs)
+                found = np.flatnonzero(matched)
+                total, matched = total[found], matched[found]
+
+            # Required words and phrases are each one posting per matching document
+            if require_all:
+                keep = matched == n_required
+            elif phrase_ids:
+                phrase_docs = hits[0][0]
+                for docs_i, _ in hits[1:]:
+                    phrase_docs = np.intersect1d(phrase_docs, docs_i, assume_unique=True)
+                keep = np.isin(found, phrase_docs, assume_unique=True)
+            else:
+                keep = np.ones(len(found), dtype=bool)
+            if segment.has_deleted:
+                keep &= ~segment.deleted[found]
+            ids.append(segment.ids[found[keep]])
+            scores.append(total[keep].astype(np.float32))
+
+        if not ids:
+            return empty
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+        if k is not None and k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+            ids, scores = ids[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return ids[order], scores[order]
+
+    def highlight(self, text, query, window=None):
+        """
+        A description as Markdown with the query's matching words in bold.
+
+        Args:
+            text (str): Raw description.
+            query (str): The search query.
+            window (int): Words shown around the first match (None: the whole text).
+
+        Returns:
+            str: Markdown (special characters escaped).
+        """
+        words, phrases = self.parse(query)
+        wanted = set(words).union(*phrases)
+        tokens = str(text).split()
+        # Stripping non-letters never touches whitespace, so each word normalises on its own
+        hit = [bool(wanted.intersection(normalize_terms(token, self.stopwords))) for token in tokens]
+        start, end = 0, len(tokens)
+        if window is not None and any(hit):
+            start = max(0, hit.index(True) - window // 4)
+            end = min(len(tokens), start + window)
+        parts = [_MARKDOWN_SPECIAL.sub(r"\\\1", token) for token in tokens[start:end]]
+        parts = [f"**{part}**" if h else part for part, h in zip(parts, hit[start:end])]
+        return ("… " if start > 0 else "") + " ".join(parts) + (" …" if end < len(tokens) else "")
+
+def search_rows(index, query, id_index):
+    """
+    Rows of a restaurant table that match a query, best first.
+
+    Args:
+        index (SearchIndex): The search index.
+        query (str): Words and "quoted phrases".
+        id_index (IdIndex): Row lookup for the table's restaurant IDs.
+
+    Returns:
+        tuple: (rows, scores); matches that are not in the table are dropped.
+    """
+    ids, scores = index.search(query)
+    rows = id_index.positions(ids)
+    return rows[rows >= 0], scores[rows >= 0]
+
+def description_lookup(source="michelin_full", cities=None):
+    """Raw descriptions indexed by restaurant ID, for highlighting hits (from city partitions if cities are given)."""
+    columns = ["restaurant", "address", "description"]
+    df = read_partitions(cities, columns=columns) if cities is not None else read_artifact(source, columns=columns)
+    descriptions = pd.Series(df["description"].fillna("").to_numpy(), index=restaurant_ids(df))
+    return descriptions[~descriptions.index.duplicated()]
+
+def search_index_exists(directory=SEARCH_DIR):
+    """True if the directory holds a finished search index."""
+    return os.path.exists(os.path.join(directory, "manifest.json"))
+
+def _write_manifest(directory, manifest):
+    manifest_path = os.path.join(directory, "manifest.json")
+    with open(f"{manifest_path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+def update_search_index(descriptions, ids, stopwords_custom, directory=SEARCH_DIR, n_jobs=1,
+                        chunk_size=TOKENIZE_CHUNK_SIZE, rebuild=False):
+    """
+    Bring the search index in line with a restaurant table, indexing only what changed.
+
+    New restaurants and edited descriptions go into a new segment, the old
+    entries of edited or removed restaurants are marked deleted, and segments
+    are merged once there are more than MAX_SEGMENTS. A different tokenizer
+    configuration (stopwords, stemmer) rebuilds the index from scratch.
+
+    Args:
+        descriptions (sequence): Raw description per restaurant.
+        ids (np.ndarray): Restaurant IDs aligned with descriptions (repeats keep the first).
+        stopwords_custom (set): Stopwords to drop before stemming.
+        directory (str): Index directory.
+        n_jobs (int): Worker processes used for tokenization (-1 = all cores).
+        chunk_size (int): Descriptions per tokenization task.
+        rebuild (bool): Reindex everything.
+
+    Returns:
+        SearchIndex: The updated index.
+    """
+    descriptions = pd.Series(descriptions).fillna("").astype(str).to_numpy(dtype=object)
+    ids = np.asarray(ids, dtype=np.uint64)
+    _, first = np.unique(ids, return_index=True)
+    first.sort()
+    descriptions, ids = descriptions[first], ids[first]
+    hashes = pd.util.hash_array(descriptions)
+    fingerprint = tokenizer_fingerprint(stopwords_custom)
+
+    old = SearchIndex(directory) if search_index_exists(directory) else None
+    # New files get the next generation's names, so the current index stays readable until the manifest moves
+    generation = old.manifest["generation"] + 1 if old is not None else 1
+    if old is not None and old.manifest["fingerprint"] != fingerprint:
+        print("Tokenizer changed, rebuilding the search index...")
+        old = None
+    elif rebuild:
+        old = None
+    vocab = dict(old.vocabulary) if old is not None else {}
+    segments = list(old.segments) if old is not None else []
+
+    # Unchanged restaurants keep their postings; edited or removed ones are marked deleted
+    added = np.ones(len(ids), dtype=bool)
+    n_removed = 0
+    id_index = IdIndex(ids)
+    for segment in segments:
+        live = np.flatnonzero(~segment.deleted)
+        rows = id_index.positions(segment.ids[live])
+        unchanged = rows >= 0
+        unchanged[unchanged] = hashes[rows[unchanged]] == segment.hashes[live[unchanged]]
+        added[rows[unchanged]] = False
+        if not unchanged.all():
+            segment.deleted = segment.deleted.copy()
+            segment.deleted[live[~unchanged]] = True
+            segment.deleted_file = f"{segment.name}.deleted_{generation:05d}.npy"
+            np.save(os.path.join(directory, segment.deleted_file), segment.deleted)
+            n_removed += int((~unchanged).sum())
+    added = np.flatnonzero(added)
+    print(f"Search index: {len(added)} to index, {n_removed} removed or edited, "
+          f"{len(ids) - len(added)} unchanged")
+    if old is not None and len(added) == 0 and n_removed == 0:
+        return old
+
+    os.makedirs(directory, exist_ok=True)
+    new_segments = []
+    with span("search.index", rows=len(added), n_jobs=n_jobs):
+        executor = None
+        if n_jobs != 1 and len(added) > chunk_size:
+            executor = tokenizer_pool(stopwords_custom, n_jobs)
+        try:
+            for start in range(0, len(added), SEGMENT_DOCS):
+                rows = added[start:start + SEGMENT_DOCS]
+                term_ids, lengths = _tokenize(list(descriptions[rows]), stopwords_custom, vocab, n_jobs,
+                                              max(1, int(chunk_size)), executor)
+                arrays = _tokens_postings(term_ids, lengths, len(vocab))
+                arrays["ids"], arrays["hashes"] = ids[rows], hashes[rows]
+                name = f"segment_{generation:05d}_{start // SEGMENT_DOCS:04d}"
+                Segment.write(os.path.join(directory, name), arrays)
+                new_segments.append(Segment(os.path.join(directory, name)))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    # Keep segments with live documents; merge the small ones if there are too many
+    kept = [segment for segment in segments if not segment.deleted.all()] + new_segments
+    small = [segment for segment in kept if segment.n_docs < SEGMENT_DOCS]
+    if len(kept) > MAX_SEGMENTS and len(small) > 1:
+        with span("search.merge", segments=len(small)):
+            name = f"segment_{generation:05d}_merged"
+            Segment.write(os.path.join(directory, name), _merge(small, len(vocab)))
+        kept = [segment for segment in kept if segment.n_docs >= SEGMENT_DOCS] + [Segment(os.path.join(directory, name))]
+    entries = [{"name": segment.name, "docs": segment.n_docs, "deleted": segment.deleted_file} for segment in kept]
+
+    # The vocabulary only grows, so older segments' term ids stay valid
+    vocabulary_name = f"vocabulary_{generation:05d}.json"
+    with open(os.path.join(directory, vocabulary_name), "w") as f:
+        json.dump(list(vocab), f)
+    _write_manifest(directory, {
+        "generation": generation,
+        "fingerprint": fingerprint,
+        "stopwords": sorted(stopwords_custom),
+        "vocabulary": vocabulary_name,
+        "segments": entries,
+        "rows": int(len(ids)),
+        "terms": len(vocab),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    _remove_unused(directory, entries, vocabulary_name)
+    index = SearchIndex(directory)
+    print(f"Saved search index of {len(index)} descriptions ({len(entries)} segments) to {directory}")
+    return index
+
+def _merge(segments, n_terms):
+    # One segment holding the live documents of several, renumbered in order
+    parts, offset = [], 0
+    for segment in segments:
+        terms, docs, positions = segment.tokens()
+        live = ~segment.deleted
+        renumber = np.cumsum(live) - 1 + offset
+        kept = live[docs]
+        parts.append((terms[kept], renumber[docs[kept]], positions[kept], segment, live))
+        offset += int(live.sum())
+    arrays = _postings(
+        np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]),
+        np.concatenate([p[2] for p in parts]), n_terms,
+    )
+    for name in ("doc_len", "ids", "hashes"):
+        arrays[name] = np.concatenate([np.asarray(getattr(segment, name))[live] for *_, segment, live in parts])
+    return arrays
+
+def _remove_unused(directory, entries, vocabulary_name):
+    # Files of superseded generations, once the new manifest is in place
+    used = {entry["name"] for entry in entries} | {entry["deleted"] for entry in entries} | {vocabulary_name, "manifest.json"}
+    for name in os.listdir(directory):
+        if name not in used:
+            path = os.path.join(directory, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+def build_search_index(source="michelin_full", directory=SEARCH_DIR, n_jobs=1, chunk_size=TOKENIZE_CHUNK_SIZE,
+                       rebuild=False, with_cities=True):
+    """
+    Update the search index from a restaurant artifact.
+
+    Args:
+        source (str): Artifact with restaurant, address and description columns.
+        directory (str): Index directory.
+        n_jobs (int): Worker processes used for tokenization (-1 = all cores).
+        chunk_size (int): Descriptions per tokenization task.
+        rebuild (bool): Reindex everything.
+        with_cities (bool): Also index every city partition (restaurants in
+            both are indexed once).
+
+    Returns:
+        SearchIndex: The updated index.
+    """
+    columns = ["restaurant", "address", "description"]
+    df = read_artifact(source, columns=columns)
+    if with_cities and cities_exist():
+        df = pd.concat([df, read_partitions(read_manifest()["cities"], columns=columns)], ignore_index=True)
+    return update_search_index(df["description"], restaurant_ids(df), load_stopwords(STOPWORDS_PATH),
+                               directory=directory, n_jobs=n_jobs, chunk_size=chunk_size, rebuild=rebuild)
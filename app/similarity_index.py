@@ -0,0 +1,257 @@
+# app/similarity_index.py
+
+"""
+"More like this": nearest restaurants by description and topic mixture.
+- Similarity is a weighted sum of two cosines, TF-IDF (wording) and LDA topic
+  mixture (theme); both are L2-normalised and stacked side by side (scaled by
+  the square roots of their weights) so one sparse product computes it
+- Exact build: batched normalized-matrix products (a block of rows against
+  every row) with partial top-k selection per block, so memory is bounded by
+  the block size rather than n²
+- Approximate build for large corpora: candidates come from dense products of
+  a 128-dimensional truncated SVD of the stacked vectors, and only the best
+  2% of rows (at least 200) per restaurant are scored exactly, so recall
+  holds up as the corpus grows
+- The top-k neighbours of every restaurant are precomputed and stored under
+  data/artifacts/similarity/, keyed by restaurant ID, so a lookup is an
+  array slice
+"""
+
+import json
+import os
+import time
+import numpy as np
+from app.artifacts import ARTIFACT_DIR
+from app.doc_topics import IdIndex
+from app.instrumentation import span
+
+# Paths
+SIMILARITY_DIR = os.path.join(ARTIFACT_DIR, "similarity")
+
+# Defaults
+SIMILAR_K = 10
+TOPIC_WEIGHT = 0.3
+
+# Approximate mode: embedding size and candidates reranked per restaurant
+# (a share of the rows, so recall@10 stays above 0.9 as the corpus grows)
+EMBED_DIM = 128
+N_CANDIDATES = 200
+CANDIDATE_FRACTION = 0.02
+
+# Corpora larger than this use the approximate build unless told otherwise
+APPROXIMATE_ROWS = 50_000
+
+# Float64 similarity scores held per block of query rows
+BLOCK_BYTES = 64 * 1024 * 1024
+
+def combined_vectors(X, doc_topic, topic_weight=TOPIC_WEIGHT):
+    """
+    Stack TF-IDF rows and topic mixtures so that dot products give the combined similarity.
+
+    Args:
+        X (sparse matrix): TF-IDF rows (already L2-normalised by TfidfVectorizer).
+        doc_topic (np.ndarray): (rows, n_topics) topic mixtures.
+        topic_weight (float): Weight of the topic cosine (the TF-IDF cosine gets the rest).
+
+    Returns:
+        scipy.sparse.csr_matrix: One row per restaurant; row · row is
+        (1 - topic_weight)·cos(tfidf) + topic_weight·cos(topics).
+    """
+    from scipy import sparse
+    from sklearn.preprocessing import normalize
+
+    topics = normalize(np.asarray(doc_topic, dtype=np.float64))
+    return sparse.hstack([
+        np.sqrt(1 - topic_weight) * normalize(X),
+        sparse.csr_matrix(np.sqrt(topic_weight) * topics),
+    ], format="csr")
+
+def candidate_count(n_rows):
+    """Candidates reranked per restaurant in approximate mode for a corpus of n_rows."""
+    return max(N_CANDIDATES, int(np.ceil(CANDIDATE_FRACTION * n_rows)))
+
+def _block_rows(n_candidates):
+    return max(1, BLOCK_BYTES // (8 * max(n_candidates, 1)))
+
+def _top_k(Z_queries, query_rows, Z_candidates, candidate_rows, k):
+    # Dense block of scores, self-matches removed, k best per row
+    scores = (Z_queries @ Z_candidates.T).toarray()
+    scores[query_rows[:, None] == candidate_rows[None, :]] = -np.inf
+    k = min(k, scores.shape[1])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < scores.shape[1] else np.argsort(-scores, axis=1)
+    best = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-best, axis=1, kind="stable")
+    best = np.take_along_axis(best, order, axis=1)
+    found = candidate_rows[np.take_along_axis(top, order, axis=1)]
+    found[best == -np.inf] = -1
+    return found, best
+
+def exact_neighbors(Z, k=SIMILAR_K):
+    """
+    Top-k neighbours of every row by brute force, one block of rows at a time.
+
+    Args:
+        Z (sparse matrix): Output of combined_vectors.
+        k (int): Neighbours per row.
+
+    Returns:
+        tuple: (neighbors, scores) arrays of shape (rows, k); neighbors are
+        row numbers, -1 (score -inf) where there are fewer than k other rows.
+    """
+    n = Z.shape[0]
+    neighbors = np.full((n, k), -1, dtype=np.int32)
+    scores = np.full((n, k), -np.inf, dtype=np.float32)
+    all_rows = np.arange(n)
+    step = _block_rows(n)
+    for start in range(0, n, step):
+        rows = all_rows[start:start + step]
+        found, best = _top_k(Z[rows], rows, Z, all_rows, k)
+        neighbors[rows, :found.shape[1]] = found
+        scores[rows, :found.shape[1]] = best
+    return neighbors, scores
+
+def approximate_neighbors(Z, k=SIMILAR_K, n_components=EMBED_DIM, n_candidates=None, random_state=0):
+    """
+    Top-k neighbours from a low-dimensional embedding, reranked exactly.
+
+    Candidates come from dense products of a truncated SVD of Z (fast BLAS
+    instead of sparse products); only they are scored on the full vectors.
+
+    Args:
+        Z (sparse matrix): Output of combined_vectors.
+        k (int): Neighbours per row.
+        n_components (int): Embedding dimensions.
+        n_candidates (int): Candidates per row reranked on the full vectors
+            (default: candidate_count of the rows).
+        random_state (int): Seed for the randomized SVD.
+
+    Returns:
+        tuple: (neighbors, scores), as exact_neighbors.
+    """
+    from sklearn.decomposition import TruncatedSVD
+
+    n = Z.shape[0]
+    neighbors = np.full((n, k), -1, dtype=np.int32)
+    scores = np.full((n, k), -np.inf, dtype=np.float32)
+    n_components = min(n_components, Z.shape[1] - 1, n - 1)
+    if n < 2 or n_components < 1:
+        return exact_neighbors(Z, k)
+    embedding = TruncatedSVD(n_components, random_state=random_state).fit_transform(Z).astype(np.float32)
+
+    if n_candidates is None:
+        n_candidates = candidate_count(n)
+    n_candidates = max(k, min(n_candidates, n - 1))
+    step = max(1, BLOCK_BYTES // (4 * n))
+    # Rerank a few rows at a time: each one copies n_candidates sparse rows
+    rerank_step = max(1, BLOCK_BYTES // (12 * n_candidates * max(1, Z.nnz // n)))
+    for start in range(0, n, step):
+        rows = np.arange(start, min(start + step, n))
+        approx = embedding[rows] @ embedding.T
+        approx[np.arange(len(rows)), rows] = -np.inf
+        candidates = np.argpartition(-approx, n_candidates - 1, axis=1)[:, :n_candidates]
+        for sub in range(0, len(rows), rerank_step):
+            sub_rows, sub_candidates = rows[sub:sub + rerank_step], candidates[sub:sub + rerank_step]
+            exact = Z[np.repeat(sub_rows, n_candidates)].multiply(Z[sub_candidates.ravel()]).sum(axis=1)
+            exact = np.asarray(exact).reshape(len(sub_rows), n_candidates)
+            top = np.argsort(-exact, axis=1, kind="stable")[:, :k]
+            neighbors[sub_rows, :top.shape[1]] = np.take_along_axis(sub_candidates, top, axis=1)
+            scores[sub_rows, :top.shape[1]] = np.take_along_axis(exact, top, axis=1)
+    return neighbors, scores
+
+def build_similarity_index(X, doc_topic, ids, k=SIMILAR_K, topic_weight=TOPIC_WEIGHT, approximate=None,
+                           n_candidates=None, directory=SIMILARITY_DIR):
+    """
+    Precompute and save every restaurant's nearest neighbours.
+
+    Args:
+        X (sparse matrix): TF-IDF matrix.
+        doc_topic (np.ndarray): Topic mixtures aligned with X (e.g. DocTopicStore.weights).
+        ids (np.ndarray): Restaurant IDs aligned with X.
+        k (int): Neighbours kept per restaurant.
+        topic_weight (float): Weight of the topic cosine.
+        approximate (bool): Rerank embedding candidates instead of scoring every
+            pair; None decides by size (more than APPROXIMATE_ROWS restaurants).
+        n_candidates (int): Candidates reranked per restaurant in approximate mode
+            (default: candidate_count of the rows).
+        directory (str): Output directory.
+
+    Returns:
+        SimilarityIndex: The saved index.
+    """
+    if not X.shape[0] == len(doc_topic) == len(ids):
+        raise ValueError(f"TF-IDF ({X.shape[0]}), topic ({len(doc_topic)}) and ID ({len(ids)}) rows differ.")
+    if approximate is None:
+        approximate = X.shape[0] > APPROXIMATE_ROWS
+    mode = "approximate" if approximate else "exact"
+    if n_candidates is None:
+        n_candidates = candidate_count(X.shape[0])
+    print(f"Building {mode} similarity index for {X.shape[0]} restaurants...")
+    with span("similarity.build", rows=X.shape[0], mode=mode):
+        Z = combined_vectors(X, doc_topic, topic_weight)
+        if approximate:
+            neighbors, scores = approximate_neighbors(Z, k, n_candidates=n_candidates)
+        else:
+            neighbors, scores = exact_neighbors(Z, k)
+
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, "manifest.json")
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    for name, array in (("neighbors", neighbors), ("scores", scores), ("ids", np.asarray(ids, dtype=np.uint64))):
+        np.save(os.path.join(directory, f"{name}.tmp.npy"), array)
+        os.replace(os.path.join(directory, f"{name}.tmp.npy"), os.path.join(directory, f"{name}.npy"))
+    manifest = {
+        "rows": int(X.shape[0]),
+        "k": int(k),
+        "topic_weight": topic_weight,
+        "mode": mode,
+        "n_candidates": int(n_candidates) if approximate else None,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(f"{manifest_path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+    print(f"Saved similarity index to {directory}")
+    return SimilarityIndex(directory)
+
+def similarity_index_exists(directory=SIMILARITY_DIR):
+    """True if the directory holds a finished similarity index."""
+    return os.path.exists(os.path.join(directory, "manifest.json"))
+
+class SimilarityIndex:
+    """
+    Precomputed nearest neighbours, memory-mapped and keyed by restaurant ID.
+
+    Args:
+        directory (str): Directory written by build_similarity_index.
+    """
+
+    def __init__(self, directory=SIMILARITY_DIR):
+        with open(os.path.join(directory, "manifest.json"), "r") as f:
+            self.manifest = json.load(f)
+        self.neighbors = np.load(os.path.join(directory, "neighbors.npy"), mmap_mode="r")
+        self.scores = np.load(os.path.join(directory, "scores.npy"), mmap_mode="r")
+        self.ids = np.load(os.path.join(directory, "ids.npy"), mmap_mode="r")
+        self._index = IdIndex(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def similar(self, restaurant_id, k=None):
+        """
+        The restaurants most like one restaurant.
+
+        Args:
+            restaurant_id (int): Restaurant ID (see doc_topics.restaurant_ids).
+            k (int): Neighbours returned (at most the k the index was built with).
+
+        Returns:
+            tuple: (ids, scores) arrays, most similar first; empty if the
+            restaurant is not in the index.
+        """
+        row = self._index.positions([restaurant_id])[0]
+        if row < 0:
+            return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.float32)
+        found = self.neighbors[row, :k]
+        kept = found >= 0
+        return self.ids[found[kept]], np.asarray(self.scores[row, :k][kept])
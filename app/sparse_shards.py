@@ -0,0 +1,327 @@
+# app/sparse_shards.py
+
+"""
+Out-of-core TF-IDF: the document-term matrix as memory-mapped CSR shards.
+- Pass 1 streams descriptions from an artifact, counts terms with the fused
+  tokenizer and writes one shard of raw counts per batch of rows, plus document
+  and term frequencies for the whole corpus
+- Pass 2 prunes the vocabulary (min_df / max_df / max_features, with
+  TfidfVectorizer's semantics) and writes TF-IDF shards as .npy files
+- ShardedMatrix opens shards lazily with np.load(mmap_mode="r"), so LDA training
+  and inference hold one shard in memory at a time
+- Count shards are keyed by the source file and the tokenizer config, so runs
+  that only change pruning or the model reuse them; each pruning config keeps
+  its own TF-IDF shards next to them
+- Shards live under data/cache/tfidf_shards/ and can be deleted at any time
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from contextlib import nullcontext
+from numbers import Integral
+import numpy as np
+from app.artifacts import artifact_path, iter_artifact_batches
+from app.instrumentation import span
+from app.nlp_topic_modeling import (
+    STOPWORDS_PATH, count_terms_into, load_stopwords, tokenizer_fingerprint, tokenizer_pool,
+)
+from app.stemmer_custom import get_stem_cache
+
+# Paths
+SHARD_DIR = os.path.join("data", "cache", "tfidf_shards")
+
+# Rows per shard; a multiple of LatentDirichletAllocation's batch_size (128), so
+# online training over shards sees the same mini-batches as over the full matrix
+SHARD_ROWS = 65_536
+
+def _read_manifest(directory):
+    # None unless the directory holds a finished set of shards (the manifest is written last)
+    path = os.path.join(directory, "manifest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _write_manifest(directory, manifest):
+    tmp_path = os.path.join(directory, "manifest.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, "manifest.json"))
+
+def _save_csr(directory, prefix, X):
+    for name in ("data", "indices", "indptr"):
+        np.save(os.path.join(directory, f"{prefix}.{name}.npy"), getattr(X, name))
+
+def _load_csr(directory, prefix, n_rows, n_cols, nnz):
+    from scipy import sparse
+
+    # numpy cannot memory-map a zero-length array
+    mmap_mode = "r" if nnz else None
+    data, indices, indptr = (
+        np.load(os.path.join(directory, f"{prefix}.{name}.npy"), mmap_mode=mmap_mode)
+        for name in ("data", "indices", "indptr")
+    )
+    return sparse.csr_matrix((data, indices, indptr), shape=(n_rows, n_cols), copy=False)
+
+def _grow(values, size):
+    return values if len(values) >= size else np.concatenate([values, np.zeros(size - len(values), dtype=values.dtype)])
+
+def count_shards_key(source, stopwords_custom, shard_rows):
+    """
+    Identify a set of count shards: the source file state, tokenizer config and shard size.
+
+    Returns:
+        str: Hex digest used as the shard directory name.
+    """
+    stat = os.stat(artifact_path(source))
+    key = f"{source}|{stat.st_size}|{stat.st_mtime_ns}|{tokenizer_fingerprint(stopwords_custom)}|{shard_rows}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+def _remove_outdated(source):
+    # Count shards of an earlier version of the source file can never be reused
+    stat = os.stat(artifact_path(source))
+    if not os.path.isdir(SHARD_DIR):
+        return
+    for name in os.listdir(SHARD_DIR):
+        manifest = _read_manifest(os.path.join(SHARD_DIR, name))
+        if manifest and manifest["source"] == source and (manifest["size"], manifest["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+            shutil.rmtree(os.path.join(SHARD_DIR, name), ignore_errors=True)
+
+def build_count_shards(source="michelin_full", shard_rows=SHARD_ROWS, n_jobs=1):
+    """
+    Pass 1: stream an artifact's descriptions into shards of raw term counts.
+
+    Term ids follow first appearance in the corpus, as in CountVectorizer.
+    An existing, finished set of shards for the same source file and
+    tokenizer config is reused as is.
+
+    Args:
+        source (str): Artifact with a `description` column.
+        shard_rows (int): Rows per shard; bounds peak memory.
+        n_jobs (int): Worker processes for tokenization (-1 = all cores).
+
+    Returns:
+        str: Directory holding the count shards.
+    """
+    stopwords_custom = load_stopwords(STOPWORDS_PATH)
+    directory = os.path.join(SHARD_DIR, count_shards_key(source, stopwords_custom, shard_rows))
+    if _read_manifest(directory) is not None:
+        print(f"Reusing term count shards in {directory}")
+        return directory
+
+    _remove_outdated(source)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    stat = os.stat(artifact_path(source))
+    vocab = {}
+    doc_freq = np.zeros(0, dtype=np.int64)
+    term_freq = np.zeros(0, dtype=np.float64)
+    rows, nnz = [], []
+
+    print(f"Counting terms into shards of {shard_rows} rows...")
+    get_stem_cache()
+    pool = tokenizer_pool(stopwords_custom, n_jobs) if n_jobs != 1 else nullcontext()
+    with span("shards.count", n_jobs=n_jobs) as s, pool as executor:
+        for index, chunk in enumerate(iter_artifact_batches(source, columns=["description"], batch_size=shard_rows)):
+            X = count_terms_into(chunk["description"], stopwords_custom, vocab, executor=executor, dtype=np.int32)
+            doc_freq = _grow(doc_freq, len(vocab))
+            term_freq = _grow(term_freq, len(vocab))
+            doc_freq += np.bincount(X.indices, minlength=len(vocab))
+            term_freq += np.bincount(X.indices, weights=X.data, minlength=len(vocab))
+            _save_csr(directory, f"counts_{index:06d}", X)
+            rows.append(X.shape[0])
+            nnz.append(int(X.nnz))
+        s.rows = sum(rows)
+
+    with open(os.path.join(directory, "vocabulary.json"), "w") as f:
+        json.dump(list(vocab), f)
+    np.savez(os.path.join(directory, "frequencies.npz"), doc_freq=doc_freq, term_freq=term_freq)
+    _write_manifest(directory, {
+        "source": source,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "tokenizer": tokenizer_fingerprint(stopwords_custom),
+        "shard_rows": shard_rows,
+        "n_docs": sum(rows),
+        "n_features": len(vocab),
+        "rows": rows,
+        "nnz": nnz,
+    })
+    return directory
+
+def select_features(terms, doc_freq, term_freq, n_docs, min_df=1, max_df=1.0, max_features=None):
+    """
+    Prune a vocabulary the way TfidfVectorizer(min_df, max_df, max_features) does.
+
+    Args:
+        terms (list): Terms in id order.
+        doc_freq (np.ndarray): Documents containing each term.
+        term_freq (np.ndarray): Total occurrences of each term.
+        n_docs (int): Number of documents.
+        min_df (int or float): Minimum document count (or proportion).
+        max_df (int or float): Maximum document count (or proportion).
+        max_features (int): Keep at most this many of the most frequent terms.
+
+    Returns:
+        np.ndarray: Ids of the kept terms, in alphabetical order of the terms.
+
+    Raises:
+        ValueError: If the thresholds conflict or no term survives.
+    """
+    max_doc_count = max_df if isinstance(max_df, Integral) else max_df * n_docs
+    min_doc_count = min_df if isinstance(min_df, Integral) else min_df * n_docs
+    if max_doc_count < min_doc_count:
+        raise ValueError("max_df corresponds to < documents than min_df")
+
+    order = np.argsort(np.array(terms, dtype=object), kind="stable")
+    dfs = doc_freq[order]
+    mask = (dfs <= max_doc_count) & (dfs >= min_doc_count)
+    if max_features is not None and mask.sum() > max_features:
+        mask_inds = (-term_freq[order][mask]).argsort()[:max_features]
+        new_mask = np.zeros(len(dfs), dtype=bool)
+        new_mask[np.where(mask)[0][mask_inds]] = True
+        mask = new_mask
+    if not mask.any():
+        raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+    return order[mask]
+
+def build_tfidf_shards(source="michelin_full", shard_rows=SHARD_ROWS, n_jobs=1, min_df=1, max_df=1.0,
+                       max_features=None, dtype=np.float64):
+    """
+    Build (or reuse) memory-mapped TF-IDF shards for an artifact's descriptions.
+
+    Without pruning the shards stacked together equal vectorize_descriptions()'s
+    matrix bit for bit; with pruning they match TfidfVectorizer fitted with the
+    same min_df, max_df and max_features.
+
+    Args:
+        source (str): Artifact with a `description` column.
+        shard_rows (int): Rows per shard; bounds peak memory.
+        n_jobs (int): Worker processes for tokenization (-1 = all cores).
+        min_df (int or float): Drop terms in fewer documents (or a smaller share).
+        max_df (int or float): Drop terms in more documents (or a larger share).
+        max_features (int): Keep only this many of the most frequent terms.
+        dtype (type): Stored value type (np.float32 halves the shard size).
+
+    Returns:
+        tuple: (TfidfVectorizer with the pruned vocabulary and IDF, ShardedMatrix)
+    """
+    from scipy import sparse
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.preprocessing import normalize
+
+    counts_dir = build_count_shards(source, shard_rows, n_jobs)
+    counts = _read_manifest(counts_dir)
+    with open(os.path.join(counts_dir, "vocabulary.json"), "r") as f:
+        terms = json.load(f)
+    frequencies = np.load(os.path.join(counts_dir, "frequencies.npz"))
+    n_docs = counts["n_docs"]
+
+    kept = select_features(terms, frequencies["doc_freq"], frequencies["term_freq"], n_docs, min_df, max_df, max_features)
+    idf = np.log((1 + n_docs) / (1 + frequencies["doc_freq"][kept].astype(np.float64))) + 1
+    vectorizer = TfidfVectorizer(vocabulary={terms[i]: j for j, i in enumerate(kept)})
+    vectorizer.idf_ = idf
+
+    config = {"min_df": min_df, "max_df": max_df, "max_features": max_features, "dtype": np.dtype(dtype).name}
+    config_key = hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    directory = os.path.join(counts_dir, f"tfidf_{config_key}")
+    if _read_manifest(directory) is not None:
+        print(f"Reusing TF-IDF shards in {directory}")
+        return vectorizer, ShardedMatrix(directory)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    rank = np.full(len(terms), -1, dtype=np.int64)
+    rank[kept] = np.arange(len(kept))
+    nnz = []
+
+    print(f"Writing TF-IDF shards ({len(kept)} of {len(terms)} terms kept)...")
+    with span("shards.tfidf", rows=n_docs, vocabulary=len(kept)):
+        for index, (n_rows, n_values) in enumerate(zip(counts["rows"], counts["nnz"])):
+            X = _load_csr(counts_dir, f"counts_{index:06d}", n_rows, len(terms), n_values)
+            columns = rank[X.indices]
+            keep = columns >= 0
+            indptr = np.concatenate([[0], np.cumsum(keep)])[X.indptr]
+
+            # Same arithmetic as TfidfTransformer: float64 counts times IDF, then L2 row norms
+            data = X.data[keep].astype(np.float64)
+            data *= idf[columns[keep]]
+            shard = sparse.csr_matrix((data, columns[keep].astype(X.indices.dtype), indptr.astype(X.indptr.dtype)),
+                                      shape=(n_rows, len(kept)))
+            shard = normalize(shard, norm="l2", copy=False)
+            shard.data = shard.data.astype(dtype, copy=False)
+            _save_csr(directory, f"shard_{index:06d}", shard)
+            nnz.append(int(shard.nnz))
+
+    _write_manifest(directory, {**config, "n_docs": n_docs, "n_features": len(kept), "rows": counts["rows"], "nnz": nnz})
+    return vectorizer, ShardedMatrix(directory)
+
+class ShardedMatrix:
+    """
+    Read-only CSR matrix stored as row shards of memory-mapped .npy files.
+
+    Shards are opened one at a time when asked for; only the pages a consumer
+    reads are loaded, and the OS can drop them again under memory pressure.
+
+    Args:
+        directory (str): TF-IDF shard directory written by build_tfidf_shards.
+    """
+
+    def __init__(self, directory):
+        manifest = _read_manifest(directory)
+        if manifest is None:
+            raise FileNotFoundError(f"No finished shards in {directory}")
+        self.directory = directory
+        self.rows = manifest["rows"]
+        self.nnz_per_shard = manifest["nnz"]
+        self.shape = (manifest["n_docs"], manifest["n_features"])
+        self.dtype = np.dtype(manifest["dtype"])
+
+    @property
+    def n_shards(self):
+        return len(self.rows)
+
+    @property
+    def nnz(self):
+        return sum(self.nnz_per_shard)
+
+    def shard(self, index):
+        """Shard `index` as a csr_matrix backed by memory-mapped arrays."""
+        return _load_csr(self.directory, f"shard_{index:06d}", self.rows[index], self.shape[1], self.nnz_per_shard[index])
+
+    def iter_shards(self):
+        """Yield the shards in row order."""
+        for index in range(self.n_shards):
+            yield self.shard(index)
+
+    def to_csr(self):
+        """Load every shard into one in-memory csr_matrix (for small corpora and checks)."""
+        from scipy import sparse
+        return sparse.vstack(list(self.iter_shards()), format="csr")
+
+def fit_lda_on_shards(X, n_topics, max_iter=10, random_state=42):
+    """
+    Train online LDA over a ShardedMatrix, reading one shard at a time.
+
+    Equivalent to LatentDirichletAllocation(learning_method="online").fit() on
+    the whole matrix when every shard but the last is a multiple of batch_size rows.
+
+    Args:
+        X (ShardedMatrix): TF-IDF shards.
+        n_topics (int): Number of topics.
+        max_iter (int): Passes over the corpus.
+        random_state (int): Seed.
+
+    Returns:
+        LatentDirichletAllocation: Fitted model.
+    """
+    from sklearn.decomposition import LatentDirichletAllocation
+
+    lda = LatentDirichletAllocation(n_components=n_topics, learning_method="online", total_samples=X.shape[0],
+                                    max_iter=max_iter, random_state=random_state)
+    for _ in range(max_iter):
+        for shard in X.iter_shards():
+            lda.partial_fit(shard)
+    return lda
@@ -0,0 +1,215 @@
+# app/spatial_index.py
+
+"""
+Grid spatial index over restaurant coordinates.
+- Rows are bucketed into a uniform lat/lon grid and stored sorted by cell
+- Bounding-box queries touch one contiguous slice per grid row; cells fully
+  inside the box are taken whole, and only points in its edge cells are tested
+  (tables under LINEAR_SCAN_ROWS are scanned directly, which is faster there)
+- k-nearest queries expand rings of cells until the k-th haversine distance
+  is provably within the searched area
+- Optional row masks restrict queries to the rows that passed other filters
+"""
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = np.pi * EARTH_RADIUS_KM / 180
+
+# Target average number of restaurants per occupied grid cell
+POINTS_PER_CELL = 16
+MIN_CELL_DEG = 1e-4
+
+# Boxes spanning more grid rows than this, or over fewer rows than LINEAR_SCAN_ROWS
+# (where four comparisons per row beat the grid lookups), are answered with one linear scan
+MAX_SLICED_ROWS = 1024
+LINEAR_SCAN_ROWS = 50_000
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in kilometres (vectorized over numpy arrays)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def bbox_around(lat, lon, radius_km):
+    """Return the (south, west, north, east) box enclosing a circle around a point."""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    dlon = radius_km / (KM_PER_DEGREE_LAT * max(np.cos(np.radians(lat)), 1e-6))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+class SpatialIndex:
+    """
+    Uniform-grid index; query results are row positions into the indexed arrays.
+
+    Args:
+        lat (array): Latitudes in degrees.
+        lon (array): Longitudes in degrees.
+        cell_deg (float): Grid cell size in degrees. Chosen automatically so
+            that occupied cells hold about POINTS_PER_CELL rows when omitted.
+    """
+
+    def __init__(self, lat, lon, cell_deg=None):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.n_rows = len(self.lat)
+        valid = np.flatnonzero(np.isfinite(self.lat) & np.isfinite(self.lon))
+
+        if len(valid):
+            self.south, self.north = self.lat[valid].min(), self.lat[valid].max()
+            self.west, self.east = self.lon[valid].min(), self.lon[valid].max()
+        else:
+            self.south = self.north = self.west = self.east = 0.0
+
+        if cell_deg is None:
+            cell_deg = self._fit_cell_size(self.lat[valid], self.lon[valid])
+        self.cell_deg = max(float(cell_deg), MIN_CELL_DEG)
+        self.n_lat_cells = int((self.north - self.south) / self.cell_deg) + 1
+        self.n_lon_cells = int((self.east - self.west) / self.cell_deg) + 1
+
+        cells = self._cell_ids(self.lat[valid], self.lon[valid])
+        order = np.argsort(cells, kind="stable")
+        self.rows = valid[order]
+        self.cells = cells[order]
+        # Coordinates in cell order, so each grid row's candidates are contiguous
+        self.sorted_lat = self.lat[self.rows]
+        self.sorted_lon = self.lon[self.rows]
+
+    def _fit_cell_size(self, lat, lon):
+        # Start from the average density over the bounding box, then shrink cells
+        # while the occupied ones are much fuller than the target (clustered cities)
+        area = max((self.north - self.south) * (self.east - self.west), MIN_CELL_DEG ** 2)
+        cell_deg = np.sqrt(area * POINTS_PER_CELL / max(len(lat), 1))
+        for _ in range(4):
+            if cell_deg <= MIN_CELL_DEG:
+                break
+            keys = ((lat - self.south) // cell_deg) * (int((self.east - self.west) / cell_deg) + 1) + (lon - self.west) // cell_deg
+            per_cell = len(lat) / max(len(np.unique(keys)), 1)
+            if per_cell <= 2 * POINTS_PER_CELL:
+                break
+            cell_deg /= np.sqrt(per_cell / POINTS_PER_CELL)
+        return cell_deg
+
+    def _cell_coords(self, lat, lon):
+        i = np.clip(((lat - self.south) // self.cell_deg).astype(np.int64), 0, self.n_lat_cells - 1)
+        j = np.clip(((lon - self.west) // self.cell_deg).astype(np.int64), 0, self.n_lon_cells - 1)
+        return i, j
+
+    def _cell_ids(self, lat, lon):
+        i, j = self._cell_coords(lat, lon)
+        return i * self.n_lon_cells + j
+
+    def _cell_range(self, low, high, origin, n_cells):
+        # First and last grid row (or column) of an interval, rounded as in _cell_coords
+        origin, cell_deg = float(origin), self.cell_deg
+        first = min(max(int((low - origin) // cell_deg), 0), n_cells - 1)
+        last = min(max(int((high - origin) // cell_deg), 0), n_cells - 1)
+        return first, last
+
+    def _cell_slices(self, i0, i1, j0, j1):
+        # Cells of one grid row are contiguous in sorted order: one slice per grid row
+        i0, i1 = max(i0, 0), min(i1, self.n_lat_cells - 1)
+        j0, j1 = max(j0, 0), min(j1, self.n_lon_cells - 1)
+        if i0 > i1 or j0 > j1:
+            return []
+        first = np.arange(i0, i1 + 1) * self.n_lon_cells
+        starts = np.searchsorted(self.cells, first + j0, side="left")
+        ends = np.searchsorted(self.cells, first + j1, side="right")
+        return [slice(s, e) for s, e in zip(starts.tolist(), ends.tolist()) if e > s]
+
+    def _gather(self, slices, *arrays):
+        if not slices:
+            return [np.empty(0, dtype=a.dtype) for a in arrays]
+        return [np.concatenate([a[s] for s in slices]) for a in arrays]
+
+    def bounds(self):
+        """Return (south, west, north, east) of the indexed points."""
+        return self.south, self.west, self.north, self.east
+
+    def bbox(self, south, west, north, east, mask=None):
+        """
+        Rows inside a bounding box (inclusive), in ascending row order.
+
+        Args:
+            south, west, north, east (float): Box edges in degrees.
+            mask (array): Optional boolean array over rows; only True rows are returned.
+
+        Returns:
+            np.ndarray: Row positions.
+        """
+        if north < self.south or south > self.north or east < self.west or west > self.east:
+            return np.empty(0, dtype=np.int64)
+        linear = self.n_rows < LINEAR_SCAN_ROWS
+        if not linear:
+            i0, i1 = self._cell_range(south, north, self.south, self.n_lat_cells)
+            j0, j1 = self._cell_range(west, east, self.west, self.n_lon_cells)
+            linear = i1 - i0 + 1 > MAX_SLICED_ROWS
+        if linear:
+            found = np.flatnonzero((self.lat >= south) & (self.lat <= north) & (self.lon >= west) & (self.lon <= east))
+        else:
+            # Per grid row: where the box's first column, the next one, its last column and the one after start
+            first = np.arange(i0 * self.n_lon_cells, (i1 + 1) * self.n_lon_cells, self.n_lon_cells)
+            a, b, c, d = np.searchsorted(self.cells, first + np.array([[j0], [j0 + 1], [j1], [j1 + 1]])).tolist()
+            if i1 - i0 < 2 or j1 - j0 < 2:
+                inner, edge = [], list(zip(a, d))
+            else:
+                # Cells strictly inside the box's first/last grid rows and columns hold only matches
+                inner = list(zip(b[1:-1], c[1:-1]))
+                edge = [(a[0], d[0]), (a[-1], d[-1])] + list(zip(a[1:-1], b[1:-1])) + list(zip(c[1:-1], d[1:-1]))
+            slices = [slice(s, e) for s, e in edge if e > s]
+            candidates, lat, lon = self._gather(slices, self.rows, self.sorted_lat, self.sorted_lon)
+            keep = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+            found = np.concatenate([self.rows[s:e] for s, e in inner if e > s] + [candidates[keep]])
+            found.sort()
+        if mask is not None:
+            found = found[np.asarray(mask, dtype=bool)[found]]
+        return found
+
+    def nearest(self, lat, lon, k=5, mask=None):
+        """
+        The k rows closest to a point by great-circle distance.
+
+        Args:
+            lat, lon (float): Query point in degrees.
+            k (int): Number of neighbours.
+            mask (array): Optional boolean array over rows; only True rows are considered.
+
+        Returns:
+            tuple: (row positions, distances in km), nearest first.
+        """
+        k = max(int(k), 1)
+        mask = None if mask is None else np.asarray(mask, dtype=bool)
+        ci, cj = self._cell_coords(np.array([lat]), np.array([lon]))
+        ci, cj = int(ci[0]), int(cj[0])
+        max_ring = max(ci, cj, self.n_lat_cells - 1 - ci, self.n_lon_cells - 1 - cj)
+
+        # Smallest km per degree of longitude over the searched latitudes (conservative)
+        km_per_deg_lon = KM_PER_DEGREE_LAT * np.cos(np.radians(min(max(abs(self.south), abs(self.north), abs(lat)), 89.9)))
+
+        ring = 0
+        while True:
+            candidates, cand_lat, cand_lon = self._gather(
+                self._cell_slices(ci - ring, ci + ring, cj - ring, cj + ring), self.rows, self.sorted_lat, self.sorted_lon
+            )
+            if mask is not None:
+                keep = mask[candidates]
+                candidates, cand_lat, cand_lon = candidates[keep], cand_lat[keep], cand_lon[keep]
+            if len(candidates) >= k or ring >= max_ring:
+                distances = haversine_km(lat, lon, cand_lat, cand_lon)
+                if len(candidates) > k:
+                    top = np.argpartition(distances, k - 1)[:k]
+                    candidates, distances = candidates[top], distances[top]
+                order = np.argsort(distances, kind="stable")
+                candidates, distances = candidates[order], distances[order]
+
+                # Distance from the query point to the edge of the searched square
+                covered_deg = min(
+                    lat - (self.south + (ci - ring) * self.cell_deg),
+                    (self.south + (ci + ring + 1) * self.cell_deg) - lat,
+                    lon - (self.west + (cj - ring) * self.cell_deg),
+                    (self.west + (cj + ring + 1) * self.cell_deg) - lon,
+                )
+                covered_km = covered_deg * min(KM_PER_DEGREE_LAT, km_per_deg_lon)
+                if ring >= max_ring or (len(distances) and distances[-1] <= covered_km):
+                    return candidates, distances
+            # Grow geometrically so sparse regions need few passes
+            ring = min(max(ring + 1, ring * 2), max_ring)
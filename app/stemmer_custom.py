@@ -2,32 +2,227 @@
 
 """
 Custom stemming module for Michelin restaurant description NLP analysis.
-- Uses NLTK's PorterStemmer.
+- Uses NLTK's PorterStemmer (nltk is imported lazily, on the first stem computed).
 - Simple function to stem a list of tokens.
+- Bounded LRU cache of token -> stem with hit/miss statistics.
+- Optional on-disk persistence so later runs start with a warm cache.
+- Pool workers record the stems they compute and hand them back with their
+  results, so the parent's cache (the one that is saved) learns them too.
 - Designed for consistent token cleaning before TF-IDF/LDA modeling.
 """
 
-import nltk
-from nltk.stem import PorterStemmer
+import json
+import os
+from collections import OrderedDict
+from importlib.metadata import version
 
-# Initialize stemmer
-stemmer = PorterStemmer()
+# PorterStemmer mode (nltk is imported on the first cache miss, not at import time)
+STEMMER_MODE = "NLTK_EXTENSIONS"
+
+# Identifies the stemmer output; persisted caches from another version are ignored
+STEMMER_VERSION = f"porter-{STEMMER_MODE}-nltk{version('nltk')}"
+
+# Cache defaults
+DEFAULT_CACHE_SIZE = 100_000
+STEM_CACHE_PATH = os.path.join("data", "cache", "stem_cache.json")
+
+_stemmer = None
+
+def get_stemmer():
+    """Return the shared PorterStemmer, importing nltk on first use."""
+    global _stemmer
+    if _stemmer is None:
+        from nltk.stem.porter import PorterStemmer
+        _stemmer = PorterStemmer(mode=STEMMER_MODE)
+    return _stemmer
+
+class StemCache:
+    """
+    Least-recently-used cache mapping surface tokens to their stems.
+
+    Args:
+        max_size (int): Maximum number of cached tokens before the least
+            recently used entry is evicted.
+        stemmer (PorterStemmer): Stemmer used on cache misses. Defaults to a
+            shared PorterStemmer created on the first miss.
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE, stemmer=None):
+        self.max_size = max_size
+        self.stemmer = stemmer
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stems = OrderedDict()
+        self._new = None
+
+    def __len__(self):
+        return len(self._stems)
+
+    def stem(self, token):
+        """
+        Return the stem of a token, computing it only on a cache miss.
+
+        Args:
+            token (str): Surface token.
+
+        Returns:
+            str: Stemmed token.
+        """
+        stems = self._stems
+        try:
+            stem = stems[token]
+        except KeyError:
+            self.misses += 1
+            if self.stemmer is None:
+                self.stemmer = get_stemmer()
+            stem = stems[token] = self.stemmer.stem(token)
+            if self._new is not None:
+                self._new[token] = stem
+            if len(stems) > self.max_size:
+                stems.popitem(last=False)
+                self.evictions += 1
+            return stem
+        self.hits += 1
+        stems.move_to_end(token)
+        return stem
+
+    def record_new(self):
+        """Start collecting the stems computed on cache misses (see pop_new)."""
+        self._new = {}
+
+    def pop_new(self):
+        """
+        Stems computed since record_new() or the last call, then forget them.
+
+        Returns:
+            list: (token, stem) pairs; empty when not recording.
+        """
+        if not self._new:
+            return []
+        new, self._new = list(self._new.items()), {}
+        return new
+
+    def update(self, entries):
+        """
+        Add stems computed by another cache, such as a pool worker's.
+
+        They count as misses, since each was computed rather than found.
+
+        Args:
+            entries (list): (token, stem) pairs from pop_new().
+        """
+        stems = self._stems
+        for token, stem in entries:
+            if token not in stems:
+                self.misses += 1
+            stems[token] = stem
+            stems.move_to_end(token)
+        while len(stems) > self.max_size:
+            stems.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """
+        Summarize cache usage.
+
+        Returns:
+            dict: Hits, misses, evictions, current size, max size and hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._stems),
+            "max_size": self.max_size,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        """Drop every cached entry and reset statistics."""
+        self._stems.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def save(self, path=STEM_CACHE_PATH):
+        """
+        Persist cached entries (least recently used first) as JSON.
+
+        Args:
+            path (str): Destination file; parent directories are created.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": STEMMER_VERSION, "entries": list(self._stems.items())}, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path=STEM_CACHE_PATH):
+        """
+        Merge entries from a persisted cache file into this cache.
+
+        Missing files and caches written by a different stemmer version
+        are ignored.
+
+        Args:
+            path (str): File written by `save`.
+
+        Returns:
+            int: Number of entries loaded.
+        """
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r") as f:
+            payload = json.load(f)
+        if payload.get("version") != STEMMER_VERSION:
+            return 0
+
+        # Keep the most recently used entries when the file exceeds max_size
+        entries = payload.get("entries", [])[-self.max_size:]
+        for token, stem in entries:
+            self._stems[token] = stem
+            self._stems.move_to_end(token)
+        while len(self._stems) > self.max_size:
+            self._stems.popitem(last=False)
+        return len(entries)
+
+# Shared cache used by stem_tokens unless another cache is passed in
+stem_cache = StemCache()
+_loaded_paths = set()
+
+def get_stem_cache(path=STEM_CACHE_PATH):
+    """
+    Return the shared stem cache, warming it from disk on first use.
+
+    Args:
+        path (str): Persisted cache file to load once per process.
+
+    Returns:
+        StemCache: The module-level cache.
+    """
+    if path not in _loaded_paths:
+        stem_cache.load(path)
+        _loaded_paths.add(path)
+    return stem_cache
 
 # Function to stem tokens
-def stem_tokens(tokens):
+def stem_tokens(tokens, cache=None):
     """
     Stem a list of tokens.
 
     Args:
         tokens (list): List of word tokens (strings).
+        cache (StemCache): Cache to use. Defaults to the shared module cache.
 
     Returns:
         list: List of stemmed tokens.
     """
-    return [stemmer.stem(token) for token in tokens]
+    stem = (stem_cache if cache is None else cache).stem
+    return [stem(token) for token in tokens]
 
 # If running directly (testing)
 if __name__ == "__main__":
-    sample_tokens = ["cooking", "cooked", "dishes", "restaurants"]
+    sample_tokens = ["cooking", "cooked", "dishes", "restaurants", "cooking"]
     print("Original:", sample_tokens)
     print("Stemmed:", stem_tokens(sample_tokens))
+    print("Cache:", stem_cache.stats())
@@ -0,0 +1,195 @@
+# app/stopword_mask.py
+
+"""
+Stopword edits without re-tokenizing: masked-vocabulary TF-IDF.
+- custom_tokenizer drops stopwords before stemming, so the corpus is counted
+  once before that step: one column per surface token (lowercase, letters
+  only, longer than two characters), with the stem of each token
+- A stopword list is then applied to that matrix: stopword columns are
+  masked out and the remaining surface forms are summed into their stems (one
+  sparse product with a surface → stem indicator matrix)
+- Stems are numbered and rows ordered exactly as the fused tokenizer would,
+  and document frequencies come from the remapped columns, so the counts and
+  TF-IDF are identical to a full rerun with the edited list
+- The counts are cached with a hash of the descriptions and the tokenizer and
+  stemmer versions (not the stopwords), so only new descriptions or a new
+  stemmer trigger a recount
+"""
+
+import hashlib
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from app.instrumentation import span
+from app.nlp_topic_modeling import (
+    TOKENIZE_CHUNK_SIZE, TOKENIZER_VERSION, count_terms_into, sort_vocabulary, tfidf_from_counts,
+)
+from app.stemmer_custom import STEMMER_VERSION, get_stem_cache
+
+# Paths
+SURFACE_COUNTS_PATH = os.path.join("data", "cache", "surface_counts.pkl")
+
+def surface_fingerprint(descriptions):
+    """
+    Identify the corpus and tokenizer behind a surface-count matrix.
+
+    Args:
+        descriptions (iterable): Raw description strings.
+
+    Returns:
+        str: Hash of the tokenizer version, stemmer version and every description.
+    """
+    h = hashlib.sha1()
+    h.update(f"{TOKENIZER_VERSION}|{STEMMER_VERSION}|".encode("utf-8"))
+    h.update(pd.util.hash_array(np.asarray(list(descriptions), dtype=object)).tobytes())
+    return h.hexdigest()
+
+class SurfaceCounts:
+    """
+    Term counts taken before the stopword filter, with the stem of every column.
+
+    Args:
+        counts (scipy.sparse.csr_matrix): Documents × surface tokens, columns
+            numbered in first-seen order, sorted row indices.
+        surfaces (np.ndarray): Surface token of each column.
+        stems (np.ndarray): Stem of each column.
+        fingerprint (str): surface_fingerprint of the counted descriptions.
+    """
+
+    def __init__(self, counts, surfaces, stems, fingerprint=None):
+        self.counts = counts
+        self.surfaces = surfaces
+        self.stems = stems
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, descriptions, n_jobs=1, chunk_size=TOKENIZE_CHUNK_SIZE, executor=None, stem_cache=None):
+        """
+        Count the surface tokens of every description and stem the vocabulary.
+
+        Args:
+            descriptions (iterable): Raw description strings.
+            n_jobs (int): Worker processes (-1 = all cores).
+            chunk_size (int): Descriptions per worker task.
+            executor (ProcessPoolExecutor): Existing pool from tokenizer_pool().
+            stem_cache (StemCache): Cache used to stem the vocabulary; defaults to
+                the shared cache (not saved here: callers that own it save it).
+
+        Returns:
+            SurfaceCounts: The counts.
+        """
+        descriptions = list(descriptions)
+        print("Counting surface tokens (before stopwords and stemming)...")
+        with span("stopword_mask.count", rows=len(descriptions), n_jobs=n_jobs) as s:
+            vocab = {}
+            counts = count_terms_into(descriptions, set(), vocab, n_jobs=n_jobs, chunk_size=chunk_size,
+                                      executor=executor, dtype=np.int32, surface=True)
+            # Each distinct token is stemmed once, not once per occurrence
+            stem_cache = get_stem_cache() if stem_cache is None else stem_cache
+            surfaces = np.array(list(vocab), dtype=object)
+            stems = np.array([stem_cache.stem(token) for token in surfaces], dtype=object)
+            s.surfaces = len(surfaces)
+        return cls(counts, surfaces, stems, surface_fingerprint(descriptions))
+
+    def save(self, path=SURFACE_COUNTS_PATH):
+        """Write the counts to a pickle file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        print(f"Saved surface counts to {path}")
+
+    @staticmethod
+    def load(path=SURFACE_COUNTS_PATH):
+        """The counts saved at path, or None if there are none."""
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def stem_columns(self, stopwords_custom):
+        """
+        Stem column of every surface column under a stopword list.
+
+        Args:
+            stopwords_custom (set): Stopwords to drop before stemming.
+
+        Returns:
+            tuple: (dict of stem -> first-seen column id, np.ndarray of the stem
+            column per surface column, -1 where the token is dropped)
+        """
+        # Surface columns are numbered by first occurrence, so a stem's first
+        # occurrence is that of its lowest-numbered kept surface form
+        vocab = {}
+        columns = np.full(len(self.surfaces), -1, dtype=np.int64)
+        for j, (token, stem) in enumerate(zip(self.surfaces, self.stems)):
+            # Stems of one character are dropped, as by TfidfVectorizer's token pattern
+            if token not in stopwords_custom and len(stem) > 1:
+                columns[j] = vocab.setdefault(stem, len(vocab))
+        return vocab, columns
+
+    def apply(self, stopwords_custom, dtype=np.float64):
+        """
+        Term counts under a stopword list, without re-tokenizing.
+
+        Args:
+            stopwords_custom (set): Stopwords to drop before stemming.
+            dtype (type): Matrix dtype.
+
+        Returns:
+            tuple: (np.ndarray of terms in sorted order, scipy.sparse.csr_matrix),
+            identical to count_terms on the original descriptions.
+        """
+        from scipy import sparse
+
+        vocab, columns = self.stem_columns(stopwords_custom)
+        kept = np.flatnonzero(columns >= 0)
+        # Masks the stopword columns and sums the surface forms of each stem
+        to_stems = sparse.csr_matrix(
+            (np.ones(len(kept), dtype=self.counts.dtype), (kept, columns[kept])), shape=(len(columns), len(vocab))
+        )
+        X = (self.counts @ to_stems).astype(dtype)
+        X.sort_indices()
+        return sort_vocabulary(vocab, X)
+
+    def vectorize(self, stopwords_custom):
+        """
+        TF-IDF under a stopword list, as vectorize_descriptions would give.
+
+        Args:
+            stopwords_custom (set): Stopwords to drop before stemming.
+
+        Returns:
+            tuple: (fitted TfidfVectorizer, sparse TF-IDF matrix)
+        """
+        print("Vectorizing with TF-IDF (masked surface counts)...")
+        with span("stopword_mask.vectorize", rows=self.counts.shape[0]) as s:
+            terms, counts = self.apply(stopwords_custom)
+            tfidf_vectorizer, X = tfidf_from_counts(terms, counts)
+            s.vocabulary = X.shape[1]
+        return tfidf_vectorizer, X
+
+def load_surface_counts(descriptions, path=SURFACE_COUNTS_PATH, n_jobs=1, chunk_size=TOKENIZE_CHUNK_SIZE):
+    """
+    Surface counts of the descriptions, recounted only if they (or the tokenizer) changed.
+
+    Args:
+        descriptions (iterable): Raw description strings.
+        path (str): Cache file.
+        n_jobs (int): Worker processes used when counting (-1 = all cores).
+        chunk_size (int): Descriptions per worker task.
+
+    Returns:
+        SurfaceCounts: The counts.
+    """
+    descriptions = list(descriptions)
+    cached = SurfaceCounts.load(path)
+    if cached is not None and cached.fingerprint == surface_fingerprint(descriptions):
+        print(f"Reusing surface counts from {path}")
+        return cached
+    counts = SurfaceCounts.build(descriptions, n_jobs=n_jobs, chunk_size=chunk_size)
+    counts.save(path)
+    get_stem_cache().save()
+    return counts
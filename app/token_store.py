@@ -0,0 +1,122 @@
+# app/token_store.py
+
+"""
+Persistent token store for incremental re-tokenization.
+- Caches stemmed tokens per description, keyed by a hash of the description text.
+- The whole store is tagged with a tokenizer fingerprint (stopwords + stemmer version);
+  a different fingerprint starts an empty store.
+- Only new or edited descriptions are sent to the tokenizer on a rerun.
+"""
+
+import hashlib
+import os
+import pickle
+
+TOKEN_STORE_PATH = os.path.join("data", "cache", "token_store.pkl")
+
+def description_key(text):
+    """
+    Hash a description into a stable store key.
+
+    Args:
+        text (str): Raw description.
+
+    Returns:
+        str: Hex digest of the UTF-8 encoded text.
+    """
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()
+
+class TokenStore:
+    """
+    On-disk map of description hash -> stemmed tokens.
+
+    Args:
+        fingerprint (str): Tokenizer configuration the cached tokens belong to.
+        path (str): Pickle file backing the store.
+    """
+
+    def __init__(self, fingerprint, path=TOKEN_STORE_PATH):
+        self.fingerprint = fingerprint
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._tokens = {}
+        self._dirty = False
+        self.load()
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def load(self):
+        """Load cached tokens if the file matches this store's fingerprint."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            payload = pickle.load(f)
+        if payload.get("fingerprint") == self.fingerprint:
+            self._tokens = payload["tokens"]
+
+    def save(self):
+        """Write the store to disk if anything changed since the last save."""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"fingerprint": self.fingerprint, "tokens": self._tokens}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def tokenize(self, descriptions, tokenize_fn):
+        """
+        Return tokens for every description, tokenizing only cache misses.
+
+        Args:
+            descriptions (iterable): Raw description strings.
+            tokenize_fn (callable): Maps a list of descriptions to a list of
+                token lists (e.g. a partial of `tokenize_descriptions`).
+
+        Returns:
+            list: One list of stemmed tokens per description, in input order.
+        """
+        descriptions = list(descriptions)
+        keys = [description_key(text) for text in descriptions]
+
+        # Tokenize each unseen description once, even if it appears on several rows
+        missing = {}
+        for key, text in zip(keys, descriptions):
+            if key not in self._tokens and key not in missing:
+                missing[key] = text
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+
+        if missing:
+            new_tokens = tokenize_fn(list(missing.values()))
+            for key, tokens in zip(missing, new_tokens):
+                self._tokens[key] = tuple(tokens)
+            self._dirty = True
+
+        return [list(self._tokens[key]) for key in keys]
+
+    def retain(self, descriptions):
+        """
+        Drop cached entries whose description is no longer present.
+
+        Args:
+            descriptions (iterable): Descriptions that should stay cached.
+        """
+        keep = {description_key(text) for text in descriptions}
+        stale = [key for key in self._tokens if key not in keep]
+        for key in stale:
+            del self._tokens[key]
+        if stale:
+            self._dirty = True
+
+    def stats(self):
+        """
+        Summarize store usage for the current process.
+
+        Returns:
+            dict: Hits, misses and number of cached descriptions.
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._tokens)}
@@ -0,0 +1,257 @@
+# app/topic_model.py
+
+"""
+Persisted topic model and batch topic assignment for new restaurants.
+- Saves the fitted TF-IDF vectorizer, LDA model and tokenizer configuration
+  as a versioned directory under data/models/topic_model/
+- Arrays are stored as .npy files and loaded memory-mapped
+- assign_topics() only runs transform, so topic IDs (and the hand-labeled
+  consumer scenes attached to them) stay stable between pipeline runs
+- A refit identical to the latest version (same tokenizer, vocabulary, IDF,
+  settings and topic-word weights) reuses it instead of saving a copy
+"""
+
+import hashlib
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.decomposition import LatentDirichletAllocation
+from app.nlp_topic_modeling import TOKENIZER_VERSION, TOPIC_KEYWORDS_PATH, TOP_WORDS, tokenize_descriptions, tokenizer_fingerprint
+from app.stemmer_custom import STEMMER_VERSION
+from app.topic_report import top_terms
+from app.apply_scene_tags import check_topic_words, load_scene_labels
+
+# Paths
+MODEL_DIR = os.path.join("data", "models", "topic_model")
+
+# Bump when the on-disk layout changes
+MODEL_FORMAT = 1
+
+# Vectorizer and LDA settings needed to rebuild the fitted objects
+VECTORIZER_PARAMS = ("lowercase", "token_pattern", "ngram_range", "norm", "use_idf", "smooth_idf", "sublinear_tf")
+LDA_PARAMS = ("n_components", "doc_topic_prior", "topic_word_prior", "learning_method", "learning_decay",
+              "learning_offset", "max_doc_update_iter", "mean_change_tol", "random_state")
+
+class TopicModel:
+    """
+    A loaded topic model version.
+
+    Attributes:
+        version (str): Version directory name, e.g. "v0003".
+        manifest (dict): Metadata saved with the model.
+        stopwords (set): Stopwords the model's tokenizer used.
+        vectorizer (TfidfVectorizer): Fitted vectorizer.
+        lda (LatentDirichletAllocation): Fitted LDA model.
+    """
+
+    def __init__(self, version, manifest, stopwords, vectorizer, lda):
+        self.version = version
+        self.manifest = manifest
+        self.stopwords = stopwords
+        self.vectorizer = vectorizer
+        self.lda = lda
+
+    @property
+    def n_topics(self):
+        return self.manifest["n_topics"]
+
+    def transform(self, descriptions):
+        """
+        Topic distribution for each description.
+
+        Args:
+            descriptions (iterable): Raw description strings.
+
+        Returns:
+            np.ndarray: Array of shape (n_descriptions, n_topics).
+        """
+        tokens = tokenize_descriptions(descriptions, self.stopwords)
+        X = self.vectorizer.transform(" ".join(t) for t in tokens)
+        return self.lda.transform(X)
+
+def _version_dirs(model_dir):
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(d for d in os.listdir(model_dir) if d.startswith("v") and d[1:].isdigit())
+
+def list_versions(model_dir=MODEL_DIR):
+    """Return saved model versions, oldest first."""
+    return _version_dirs(model_dir)
+
+# Manifest fields that, with the arrays, identify a model's content
+CONTENT_FIELDS = ("n_topics", "tokenizer_fingerprint", "vectorizer_params", "lda_params", "doc_topic_prior_",
+                  "topic_word_prior_")
+
+def _content_hash(manifest, vocabulary, idf, components):
+    h = hashlib.sha1()
+    # Through JSON, so fields read back from a manifest (tuples as lists) hash the same
+    fields = json.loads(json.dumps({k: manifest[k] for k in CONTENT_FIELDS}, default=str))
+    h.update(json.dumps(fields, sort_keys=True).encode("utf-8"))
+    h.update("\n".join(vocabulary).encode("utf-8"))
+    h.update(np.ascontiguousarray(idf, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(components, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+def _saved_content_hash(path):
+    # Versions saved before content hashes were recorded are hashed from their files
+    with open(os.path.join(path, "manifest.json"), "r") as f:
+        manifest = json.load(f)
+    if "content_hash" in manifest:
+        return manifest["content_hash"]
+    if any(k not in manifest for k in CONTENT_FIELDS):
+        return None
+    with open(os.path.join(path, "vocabulary.json"), "r") as f:
+        vocabulary = json.load(f)
+    return _content_hash(manifest, vocabulary, np.load(os.path.join(path, "idf.npy")),
+                         np.load(os.path.join(path, "components.npy")))
+
+def save_topic_model(vectorizer, lda, stopwords_custom, model_dir=MODEL_DIR):
+    """
+    Save a fitted vectorizer and LDA model as a new version.
+
+    A model identical to the latest saved version is not saved again; that
+    version is returned instead.
+
+    Args:
+        vectorizer (TfidfVectorizer): Fitted vectorizer.
+        lda (LatentDirichletAllocation): Fitted LDA model.
+        stopwords_custom (set): Stopwords used when tokenizing the training data.
+        model_dir (str): Root directory holding model versions.
+
+    Returns:
+        str: The new (or reused) version name.
+    """
+    feature_names = vectorizer.get_feature_names_out()
+    manifest = {
+        "format": MODEL_FORMAT,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "n_topics": int(lda.n_components),
+        "n_features": len(feature_names),
+        "tokenizer_version": TOKENIZER_VERSION,
+        "stemmer_version": STEMMER_VERSION,
+        "tokenizer_fingerprint": tokenizer_fingerprint(stopwords_custom),
+        "vectorizer_params": {k: vectorizer.get_params()[k] for k in VECTORIZER_PARAMS},
+        "lda_params": {k: lda.get_params()[k] for k in LDA_PARAMS},
+        "doc_topic_prior_": float(lda.doc_topic_prior_),
+        "topic_word_prior_": float(lda.topic_word_prior_),
+    }
+    manifest["content_hash"] = _content_hash(manifest, [str(term) for term in feature_names], vectorizer.idf_,
+                                             lda.components_)
+
+    existing = _version_dirs(model_dir)
+    if existing and _saved_content_hash(os.path.join(model_dir, existing[-1])) == manifest["content_hash"]:
+        print(f"Topic model unchanged, reusing {existing[-1]}")
+        return existing[-1]
+    version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+    path = os.path.join(model_dir, version)
+    tmp_path = f"{path}.tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+    manifest["version"] = version
+    manifest["top_words"] = top_terms(lda, feature_names, TOP_WORDS)
+
+    with open(os.path.join(tmp_path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    with open(os.path.join(tmp_path, "vocabulary.json"), "w") as f:
+        json.dump([str(term) for term in feature_names], f)
+    with open(os.path.join(tmp_path, "stopwords.txt"), "w") as f:
+        f.write("\n".join(sorted(stopwords_custom)))
+    np.save(os.path.join(tmp_path, "idf.npy"), np.asarray(vectorizer.idf_, dtype=np.float64))
+    np.save(os.path.join(tmp_path, "components.npy"), lda.components_)
+    np.save(os.path.join(tmp_path, "exp_dirichlet_component.npy"), lda.exp_dirichlet_component_)
+
+    os.replace(tmp_path, path)
+    print(f"Saved topic model {version} to {path}")
+    return version
+
+# Loaded models, keyed by (model_dir, version)
+_loaded = {}
+
+def load_topic_model(version=None, model_dir=MODEL_DIR):
+    """
+    Load a saved model version (the latest by default), memory-mapping its arrays.
+
+    Models are cached per process, so repeated calls are free.
+
+    Args:
+        version (str): Version name such as "v0002". None loads the latest.
+        model_dir (str): Root directory holding model versions.
+
+    Returns:
+        TopicModel: The loaded model.
+    """
+    if version is None:
+        versions = _version_dirs(model_dir)
+        if not versions:
+            raise FileNotFoundError(f"No saved topic model in {model_dir}. Run the LDA pipeline first.")
+        version = versions[-1]
+    key = (model_dir, version)
+    if key in _loaded:
+        return _loaded[key]
+
+    path = os.path.join(model_dir, version)
+    with open(os.path.join(path, "manifest.json"), "r") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != MODEL_FORMAT:
+        raise ValueError(f"Topic model {version} uses format {manifest.get('format')}, expected {MODEL_FORMAT}.")
+    with open(os.path.join(path, "vocabulary.json"), "r") as f:
+        vocabulary = json.load(f)
+    with open(os.path.join(path, "stopwords.txt"), "r") as f:
+        stopwords_custom = set(f.read().split("\n")) - {""}
+
+    vectorizer_params = dict(manifest["vectorizer_params"])
+    vectorizer_params["ngram_range"] = tuple(vectorizer_params["ngram_range"])
+    vectorizer = TfidfVectorizer(vocabulary={term: i for i, term in enumerate(vocabulary)}, **vectorizer_params)
+    vectorizer.idf_ = np.load(os.path.join(path, "idf.npy"), mmap_mode="r")
+
+    lda = LatentDirichletAllocation(**manifest["lda_params"])
+    lda.components_ = np.load(os.path.join(path, "components.npy"), mmap_mode="r")
+    lda.exp_dirichlet_component_ = np.load(os.path.join(path, "exp_dirichlet_component.npy"), mmap_mode="r")
+    lda.doc_topic_prior_ = manifest["doc_topic_prior_"]
+    lda.topic_word_prior_ = manifest["topic_word_prior_"]
+    lda.n_features_in_ = manifest["n_features"]
+
+    model = TopicModel(version, manifest, stopwords_custom, vectorizer, lda)
+    _loaded[key] = model
+    return model
+
+def assign_topics(descriptions, version=None, labels_path=TOPIC_KEYWORDS_PATH):
+    """
+    Assign dominant topics and consumer scenes to new descriptions without refitting.
+
+    Args:
+        descriptions (iterable): Raw description strings.
+        version (str): Model version to use. None uses the latest.
+        labels_path (str): CSV with topic_id, consumer_type and consumer_scene
+            (as used by merge_scene_labels). None skips the scene columns.
+
+    Returns:
+        pd.DataFrame: One row per description with dominant_topic,
+        topic_weight and, if labels are available, consumer_type and consumer_scene.
+    """
+    model = load_topic_model(version)
+    descriptions = list(descriptions)
+    X_topics = model.transform(descriptions)
+
+    result = pd.DataFrame({
+        "dominant_topic": np.argmax(X_topics, axis=1),
+        "topic_weight": X_topics.max(axis=1),
+    })
+
+    if labels_path and os.path.exists(labels_path):
+        labels = load_scene_labels(labels_path)
+        check_topic_words(labels, model.manifest["top_words"], labels_path, f"topic model {model.version}")
+        scenes = labels.set_index("topic_id")
+        result["consumer_type"] = result["dominant_topic"].map(scenes["consumer_type"])
+        result["consumer_scene"] = result["dominant_topic"].map(scenes["consumer_scene"])
+    return result
+
+# If running directly (testing)
+if __name__ == "__main__":
+    import sys
+    sample = sys.argv[1:] or ["An intimate tasting counter serving seasonal omakase with rare sake pairings."]
+    start = time.perf_counter()
+    print(assign_topics(sample))
+    print(f"Assigned {len(sample)} descriptions in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,207 @@
+# app/topic_report.py
+
+"""
+Topic report for a fitted LDA model.
+- Top-k terms for all topics at once by partial selection (np.argpartition),
+  instead of a full argsort per topic; only the k winners are sorted
+- Relevance ranking (Sievert & Shirley, 2014):
+  λ·log p(w|t) + (1-λ)·log(p(w|t) / p(w)); λ=1 is the plain top-words list,
+  lower λ favours words distinctive to the topic
+- Per-topic restaurant counts and exemplar restaurants (highest topic share),
+  tallied chunk by chunk from the doc-topic matrix so streamed and sharded
+  corpora never hold it whole
+- Feeds lda_topic_keywords.csv, the lda_topic_report.csv summary and the
+  Marketing Map page (joined with the hand-written LDA_topics.csv)
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+# Paths
+TOPIC_REPORT_PATH = os.path.join("data", "lda_topic_report.csv")
+
+# Report settings
+RELEVANCE_LAMBDA = 0.6
+N_EXEMPLARS = 3
+
+def top_k_indices(scores, k):
+    """
+    Column indices of the k largest values in each row, best first.
+
+    Args:
+        scores (np.ndarray): 2-D array, one row per topic.
+        k (int): Number of columns kept per row.
+
+    Returns:
+        np.ndarray: (n_rows, min(k, n_cols)) integer array.
+    """
+    scores = np.asarray(scores)
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.intp)
+    if k < scores.shape[1]:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape).copy()
+    # Sort only the winners; ties go to the higher column, as topic.argsort()[::-1] did
+    order = np.lexsort((-top, -np.take_along_axis(scores, top, axis=1)), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+def top_terms(model, feature_names, k):
+    """
+    Top k words of every topic.
+
+    Args:
+        model (LatentDirichletAllocation): Fitted model.
+        feature_names (array): Vocabulary aligned with the model's columns.
+        k (int): Words per topic.
+
+    Returns:
+        list: One list of words per topic, best first.
+    """
+    feature_names = np.asarray(feature_names, dtype=object)
+    return [[str(word) for word in row] for row in feature_names[top_k_indices(model.components_, k)]]
+
+def relevance(components, lam=RELEVANCE_LAMBDA):
+    """
+    Term relevance per topic: λ·log p(w|t) + (1-λ)·log(p(w|t) / p(w)).
+
+    p(w) is the model's own term distribution (the topic-word pseudo-counts
+    summed over topics), so no pass over the corpus is needed.
+
+    Args:
+        components (np.ndarray): model.components_ (topics × terms).
+        lam (float): Weight between topic probability (1.0) and lift (0.0).
+
+    Returns:
+        np.ndarray: Relevance scores, same shape as components.
+    """
+    components = np.asarray(components, dtype=np.float64)
+    log_phi = np.log(components) - np.log(components.sum(axis=1, keepdims=True))
+    log_p_w = np.log(components.sum(axis=0)) - np.log(components.sum())
+    return log_phi - (1 - lam) * log_p_w
+
+class TopicTally:
+    """
+    Running per-topic restaurant counts and exemplars over doc-topic chunks.
+
+    Args:
+        n_topics (int): Number of topics.
+        n_exemplars (int): Restaurants kept per topic.
+    """
+
+    def __init__(self, n_topics, n_exemplars=N_EXEMPLARS):
+        self.n_topics = n_topics
+        self.n_exemplars = n_exemplars
+        self.counts = np.zeros(n_topics, dtype=np.int64)
+        self.n_docs = 0
+        # Current best rows per topic (topics × kept): their topic share and row number
+        self.best_weights = np.empty((n_topics, 0))
+        self.best_rows = np.empty((n_topics, 0), dtype=np.int64)
+        self.best_names = np.empty((n_topics, 0), dtype=object)
+
+    def update(self, doc_topic, names=None):
+        """
+        Add the next rows of the doc-topic matrix.
+
+        Args:
+            doc_topic (np.ndarray): (rows, n_topics) topic mixture of each document.
+            names (sequence): Optional restaurant names of these rows, kept for the
+                exemplars so streamed callers need not hold every name.
+
+        Returns:
+            np.ndarray: The chunk's dominant topic per row.
+        """
+        doc_topic = np.asarray(doc_topic)
+        dominant = np.argmax(doc_topic, axis=1)
+        self.counts += np.bincount(dominant, minlength=self.n_topics)
+
+        # The chunk's own top rows per topic, merged with the ones kept so far
+        chunk_top = top_k_indices(doc_topic.T, self.n_exemplars)
+        weights = np.hstack([self.best_weights, np.take_along_axis(doc_topic.T, chunk_top, axis=1)])
+        rows = np.hstack([self.best_rows, chunk_top + self.n_docs])
+        keep = top_k_indices(weights, self.n_exemplars)
+        self.best_weights = np.take_along_axis(weights, keep, axis=1)
+        self.best_rows = np.take_along_axis(rows, keep, axis=1)
+        if names is not None:
+            chunk_names = np.asarray(names, dtype=object)[chunk_top]
+            self.best_names = np.take_along_axis(np.hstack([self.best_names, chunk_names]), keep, axis=1)
+        self.n_docs += len(doc_topic)
+        return dominant
+
+    def exemplars(self, names=None):
+        """
+        Exemplar names per topic.
+
+        Args:
+            names (sequence): Restaurant name of each row, in the order tallied;
+                None uses the names passed to update().
+
+        Returns:
+            list: One list of names per topic, highest topic share first.
+        """
+        best = self.best_names if names is None else np.asarray(names, dtype=object)[self.best_rows]
+        return [[str(name) for name in row] for row in best]
+
+def build_topic_report(model, feature_names, tally=None, names=None, top_n=10, lam=RELEVANCE_LAMBDA):
+    """
+    One row per topic: top words, relevant words, restaurant count, share and exemplars.
+
+    Args:
+        model (LatentDirichletAllocation): Fitted model.
+        feature_names (array): Vocabulary aligned with the model's columns.
+        tally (TopicTally): Counts and exemplars; None leaves those columns out.
+        names (sequence): Restaurant names aligned with the tallied rows; None uses
+            the names the tally collected (or leaves exemplars out if it has none).
+        top_n (int): Words listed per topic.
+        lam (float): Relevance λ for the relevant_words column.
+
+    Returns:
+        pd.DataFrame: The report, one row per topic in topic_id order.
+    """
+    feature_names = np.asarray(feature_names, dtype=object)
+    report = pd.DataFrame({
+        "topic_id": np.arange(model.components_.shape[0]),
+        "top_words": [", ".join(words) for words in top_terms(model, feature_names, top_n)],
+        "relevant_words": [
+            ", ".join(str(word) for word in row)
+            for row in feature_names[top_k_indices(relevance(model.components_, lam), top_n)]
+        ],
+    })
+    if tally is not None:
+        report["n_restaurants"] = tally.counts
+        report["share"] = (tally.counts / max(tally.n_docs, 1)).round(4)
+        if names is not None or tally.best_names.shape[1]:
+            report["exemplars"] = ["; ".join(row) for row in tally.exemplars(names)]
+    return report
+
+def save_topic_report(report, path=TOPIC_REPORT_PATH):
+    """Write the topic report to CSV."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    report.to_csv(path, index=False)
+    print(f"Saved topic report to {path}")
+
+def join_topic_summary(topics_df, report):
+    """
+    Add the report's counts, relevant words and exemplars to the hand-written topic table.
+
+    Rows of topics_df whose topic_id is not a topic number (such as the
+    worked example row) are kept with the new columns left blank.
+
+    Args:
+        topics_df (pd.DataFrame): LDA_topics.csv (topic_id, topic_words, interpretation, ...).
+        report (pd.DataFrame): Output of build_topic_report (or lda_topic_report.csv).
+
+    Returns:
+        pd.DataFrame: topics_df with the extra columns, in its original row order.
+    """
+    extra = [col for col in ("n_restaurants", "share", "relevant_words", "exemplars") if col in report.columns]
+    lookup = report.set_index(report["topic_id"].astype(str))
+    key = topics_df["topic_id"].astype(str)
+    joined = topics_df.copy()
+    for col in extra:
+        joined[col] = key.map(lookup[col])
+    if "n_restaurants" in extra:
+        joined["n_restaurants"] = joined["n_restaurants"].astype("Int64")
+    return joined
@@ -0,0 +1,242 @@
+# app/topic_sweep.py
+
+"""
+Parallel topic-count sweep for choosing NUM_TOPICS.
+- Tokenizes and vectorizes the corpus once
+- Trains one online LDA model per (topic count, seed) across a process pool
+- Training runs in rounds; after each round a model is scored on held-out
+  descriptions and stops early once it converges or falls clearly behind the
+  best seed with the same topic count
+- Reports held-out perplexity, UMass coherence and wall time per configuration
+- The best configuration can be refitted on every description and written
+  to the usual downstream outputs
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import LatentDirichletAllocation
+from app.nlp_topic_modeling import (
+    STOPWORDS_PATH, TOP_WORDS, load_stopwords, load_tokenized_corpus, pool_context, save_lda_outputs, vectorize_tokens,
+)
+from app.topic_model import save_topic_model
+from app.topic_report import top_k_indices
+
+# Paths
+SWEEP_RESULTS_PATH = os.path.join("data", "lda_sweep_results.csv")
+
+# Defaults
+TOPIC_RANGE = range(4, 13, 2)
+SEEDS = (42,)
+MAX_ROUNDS = 10
+ITERATIONS_PER_ROUND = 2
+HOLDOUT_FRACTION = 0.1
+CONVERGENCE_TOL = 0.005
+PRUNE_MARGIN = 0.5
+MIN_ROUNDS = 5
+
+# Training data for pool workers, sent once per process by the initializer
+_worker_X = None
+
+def _init_sweep_worker(X_train):
+    global _worker_X
+    _worker_X = X_train
+
+def _new_model(n_topics, seed, total_samples):
+    return LatentDirichletAllocation(
+        n_components=n_topics, learning_method="online", total_samples=total_samples, random_state=seed
+    )
+
+def _train_round(model, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        model.partial_fit(_worker_X)
+    return model, time.perf_counter() - start
+
+def umass_coherence(model, X, top_n=TOP_WORDS):
+    """
+    Mean UMass coherence of a model's topics over a document-term matrix.
+
+    Args:
+        model (LatentDirichletAllocation): Fitted model.
+        X (sparse matrix): Document-term matrix (any positive weighting).
+        top_n (int): Number of top words scored per topic.
+
+    Returns:
+        float: Average coherence across topics (higher is better).
+    """
+    top = top_k_indices(model.components_, top_n)
+
+    present = (X > 0).astype(np.float64).tocsc()
+    scores = []
+    for words in top:
+        B = present[:, words]
+        co = (B.T @ B).toarray()
+        doc_freq = np.diag(co)
+        i, j = np.tril_indices(top_n, k=-1)
+        scores.append(np.sum(np.log((co[i, j] + 1) / np.maximum(doc_freq[j], 1))))
+    return float(np.mean(scores))
+
+def _split_holdout(n_docs, holdout_fraction, seed=0):
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(n_docs)
+    n_holdout = int(n_docs * holdout_fraction)
+    if n_holdout == 0:
+        return order, order
+    return order[n_holdout:], order[:n_holdout]
+
+def sweep_topic_counts(X, topic_range=TOPIC_RANGE, seeds=SEEDS, n_jobs=-1, max_rounds=MAX_ROUNDS,
+                       iterations_per_round=ITERATIONS_PER_ROUND, holdout_fraction=HOLDOUT_FRACTION,
+                       tol=CONVERGENCE_TOL, prune_margin=PRUNE_MARGIN, min_rounds=MIN_ROUNDS):
+    """
+    Train and score one LDA model per (topic count, seed) in parallel.
+
+    Args:
+        X (sparse matrix): TF-IDF matrix shared by every configuration.
+        topic_range (iterable): Topic counts to try.
+        seeds (iterable): Random seeds to try for each topic count.
+        n_jobs (int): Worker processes (-1 = all cores).
+        max_rounds (int): Maximum training rounds per configuration.
+        iterations_per_round (int): partial_fit passes over the data per round.
+        holdout_fraction (float): Share of documents held out for perplexity.
+        tol (float): Stop a configuration once a round improves its held-out
+            perplexity by less than this fraction.
+        prune_margin (float): After min_rounds, stop configurations whose
+            held-out perplexity is more than this fraction above the best seed
+            with the same topic count (perplexities of different topic counts
+            are not compared).
+        min_rounds (int): Rounds every configuration gets before pruning.
+
+    Returns:
+        tuple: (results DataFrame sorted by configuration, dict of fitted
+        models keyed by (n_topics, seed))
+    """
+    train_idx, holdout_idx = _split_holdout(X.shape[0], holdout_fraction)
+    X_train, X_holdout = X[train_idx], X[holdout_idx]
+
+    runs = {}
+    for n_topics, seed in product(topic_range, seeds):
+        runs[(n_topics, seed)] = {
+            "model": _new_model(n_topics, seed, X_train.shape[0]),
+            "rounds": 0,
+            "status": "running",
+            "perplexity": np.inf,
+            "wall_time_s": 0.0,
+        }
+
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(runs)), mp_context=pool_context(),
+                             initializer=_init_sweep_worker, initargs=(X_train,)) as executor:
+        for round_idx in range(1, max_rounds + 1):
+            active = [key for key, run in runs.items() if run["status"] == "running"]
+            if not active:
+                break
+
+            futures = {key: executor.submit(_train_round, runs[key]["model"], iterations_per_round) for key in active}
+            for key, future in futures.items():
+                run = runs[key]
+                run["model"], elapsed = future.result()
+                run["wall_time_s"] += elapsed
+                run["rounds"] = round_idx
+                previous, run["perplexity"] = run["perplexity"], run["model"].perplexity(X_holdout)
+                if np.isfinite(previous) and (previous - run["perplexity"]) / previous < tol:
+                    run["status"] = "converged"
+
+            # Early stop seeds that are clearly behind another seed with the same topic count
+            best = min(run["perplexity"] for run in runs.values())
+            if round_idx >= min_rounds:
+                for key in active:
+                    run = runs[key]
+                    best_same_k = min(other["perplexity"] for (n_topics, _), other in runs.items() if n_topics == key[0])
+                    if run["status"] == "running" and run["perplexity"] > best_same_k * (1 + prune_margin):
+                        run["status"] = "pruned"
+
+            print(f"Round {round_idx}: {len(active)} configurations trained, best held-out perplexity {best:.4g}")
+
+    for run in runs.values():
+        if run["status"] == "running":
+            run["status"] = "max_rounds"
+
+    results = pd.DataFrame([
+        {
+            "n_topics": n_topics,
+            "seed": seed,
+            "rounds": run["rounds"],
+            "status": run["status"],
+            "perplexity": run["perplexity"],
+            "coherence": umass_coherence(run["model"], X),
+            "wall_time_s": run["wall_time_s"],
+        }
+        for (n_topics, seed), run in runs.items()
+    ])
+    models = {key: run["model"] for key, run in runs.items()}
+    return results, models
+
+def select_best(results, criterion="coherence"):
+    """
+    Pick the best configuration among those that were not pruned.
+
+    Args:
+        results (pd.DataFrame): Output of sweep_topic_counts.
+        criterion (str): "coherence" (highest wins) or "perplexity" (lowest wins).
+
+    Returns:
+        tuple: (n_topics, seed) of the best configuration.
+    """
+    if criterion not in ("coherence", "perplexity"):
+        raise ValueError("criterion must be 'coherence' or 'perplexity'.")
+    candidates = results[results["status"] != "pruned"]
+    if candidates.empty:
+        candidates = results
+    row = candidates.loc[candidates[criterion].idxmax() if criterion == "coherence" else candidates[criterion].idxmin()]
+    return int(row["n_topics"]), int(row["seed"])
+
+def run_topic_sweep(topic_range=TOPIC_RANGE, seeds=SEEDS, n_jobs=-1, criterion="coherence",
+                    save_best=False, export_excel=False, **sweep_kwargs):
+    """
+    Tokenize and vectorize once, sweep topic counts, and report the results.
+
+    Args:
+        topic_range (iterable): Topic counts to try.
+        seeds (iterable): Random seeds to try for each topic count.
+        n_jobs (int): Worker processes for tokenization and training (-1 = all cores).
+        criterion (str): How the best configuration is chosen ("coherence" or "perplexity").
+        save_best (bool): Refit the best configuration on every description
+            (the sweep's models never see the held-out split) and write its
+            dominant topics, lda_topic_keywords.csv and a saved model version,
+            as run_lda_on_descriptions would.
+        export_excel (bool): With save_best, also write michelin_with_topics.xlsx.
+        **sweep_kwargs: Passed through to sweep_topic_counts.
+
+    Returns:
+        pd.DataFrame: One row per configuration.
+    """
+    df = load_tokenized_corpus(n_jobs=n_jobs)
+    tfidf_vectorizer, X = vectorize_tokens(df["tokens"])
+
+    print(f"Sweeping topic counts {list(topic_range)} with seeds {list(seeds)}...")
+    results, _ = sweep_topic_counts(X, topic_range=topic_range, seeds=seeds, n_jobs=n_jobs, **sweep_kwargs)
+
+    best = select_best(results, criterion)
+    results["best"] = [(n, s) == best for n, s in zip(results["n_topics"], results["seed"])]
+    os.makedirs("data", exist_ok=True)
+    results.to_csv(SWEEP_RESULTS_PATH, index=False)
+    print(results.to_string(index=False))
+    print(f"Saved sweep results to {SWEEP_RESULTS_PATH}")
+    print(f"Best configuration by {criterion}: {best[0]} topics (seed {best[1]})")
+
+    if save_best:
+        # Same number of passes as the sweep gave it, this time over all rows
+        rounds = int(results.loc[results["best"], "rounds"].iloc[0])
+        passes = rounds * sweep_kwargs.get("iterations_per_round", ITERATIONS_PER_ROUND)
+        print(f"Refitting {best[0]} topics on all {X.shape[0]} descriptions ({passes} passes)...")
+        model = _new_model(best[0], best[1], X.shape[0])
+        for _ in range(passes):
+            model.partial_fit(X)
+        save_lda_outputs(df, model, X, tfidf_vectorizer.get_feature_names_out(), export_excel=export_excel)
+        save_topic_model(tfidf_vectorizer, model, load_stopwords(STOPWORDS_PATH))
+    return results
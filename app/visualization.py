@@ -1,12 +1,86 @@
 # app/visualization.py
 
 """
-Visualization module placeholder.
-
-This file is reserved for future implementation of:
-- Spatial maps of Michelin restaurants
-- Visualization by consumer scene and Michelin stars
+Shared map helpers for the Streamlit pages and the CLI.
+- Builds the spatial index over a restaurant table's lat/lon columns
+- Fits the pydeck view (centre and zoom) to the rows being shown
+- create_spatial_map(): command-line summary of the restaurant locations
 """
 
-def create_spatial_map():
-    print("Visualization module is under development. No action performed yet.")
\ No newline at end of file
+import numpy as np
+from app.artifacts import read_artifact
+from app.spatial_index import SpatialIndex
+
+# Size of the map widget the zoom level is fitted to
+MAP_WIDTH_PX = 900
+MAP_HEIGHT_PX = 500
+MAX_ZOOM = 16
+
+def build_spatial_index(df, lat_col="lat", lon_col="lon"):
+    """
+    Spatial index over a restaurant table (cache it through app.data_access).
+
+    Args:
+        df (pd.DataFrame): Restaurant table; query results are row positions into it.
+        lat_col (str): Latitude column.
+        lon_col (str): Longitude column.
+
+    Returns:
+        SpatialIndex: The index.
+    """
+    return SpatialIndex(df[lat_col].to_numpy(dtype=float), df[lon_col].to_numpy(dtype=float))
+
+def fit_view(lat, lon, width_px=MAP_WIDTH_PX, height_px=MAP_HEIGHT_PX):
+    """
+    Centre and zoom that fit a set of points in the map widget.
+
+    Args:
+        lat (array): Latitudes of the points shown.
+        lon (array): Longitudes of the points shown.
+        width_px (int): Map width in pixels.
+        height_px (int): Map height in pixels.
+
+    Returns:
+        dict: latitude, longitude and zoom for pdk.ViewState.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    lat, lon = lat[valid], lon[valid]
+    if not len(lat):
+        return {"latitude": 0.0, "longitude": 0.0, "zoom": 1}
+
+    # Web Mercator: the world is 256 * 2**zoom pixels wide
+    def mercator_y(value):
+        return np.log(np.tan(np.pi / 4 + np.radians(np.clip(value, -85, 85)) / 2))
+
+    lon_span = max(lon.max() - lon.min(), 1e-6) / 360
+    lat_span = max(mercator_y(lat.max()) - mercator_y(lat.min()), 1e-6) / (2 * np.pi)
+    zoom = min(np.log2(width_px / 256 / lon_span), np.log2(height_px / 256 / lat_span)) - 0.5
+    return {
+        "latitude": float((lat.min() + lat.max()) / 2),
+        "longitude": float((lon.min() + lon.max()) / 2),
+        "zoom": float(np.clip(zoom, 1, MAX_ZOOM)),
+    }
+
+def create_spatial_map(source="michelin_full", k=5):
+    """
+    Print the extent of the restaurant locations and the restaurants nearest its centre.
+
+    Args:
+        source (str): Artifact with restaurant, lat and lon columns.
+        k (int): Number of restaurants to list.
+    """
+    df = read_artifact(source, columns=["restaurant", "lat", "lon"])
+    index = build_spatial_index(df)
+    south, west, north, east = index.bounds()
+    print(f"Indexed {len(index.rows)} of {len(df)} restaurants "
+          f"on a {index.n_lat_cells}x{index.n_lon_cells} grid ({index.cell_deg:.4f}° cells).")
+    print(f"Bounds: lat {south:.4f}–{north:.4f}, lon {west:.4f}–{east:.4f}")
+
+    view = fit_view(df["lat"], df["lon"])
+    rows, distances = index.nearest(view["latitude"], view["longitude"], k=k)
+    print(f"\nNearest restaurants to the map centre ({view['latitude']:.4f}, {view['longitude']:.4f}):")
+    for row, distance in zip(rows, distances):
+        print(f"  {df['restaurant'].iat[row]}: {distance:.2f} km")
+    print("\nRun `streamlit run Home.py` to explore the interactive maps.")
@@ -0,0 +1 @@
+# Package initializer for benchmarks
\ No newline at end of file
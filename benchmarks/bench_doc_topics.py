@@ -0,0 +1,86 @@
+# benchmarks/bench_doc_topics.py
+
+"""
+Benchmark for the doc-topic store and scene-mix queries.
+
+- Writes random topic mixtures for N restaurants with DocTopicWriter (float16
+  and float32) and reports the size on disk against a float64 matrix
+- Times aligning the store with a shuffled restaurant table and summing topics
+  into scene shares (done once per data version on the Marketing Map page)
+- Times the per-rerun queries: per-scene minimums and a weighted mixture
+- Counts rows whose per-scene-minimum result differs from float64 shares
+  computed directly (float16 rounding at the threshold)
+
+Usage:
+    python -m benchmarks.bench_doc_topics --rows 100k,1M --topics 8
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from app.doc_topics import DocTopicStore, DocTopicWriter, restaurant_ids, select_mixture
+from benchmarks.suite import parse_size
+
+N_SCENES = 4
+QUERIES = 50
+BLOCK_ROWS = 65_536
+
+def timed(fn, repeats=1):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the doc-topic store and scene-mix queries.")
+    parser.add_argument("--rows", default="100k,1M", help="Comma-separated restaurant counts, e.g. 100k,1M.")
+    parser.add_argument("--topics", type=int, default=8, help="Number of topics.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    groups = np.arange(args.topics) % N_SCENES
+    min_share = [0.3, 0.3, 0.0, 0.0]
+    weights = [1.0, 1.0, 0.0, 0.0]
+
+    print(f"{'rows':>9} {'dtype':<8} {'MB':>7} {'f64 MB':>7} {'write s':>8} {'align s':>8} {'min-share ms':>13} {'weighted ms':>12} {'matches':>8} {'differ':>7}")
+    for n_rows in (parse_size(s) for s in args.rows.split(",")):
+        doc_topic = rng.dirichlet(np.full(args.topics, 0.3), size=n_rows)
+        table = pd.DataFrame({"restaurant": [f"Restaurant {i}" for i in range(n_rows)],
+                              "address": [f"{i} Main St" for i in range(n_rows)]})
+        ids = restaurant_ids(table)
+        shuffled = rng.permutation(n_rows)
+
+        # Reference: float64 shares summed straight from the matrix
+        exact = np.zeros((n_rows, N_SCENES))
+        np.add.at(exact.T, groups, doc_topic.T)
+        active = np.flatnonzero(np.asarray(min_share) > 0)
+        reference = (exact[shuffled][:, active] >= np.asarray(min_share)[active]).all(axis=1)
+
+        for dtype in (np.float16, np.float32):
+            directory = tempfile.mkdtemp()
+            try:
+                def write():
+                    with DocTopicWriter(n_rows, args.topics, directory=directory, dtype=dtype) as writer:
+                        for start in range(0, n_rows, BLOCK_ROWS):
+                            writer.write(doc_topic[start:start + BLOCK_ROWS], ids[start:start + BLOCK_ROWS])
+                _, write_s = timed(write)
+                size_mb = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)) / 1e6
+
+                shares, align_s = timed(lambda: DocTopicStore(directory).group_shares(ids[shuffled], groups, N_SCENES))
+                mask, min_s = timed(lambda: select_mixture(shares, min_share=min_share), QUERIES)
+                _, weighted_s = timed(lambda: select_mixture(shares, weights=weights, min_score=0.5), QUERIES)
+                # float16 rounding can flip rows sitting right at a threshold; count them
+                differ = int((mask != reference).sum())
+            finally:
+                shutil.rmtree(directory)
+            print(f"{n_rows:>9} {np.dtype(dtype).name:<8} {size_mb:>7.1f} {doc_topic.nbytes / 1e6:>7.1f} {write_s:>8.2f} "
+                  f"{align_s:>8.2f} {min_s * 1e3:>13.2f} {weighted_s * 1e3:>12.2f} {int(mask.sum()):>8} {differ:>7}", flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/bench_filter_index.py
+
+"""
+Benchmark for the map page's filter index.
+
+- Builds a large table by resampling the rows of the michelin_full artifact
+- Times the index build once, then random star/price/cuisine filter combinations
+- Compares against the original copy + isin + per-row lambda filtering
+- Checks both approaches select the same rows
+
+Usage:
+    python -m benchmarks.bench_filter_index --rows 100000 --queries 200
+"""
+
+import argparse
+import time
+import numpy as np
+from app.artifacts import read_artifact
+from app.filter_index import FilterIndex
+
+def pandas_filter(df, stars, prices, cuisines):
+    filtered_df = df.copy()
+    if stars:
+        filtered_df = filtered_df[filtered_df["star"].isin(stars)]
+    if prices:
+        filtered_df = filtered_df[filtered_df["price($)"].isin(prices)]
+    if "ALL" not in cuisines:
+        filtered_df = filtered_df[filtered_df["tag"].apply(
+            lambda t: any(c in [x.strip() for x in str(t).split(",")] for c in cuisines)
+        )]
+    return filtered_df
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bitset filtering against pandas filtering.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows in the resampled table.")
+    parser.add_argument("--queries", type=int, default=200, help="Random filter combinations to time.")
+    parser.add_argument("--baseline-queries", type=int, default=10, help="Combinations timed with the pandas filter.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = read_artifact("michelin_full", columns=["restaurant", "lat", "lon", "price($)", "tag", "star"])
+    df = base.iloc[rng.integers(0, len(base), args.rows)].reset_index(drop=True)
+
+    start = time.perf_counter()
+    index = FilterIndex(df)
+    build_s = time.perf_counter() - start
+
+    cuisines_all = sorted(index.cuisines)
+    queries = []
+    for _ in range(args.queries):
+        stars = [int(s) for s in rng.choice([1, 2, 3], rng.integers(1, 4), replace=False)]
+        prices = [int(p) for p in rng.choice([1, 2, 3, 4], rng.integers(1, 5), replace=False)]
+        cuisines = list(rng.choice(cuisines_all, rng.integers(1, 4), replace=False)) if rng.random() < 0.7 else ["ALL"]
+        queries.append((stars, prices, cuisines))
+
+    index_times = []
+    for stars, prices, cuisines in queries:
+        start = time.perf_counter()
+        index.query(stars, prices, None if "ALL" in cuisines else cuisines)
+        index_times.append(time.perf_counter() - start)
+
+    pandas_times = []
+    for stars, prices, cuisines in queries[:args.baseline_queries]:
+        start = time.perf_counter()
+        expected = pandas_filter(df, stars, prices, cuisines)
+        pandas_times.append(time.perf_counter() - start)
+        rows = index.query(stars, prices, None if "ALL" in cuisines else cuisines)
+        if not np.array_equal(rows, expected.index.to_numpy()):
+            raise AssertionError(f"Index and pandas filters disagree for {stars}, {prices}, {cuisines}.")
+
+    print(f"Rows: {len(df)}  cuisines: {len(cuisines_all)}  index build: {build_s * 1000:.1f} ms")
+    print(f"Bitset index query: median {np.median(index_times) * 1000:.3f} ms, p95 {np.percentile(index_times, 95) * 1000:.3f} ms")
+    print(f"Pandas filter:      median {np.median(pandas_times) * 1000:.3f} ms")
+
+if __name__ == "__main__":
+    main()
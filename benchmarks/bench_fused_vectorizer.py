@@ -0,0 +1,87 @@
+# benchmarks/bench_fused_vectorizer.py
+
+"""
+Benchmark for the fused tokenizer against the two-pass TF-IDF path.
+
+- Two-pass: tokenize_descriptions, then vectorize_tokens (joins tokens back into
+  strings that TfidfVectorizer tokenizes again)
+- Fused: vectorize_descriptions, which counts terms straight into a sparse matrix
+- Runs both on synthetic corpora, serially and with worker processes
+- Checks that the vocabulary and the TF-IDF matrix are identical
+- Prints wall time, speedup and (in a second, tracemalloc-instrumented run) peak memory
+
+Usage:
+    python -m benchmarks.bench_fused_vectorizer --docs 10000,100000 --jobs 4
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+import numpy as np
+from app.nltk_resources import ensure_nltk_data
+from app.nlp_topic_modeling import STOPWORDS_PATH, load_stopwords, tokenize_descriptions, vectorize_descriptions, vectorize_tokens
+from app.stemmer_custom import stem_cache
+from benchmarks.suite import parse_size
+from benchmarks.synthetic import generate_corpus
+
+def two_pass(corpus, stopwords_custom, n_jobs):
+    return vectorize_tokens(tokenize_descriptions(corpus, stopwords_custom, n_jobs=n_jobs))
+
+def fused(corpus, stopwords_custom, n_jobs):
+    return vectorize_descriptions(corpus, stopwords_custom, n_jobs=n_jobs)
+
+def measure(fn, corpus, stopwords_custom, n_jobs, measure_memory):
+    # Each run starts from a cold stem cache so neither path reuses the other's stems
+    stem_cache.clear()
+    start = time.perf_counter()
+    result = fn(corpus, stopwords_custom, n_jobs)
+    seconds = time.perf_counter() - start
+
+    peak_mb = None
+    if measure_memory:
+        stem_cache.clear()
+        tracemalloc.start()
+        fn(corpus, stopwords_custom, n_jobs)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result, seconds, peak_mb
+
+def identical(a, b):
+    (vec_a, X_a), (vec_b, X_b) = a, b
+    return (
+        np.array_equal(vec_a.get_feature_names_out(), vec_b.get_feature_names_out())
+        and np.array_equal(vec_a.idf_, vec_b.idf_)
+        and all(np.array_equal(getattr(X_a, name), getattr(X_b, name)) for name in ("indptr", "indices", "data"))
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fused tokenizer against tokenize + TfidfVectorizer.")
+    parser.add_argument("--docs", default="10k,100k", help="Comma-separated corpus sizes, e.g. 10k,100k.")
+    parser.add_argument("--jobs", type=int, default=4, help="Worker processes for the parallel runs (1 = serial only).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic corpora.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass.")
+    args = parser.parse_args()
+
+    try:
+        ensure_nltk_data("punkt_tab")
+    except LookupError as e:
+        sys.exit(str(e))
+    stopwords_custom = load_stopwords(STOPWORDS_PATH)
+
+    print(f"{'docs':>8} {'workers':>8} {'two-pass s':>11} {'fused s':>9} {'speedup':>8} {'two-pass MB':>12} {'fused MB':>9}")
+    for n_docs in (parse_size(s) for s in args.docs.split(",")):
+        corpus = generate_corpus(n_docs, seed=args.seed)["description"].tolist()
+        for n_jobs in sorted({1, args.jobs}):
+            # Memory is traced in this process only, so it is reported for serial runs
+            measure_memory = not args.no_memory and n_jobs == 1
+            reference, old_s, old_mb = measure(two_pass, corpus, stopwords_custom, n_jobs, measure_memory)
+            result, new_s, new_mb = measure(fused, corpus, stopwords_custom, n_jobs, measure_memory)
+            if not identical(reference, result):
+                raise AssertionError(f"Fused output differs from the two-pass output ({n_docs} docs, {n_jobs} workers).")
+
+            memory = f"{old_mb:>12.1f} {new_mb:>9.1f}" if old_mb is not None else f"{'-':>12} {'-':>9}"
+            print(f"{n_docs:>8} {n_jobs:>8} {old_s:>11.2f} {new_s:>9.2f} {old_s / new_s:>7.2f}x {memory}", flush=True)
+
+if __name__ == "__main__":
+    main()
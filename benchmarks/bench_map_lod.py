@@ -0,0 +1,65 @@
+# benchmarks/bench_map_lod.py
+
+"""
+Benchmark for the map pages' level-of-detail hexbins.
+
+- Builds a large table by resampling merged_michelin_data rows over several synthetic cities
+- Times the hexbin index build once
+- For growing row counts, compares the pydeck JSON payload of raw points
+  against hexbins at the zoom the page would use
+
+Usage:
+    python -m benchmarks.bench_map_lod --rows 1000000
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+from app.artifacts import read_artifact
+from app.map_aggregation import HexBinIndex, choose_detail
+from app.visualization import fit_view
+
+COLUMNS = ["restaurant", "lat", "lon", "price($)", "tag", "star", "consumer_scene"]
+
+def payload(df):
+    start = time.perf_counter()
+    size = len(json.dumps(df.to_dict(orient="records"), default=str))
+    return size, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark raw-point vs. hexbin map payloads.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows in the resampled table.")
+    parser.add_argument("--cities", type=int, default=30, help="Synthetic cities the rows are spread over.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = read_artifact("merged_michelin_data", columns=COLUMNS).dropna(subset=["lat", "lon"])
+    df = base.iloc[rng.integers(0, len(base), args.rows)].reset_index(drop=True)
+    city = rng.integers(0, args.cities, args.rows)
+    df["lat"] += rng.uniform(-15, 10, args.cities)[city] + rng.normal(0, 0.02, args.rows)
+    df["lon"] += rng.uniform(-50, 30, args.cities)[city] + rng.normal(0, 0.02, args.rows)
+
+    start = time.perf_counter()
+    index = HexBinIndex(df, scene_col="consumer_scene")
+    print(f"Rows: {args.rows}  cities: {args.cities}  hexbin index build: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(f"{'rows shown':>10} {'zoom':>5} {'detail':>8} {'points JSON':>12} {'hexbins':>7} {'aggregate':>10} {'hexbin JSON':>12}")
+    n = 1000
+    while n <= args.rows:
+        rows = np.sort(rng.choice(args.rows, n, replace=False))
+        view = fit_view(df["lat"].to_numpy()[rows], df["lon"].to_numpy()[rows])
+        points_bytes, _ = payload(df.iloc[rows[:200_000]])
+        points_bytes = points_bytes * n // min(n, 200_000)
+
+        start = time.perf_counter()
+        bins_df = index.aggregate(rows, view["zoom"])
+        aggregate_s = time.perf_counter() - start
+        bins_bytes, _ = payload(bins_df)
+
+        print(f"{n:>10} {view['zoom']:>5.1f} {choose_detail(n, view['zoom']):>8} {points_bytes / 1e6:>10.1f}MB "
+              f"{len(bins_df):>7} {aggregate_s * 1000:>8.1f}ms {bins_bytes / 1e6:>10.2f}MB")
+        n *= 10
+
+if __name__ == "__main__":
+    main()
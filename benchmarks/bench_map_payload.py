@@ -0,0 +1,76 @@
+# benchmarks/bench_map_payload.py
+
+"""
+Benchmark for the scene map's pydeck payload.
+
+- Builds tables of growing size by resampling merged_michelin_data rows
+- "Before": the whole frame (descriptions, tokens, per-row colors) in one layer,
+  serialized by pdk.Deck
+- "After": projected fields and rounded coordinates, one layer per scene,
+  serialized by CompactDeck
+- Reports spec bytes, server-side serialization time and JSON parse time
+  (a proxy for the browser's share of time-to-first-render)
+
+Usage:
+    python -m benchmarks.bench_map_payload --max-rows 100000
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+import pydeck as pdk
+from app.artifacts import read_artifact
+from app.map_payload import CompactDeck, layer_data, payload_stats
+
+SCENE_COLORS = {
+    "Business Fine Dining": [75, 192, 192],
+    "Romantic & Intimate Dining": [255, 99, 132],
+    "Gourmet Exploration": [54, 162, 235],
+    "Social Dining with Friends": [255, 205, 86],
+}
+POINT_FIELDS = ["restaurant", "lat", "lon", "price_display", "star", "tag", "clean_scene"]
+
+def before_deck(df):
+    layer = pdk.Layer("ScatterplotLayer", data=df, get_position="[lon, lat]", get_fill_color="color",
+                      get_radius=100, pickable=True)
+    return pdk.Deck(layers=[layer], map_provider="carto", map_style="light")
+
+def after_deck(df):
+    layers = [
+        pdk.Layer("ScatterplotLayer", id=f"scene-{i}", data=layer_data(df[df["clean_scene"] == scene], POINT_FIELDS),
+                  get_position="[lon, lat]", get_fill_color=color, get_radius=100, pickable=True)
+        for i, (scene, color) in enumerate(SCENE_COLORS.items())
+    ]
+    return CompactDeck(layers=layers, map_provider="carto", map_style="light")
+
+def measure(deck):
+    size, serialize_s = payload_stats(deck)
+    spec = deck.to_json()
+    start = time.perf_counter()
+    json.loads(spec)
+    return size, serialize_s, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark map payload size before and after projection.")
+    parser.add_argument("--max-rows", type=int, default=100_000, help="Largest table size (grows by 10x from 1000).")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = read_artifact("merged_michelin_data")
+    base["clean_scene"] = base["consumer_scene"].str.extract(r"^(.*?)\s*\(")[0].fillna(base["consumer_scene"])
+    base = base[base["clean_scene"].isin(SCENE_COLORS)].copy()
+    base["price_display"] = base["price($)"].apply(lambda x: "$100+" if x == 4 else "$50–99")
+    base["color"] = base["clean_scene"].map(SCENE_COLORS)
+
+    print(f"{'rows':>8} {'':>7} {'bytes':>10} {'serialize':>10} {'parse':>8}")
+    n = 1000
+    while n <= args.max_rows:
+        df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+        for label, build in (("before", before_deck), ("after", after_deck)):
+            size, serialize_s, parse_s = measure(build(df))
+            print(f"{n:>8} {label:>7} {size / 1e6:>8.2f}MB {serialize_s * 1000:>8.0f}ms {parse_s * 1000:>6.0f}ms")
+        n *= 10
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/bench_scene_labels.py
+
+"""
+Benchmark for the scene-label join.
+
+- Builds a restaurant table by tiling a synthetic corpus, with random dominant
+  topics, and a matching labels CSV (a few topics left unlabelled)
+- In memory: DataFrame.merge (attach_scene_labels) vs. the SceneLookup array
+  lookup, with an equality check
+- End to end, each in a fresh process: read + merge + write the whole table
+  vs. stream_scene_labels, reporting wall time and peak resident memory
+  (pyarrow's buffers are not visible to tracemalloc)
+
+Usage:
+    python -m benchmarks.bench_scene_labels --rows 200000,1000000 --chunk-size 50000
+"""
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import numpy as np
+import pandas as pd
+from app.apply_scene_tags import SCENE_CHUNK_SIZE, SceneLookup, attach_scene_labels, load_scene_labels, stream_scene_labels
+from app.artifacts import artifact_path, read_artifact, write_artifact
+from benchmarks.suite import parse_size
+from benchmarks.synthetic import generate_corpus
+
+# Temporary artifacts
+SOURCE = "bench_scene_source"
+TARGET = "bench_scene_target"
+
+BASE_ROWS = 20_000
+
+def best_of(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def _end_to_end(mode, labels_path, chunk_size):
+    # Runs in a fresh process so ru_maxrss reflects this variant only
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "merge":
+        write_artifact(attach_scene_labels(read_artifact(SOURCE), load_scene_labels(labels_path)), TARGET)
+    else:
+        stream_scene_labels(labels_path, SOURCE, TARGET, chunk_size)
+    seconds = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return seconds, peak_mb, peak_mb - baseline / 1024
+
+def end_to_end(mode, labels_path, chunk_size):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(_end_to_end, mode, labels_path, chunk_size).result()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DataFrame.merge against the streaming scene-label lookup.")
+    parser.add_argument("--rows", default="200k,1M", help="Comma-separated table sizes, e.g. 200k,1M.")
+    parser.add_argument("--topics", type=int, default=8, help="Number of topics.")
+    parser.add_argument("--chunk-size", type=int, default=SCENE_CHUNK_SIZE, help="Restaurants per streamed chunk.")
+    parser.add_argument("--repeats", type=int, default=3, help="In-memory runs per method (best is kept).")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = generate_corpus(BASE_ROWS, seed=0)
+    labels = pd.DataFrame({
+        "topic_id": range(args.topics),
+        "consumer_type": [f"Type {i}" for i in range(args.topics)],
+        "consumer_scene": [f"Scene {i}" if i % 7 else None for i in range(args.topics)],
+    })
+    # Leave the last topic unlabelled so the left-join path is exercised
+    labels = labels.iloc[:-1]
+    labels_path = os.path.join(tempfile.mkdtemp(), "labels.csv")
+    labels.to_csv(labels_path, index=False)
+    topics_df = load_scene_labels(labels_path)
+
+    print(f"{'rows':>9} {'method':<8} {'in-memory s':>12} {'rows/s':>12} {'end-to-end s':>13} {'peak RSS MB':>12} {'growth MB':>10}")
+    try:
+        for n_rows in (parse_size(s) for s in args.rows.split(",")):
+            df = base.iloc[np.arange(n_rows) % BASE_ROWS].reset_index(drop=True)
+            df["dominant_topic"] = rng.integers(0, args.topics, n_rows)
+            write_artifact(df, SOURCE)
+
+            # The table is bound as a default: df is deleted below, before the end-to-end runs
+            merged, merge_s = best_of(lambda table=df: attach_scene_labels(table, topics_df), args.repeats)
+            lookup = SceneLookup(topics_df)
+            looked_up, lookup_s = best_of(lambda table=df: lookup.apply(table), args.repeats)
+            if not merged.equals(looked_up):
+                raise AssertionError(f"Lookup and merge disagree at {n_rows} rows.")
+            del df, merged, looked_up
+
+            for mode, seconds in (("merge", merge_s), ("stream", lookup_s)):
+                total_s, peak_mb, growth_mb = end_to_end(mode, labels_path, args.chunk_size)
+                print(f"{n_rows:>9} {mode:<8} {seconds:>12.3f} {n_rows / seconds:>12.0f} {total_s:>13.2f} {peak_mb:>12.0f} {growth_mb:>10.0f}",
+                      flush=True)
+    finally:
+        for name in (SOURCE, TARGET):
+            if os.path.exists(artifact_path(name)):
+                os.remove(artifact_path(name))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# benchmarks/bench_search.py
+
+"""
+Benchmark for the full-text search index.
+
+- Index build time and on-disk size (against the raw description text) on a
+  synthetic corpus, tiled from 100k generated descriptions for larger sizes
+- Query latency (median and 95th percentile) for one word, two words (both
+  required) and a quoted two-word phrase, with query words drawn from random
+  descriptions so every query has hits; top 10 by BM25, and every match
+  ranked (what the map pages filter on)
+- Baseline: a case-insensitive substring scan of every description
+  (Series.str.contains), unranked, on a few of the same single words
+- Incremental update: 1% new restaurants added to the built index, against
+  the full build
+
+Usage:
+    python -m benchmarks.bench_search --docs 100k,1M --queries 300
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from app.doc_topics import restaurant_ids
+from app.nlp_topic_modeling import STOPWORDS_PATH, load_stopwords
+from app.search_index import update_search_index
+from benchmarks.suite import parse_size
+from benchmarks.synthetic import generate_corpus
+
+BASELINE_QUERIES = 5
+
+# Larger corpora repeat this many generated descriptions (generating 1M at once needs several GB)
+BASE_DOCS = 100_000
+
+def directory_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / 2**20
+
+def sample_queries(descriptions, index, n, rng):
+    # Words picked from random descriptions; empty queries (all stopwords) are skipped
+    queries = {"one word": [], "two words": [], "phrase": []}
+    while min(len(q) for q in queries.values()) < n:
+        words = descriptions[rng.integers(len(descriptions))].rstrip(".").split()
+        if len(words) < 2:
+            continue
+        first, second = rng.choice(len(words), 2, replace=False)
+        start = rng.integers(len(words) - 1)
+        candidates = {
+            "one word": words[first],
+            "two words": f"{words[first]} {words[second]}",
+            "phrase": f'"{words[start]} {words[start + 1]}"',
+        }
+        for kind, query in candidates.items():
+            terms, phrases = index.parse(query)
+            if len(queries[kind]) < n and (terms if kind != "phrase" else phrases):
+                queries[kind].append(query)
+    return queries
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the BM25 search index.")
+    parser.add_argument("--docs", default="100k,1M", help="Comma-separated corpus sizes, e.g. 100k,1M.")
+    parser.add_argument("--queries", type=int, default=300, help="Queries timed per query type.")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes for tokenization (-1 = all cores).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    args = parser.parse_args()
+
+    stopwords_custom = load_stopwords(STOPWORDS_PATH)
+    sizes = [parse_size(s) for s in args.docs.split(",")]
+    base = generate_corpus(min(max(sizes), BASE_DOCS), seed=args.seed)
+    for n_docs in sizes:
+        rng = np.random.default_rng(args.seed)
+        df = base.iloc[np.arange(n_docs) % len(base)].reset_index(drop=True)
+        df["restaurant"] = [f"Restaurant {i:07d}" for i in range(n_docs)]
+        ids = restaurant_ids(df)
+        directory = tempfile.mkdtemp(prefix="bench_search_")
+        try:
+            start = time.perf_counter()
+            index = update_search_index(df["description"], ids, stopwords_custom, directory=directory, n_jobs=args.jobs)
+            build_s = time.perf_counter() - start
+            text_mb = df["description"].str.len().sum() / 2**20
+            print(f"\n{n_docs} descriptions: built in {build_s:.1f}s ({n_docs / build_s:.0f} docs/s), "
+                  f"index {directory_mb(directory):.0f} MB vs. {text_mb:.0f} MB of text, {len(index.vocabulary)} terms")
+
+            print(f"{'query':<10} {'top-10 median ms':>17} {'p95 ms':>8} {'all median ms':>14} {'p95 ms':>8} {'mean hits':>10}")
+            queries = sample_queries(df["description"].to_numpy(), index, args.queries, rng)
+            for kind, batch in queries.items():
+                timings = {10: [], None: []}
+                hits = []
+                for query in batch:
+                    for k, times in timings.items():
+                        start = time.perf_counter()
+                        found, _ = index.search(query, k=k)
+                        times.append((time.perf_counter() - start) * 1000)
+                    hits.append(len(found))
+                top, every = timings[10], timings[None]
+                print(f"{kind:<10} {np.median(top):>17.2f} {np.percentile(top, 95):>8.2f} "
+                      f"{np.median(every):>14.2f} {np.percentile(every, 95):>8.2f} {np.mean(hits):>10.0f}")
+
+            timings = []
+            for query in queries["one word"][:BASELINE_QUERIES]:
+                start = time.perf_counter()
+                df["description"].str.contains(query, case=False, regex=False).sum()
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{'scan':<10} {'':>17} {'':>8} {np.median(timings):>14.2f} {np.max(timings):>8.2f}  (substring, unranked)")
+
+            extra = generate_corpus(max(1, n_docs // 100), seed=args.seed + 1)
+            extra["restaurant"] = [f"New restaurant {i:07d}" for i in range(len(extra))]
+            grown = pd.concat([df, extra], ignore_index=True)
+            start = time.perf_counter()
+            update_search_index(grown["description"], restaurant_ids(grown), stopwords_custom, directory=directory,
+                                n_jobs=args.jobs)
+            update_s = time.perf_counter() - start
+            print(f"Incremental update with {len(extra)} new descriptions: {update_s:.2f}s "
+                  f"({update_s / build_s:.1%} of the full build)")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/bench_similarity.py
+
+"""
+Benchmark for the "More like this" similarity index.
+
+- TF-IDF rows come from the fused vectorizer on a synthetic corpus; topic
+  mixtures are random Dirichlet draws peaked on the corpus' cuisine (no LDA fit)
+- Build time of the exact index (batched products over every row) and of the
+  approximate one (SVD-embedding candidates reranked exactly), with the
+  approximate index's recall@k against the exact one; exits with status 1
+  if recall falls below --min-recall at any size
+- Query latency: a precomputed lookup (SimilarityIndex.similar) against a
+  brute-force query (one row times the whole matrix, then top-k)
+
+Usage:
+    python -m benchmarks.bench_similarity --docs 10k,50k --min-recall 0.9
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+from app.doc_topics import restaurant_ids
+from app.nltk_resources import ensure_nltk_data
+from app.nlp_topic_modeling import NUM_TOPICS, STOPWORDS_PATH, load_stopwords, vectorize_descriptions
+from app.similarity_index import SIMILAR_K, build_similarity_index, candidate_count, combined_vectors
+from benchmarks.suite import parse_size
+from benchmarks.synthetic import generate_corpus
+
+QUERIES = 200
+
+# Lowest acceptable recall@k of the approximate index
+MIN_RECALL = 0.9
+
+def synthetic_topics(df, n_topics, rng):
+    # Restaurants of a cuisine lean on the same topic, as LDA mixtures tend to
+    home = df["tag"].astype("category").cat.codes.to_numpy() % n_topics
+    alpha = np.full((len(df), n_topics), 0.2)
+    alpha[np.arange(len(df)), home] = 2.0
+    return rng.gamma(alpha) / rng.gamma(alpha).sum(axis=1, keepdims=True)
+
+def brute_force(Z, row, k):
+    scores = (Z[row] @ Z.T).toarray().ravel()
+    scores[row] = -np.inf
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the similarity index against brute-force search.")
+    parser.add_argument("--docs", default="10k,50k", help="Comma-separated corpus sizes, e.g. 10k,50k.")
+    parser.add_argument("--candidates", type=int, default=None,
+                        help="Candidates reranked per restaurant in approximate mode (default: scaled with the corpus).")
+    parser.add_argument("--k", type=int, default=SIMILAR_K, help="Neighbours per restaurant.")
+    parser.add_argument("--min-recall", type=float, default=MIN_RECALL, help="Fail if the approximate recall@k is lower.")
+    parser.add_argument("--jobs", type=int, default=-1, help="Worker processes for vectorizing (-1 = all cores).")
+    args = parser.parse_args()
+
+    try:
+        ensure_nltk_data("punkt_tab")
+    except LookupError as e:
+        sys.exit(str(e))
+    stopwords_custom = load_stopwords(STOPWORDS_PATH)
+    rng = np.random.default_rng(0)
+
+    print(f"{'docs':>8} {'candidates':>11} {'exact build s':>14} {'approx build s':>15} {'recall@k':>9} {'lookup ms':>10} {'brute ms':>9}")
+    low_recall = []
+    for n_docs in (parse_size(s) for s in args.docs.split(",")):
+        df = generate_corpus(n_docs, seed=0)
+        _, X = vectorize_descriptions(df["description"], stopwords_custom, n_jobs=args.jobs)
+        doc_topic = synthetic_topics(df, NUM_TOPICS, rng)
+        ids = restaurant_ids(df)
+        n_candidates = args.candidates or candidate_count(n_docs)
+
+        directory = tempfile.mkdtemp()
+        try:
+            start = time.perf_counter()
+            exact = build_similarity_index(X, doc_topic, ids, k=args.k, approximate=False, directory=f"{directory}/exact")
+            exact_s = time.perf_counter() - start
+            start = time.perf_counter()
+            approx = build_similarity_index(X, doc_topic, ids, k=args.k, approximate=True, n_candidates=n_candidates,
+                                            directory=f"{directory}/approx")
+            approx_s = time.perf_counter() - start
+            recall = np.mean([
+                len(np.intersect1d(a, b)) / args.k for a, b in zip(np.asarray(approx.neighbors), np.asarray(exact.neighbors))
+            ])
+
+            queries = rng.integers(0, n_docs, QUERIES)
+            start = time.perf_counter()
+            for row in queries:
+                exact.similar(ids[row])
+            lookup_ms = (time.perf_counter() - start) / QUERIES * 1e3
+
+            Z = combined_vectors(X, doc_topic)
+            start = time.perf_counter()
+            for row in queries:
+                brute_force(Z, row, args.k)
+            brute_ms = (time.perf_counter() - start) / QUERIES * 1e3
+        finally:
+            shutil.rmtree(directory)
+        print(f"{n_docs:>8} {n_candidates:>11} {exact_s:>14.2f} {approx_s:>15.2f} {recall:>9.3f} {lookup_ms:>10.3f} {brute_ms:>9.2f}",
+              flush=True)
+        if recall < args.min_recall:
+            low_recall.append(f"{n_docs} docs: recall@{args.k} {recall:.3f}")
+
+    if low_recall:
+        sys.exit(f"Approximate recall below {args.min_recall}: " + "; ".join(low_recall))
+
+if __name__ == "__main__":
+    main()
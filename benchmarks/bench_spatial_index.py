@@ -0,0 +1,73 @@
+# benchmarks/bench_spatial_index.py
+
+"""
+Benchmark for the map pages' spatial index.
+
+- Builds a large table by resampling the michelin_full coordinates with jitter,
+  copied into several synthetic cities
+- Times the index build once, then random viewport and k-nearest queries
+- Compares against brute-force masks and full haversine scans
+- Checks both approaches return the same rows
+
+Usage:
+    python -m benchmarks.bench_spatial_index --rows 100000 --queries 200
+"""
+
+import argparse
+import time
+import numpy as np
+from app.artifacts import read_artifact
+from app.spatial_index import SpatialIndex, bbox_around, haversine_km
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark grid spatial queries against brute-force scans.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows in the resampled table.")
+    parser.add_argument("--queries", type=int, default=200, help="Random queries of each kind to time.")
+    parser.add_argument("--cities", type=int, default=10, help="Synthetic cities the rows are spread over.")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per nearest query.")
+    parser.add_argument("--radius-km", type=float, default=1.0, help="Half-size of the viewport boxes.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = read_artifact("michelin_full", columns=["lat", "lon"]).dropna()
+    picks = rng.integers(0, len(base), args.rows)
+    city = rng.integers(0, args.cities, args.rows)
+    city_lat, city_lon = rng.uniform(-20, 20, args.cities), rng.uniform(-60, 60, args.cities)
+    lat = base["lat"].to_numpy()[picks] + city_lat[city] + rng.normal(0, 0.01, args.rows)
+    lon = base["lon"].to_numpy()[picks] + city_lon[city] + rng.normal(0, 0.01, args.rows)
+
+    start = time.perf_counter()
+    index = SpatialIndex(lat, lon)
+    build_s = time.perf_counter() - start
+
+    points = rng.integers(0, args.rows, args.queries)
+    bbox_times, brute_bbox_times, knn_times, brute_knn_times = [], [], [], []
+    for p in points:
+        south, west, north, east = bbox_around(lat[p], lon[p], args.radius_km)
+
+        start = time.perf_counter()
+        rows = index.bbox(south, west, north, east)
+        bbox_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        expected = np.flatnonzero((lat >= south) & (lat <= north) & (lon >= west) & (lon <= east))
+        brute_bbox_times.append(time.perf_counter() - start)
+        if not np.array_equal(rows, expected):
+            raise AssertionError(f"Index and brute-force boxes disagree around row {p}.")
+
+        start = time.perf_counter()
+        _, distances = index.nearest(lat[p], lon[p], k=args.k)
+        knn_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        expected = np.sort(haversine_km(lat[p], lon[p], lat, lon))[:args.k]
+        brute_knn_times.append(time.perf_counter() - start)
+        if not np.allclose(distances, expected):
+            raise AssertionError(f"Index and brute-force nearest neighbours disagree for row {p}.")
+
+    print(f"Rows: {args.rows}  cities: {args.cities}  grid: {index.n_lat_cells}x{index.n_lon_cells}  index build: {build_s * 1000:.1f} ms")
+    print(f"Viewport query:   index median {np.median(bbox_times) * 1000:.3f} ms, brute force {np.median(brute_bbox_times) * 1000:.3f} ms")
+    print(f"Nearest {args.k} query: index median {np.median(knn_times) * 1000:.3f} ms, brute force {np.median(brute_knn_times) * 1000:.3f} ms")
+
+if __name__ == "__main__":
+    main()
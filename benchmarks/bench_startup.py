@@ -0,0 +1,65 @@
+# benchmarks/bench_startup.py
+
+"""
+Benchmark for cold-start and per-rerun overhead.
+
+- Cold start: fresh interpreters importing the CLI entry point and each task
+  module, and `python -m app.main run --dry-run` end to end
+- Per rerun: the Text Processing page run once, then rerun, with Streamlit's
+  AppTest (the second figure is what every widget interaction pays)
+- Each cold-start figure is the best of --repeats runs
+
+Usage:
+    python -m benchmarks.bench_startup --repeats 3
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+IMPORTS = [
+    "app.main",
+    "app.visualization",
+    "app.apply_scene_tags",
+    "app.pipeline",
+    "app.nlp_topic_modeling",
+]
+PAGE = os.path.join("pages", "1_Data_Process.py")
+
+def cold(command, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def page_reruns(path):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.abspath(path), default_timeout=120)
+    start = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    at.run()
+    return first, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start and Streamlit rerun overhead.")
+    parser.add_argument("--repeats", type=int, default=3, help="Cold-start runs per command (best is kept).")
+    args = parser.parse_args()
+
+    baseline = cold([sys.executable, "-c", "pass"], args.repeats)
+    print(f"{'interpreter only':<40} {baseline:>7.2f} s")
+    for module in IMPORTS:
+        print(f"{'import ' + module:<40} {cold([sys.executable, '-c', f'import {module}'], args.repeats):>7.2f} s")
+    print(f"{'app.main run --dry-run':<40} {cold([sys.executable, '-m', 'app.main', 'run', '--dry-run'], args.repeats):>7.2f} s")
+
+    first, rerun = page_reruns(PAGE)
+    print(f"{PAGE + ' first run':<40} {first:>7.2f} s")
+    print(f"{PAGE + ' rerun':<40} {rerun:>7.3f} s")
+
+if __name__ == "__main__":
+    main()
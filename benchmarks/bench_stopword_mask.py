@@ -0,0 +1,85 @@
+# benchmarks/bench_stopword_mask.py
+
+"""
+Benchmark for stopword edits on masked surface counts.
+
+- One-time cost: counting the surface tokens of a synthetic corpus (tiled
+  from 100k generated descriptions for larger sizes) and the size of the
+  cached matrix
+- Per stopword edit (the current list, ten frequent words added, ten
+  stopwords removed): TF-IDF from the masked counts against a full fused
+  re-tokenize-and-vectorize, with a bit-for-bit equality check of the
+  vocabulary, IDF and matrix
+
+Usage:
+    python -m benchmarks.bench_stopword_mask --docs 100k,1M
+"""
+
+import argparse
+import pickle
+import time
+import numpy as np
+from app.nlp_topic_modeling import STOPWORDS_PATH, load_stopwords, vectorize_descriptions
+from app.stemmer_custom import StemCache
+from app.stopword_mask import SurfaceCounts
+from benchmarks.suite import parse_size
+from benchmarks.synthetic import generate_corpus
+
+# Larger corpora repeat this many generated descriptions
+BASE_DOCS = 100_000
+
+EDITED_WORDS = 10
+
+def same_tfidf(a, b):
+    (vectorizer_a, X_a), (vectorizer_b, X_b) = a, b
+    return (
+        vectorizer_a.vocabulary == vectorizer_b.vocabulary
+        and np.array_equal(vectorizer_a.idf_, vectorizer_b.idf_)
+        and np.array_equal(X_a.indptr, X_b.indptr)
+        and np.array_equal(X_a.indices, X_b.indices)
+        and np.array_equal(X_a.data, X_b.data)
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stopword edits on masked surface counts against full reruns.")
+    parser.add_argument("--docs", default="100k,1M", help="Comma-separated corpus sizes, e.g. 100k,1M.")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes for tokenization (-1 = all cores).")
+    args = parser.parse_args()
+
+    stopwords_custom = load_stopwords(STOPWORDS_PATH)
+    sizes = [parse_size(s) for s in args.docs.split(",")]
+    base = generate_corpus(min(max(sizes), BASE_DOCS), seed=0)["description"].to_numpy()
+    for n_docs in sizes:
+        descriptions = base[np.arange(n_docs) % len(base)]
+        # A cold cache of its own, so the synthetic tokens never reach the persisted one
+        start = time.perf_counter()
+        counts = SurfaceCounts.build(descriptions, n_jobs=args.jobs, stem_cache=StemCache())
+        count_s = time.perf_counter() - start
+        size_mb = len(pickle.dumps(counts, protocol=pickle.HIGHEST_PROTOCOL)) / 2**20
+        print(f"\n{n_docs} descriptions: surface counts in {count_s:.1f}s, {len(counts.surfaces)} surface tokens, "
+              f"{counts.counts.nnz} nonzeros, {size_mb:.0f} MB cached")
+
+        # Frequent non-stopwords to add, and stopwords that occur in the corpus to remove
+        frequency = np.bincount(counts.counts.indices, minlength=len(counts.surfaces))
+        ranked = counts.surfaces[np.argsort(-frequency)]
+        added = [token for token in ranked if token not in stopwords_custom][:EDITED_WORDS]
+        removed = [token for token in ranked if token in stopwords_custom][:EDITED_WORDS]
+        edits = {
+            "current list": stopwords_custom,
+            f"+{len(added)} words": stopwords_custom | set(added),
+            f"-{len(removed)} words": stopwords_custom - set(removed),
+        }
+
+        print(f"{'stopwords':<14} {'full rerun s':>13} {'masked s':>9} {'speedup':>8} {'identical':>10}")
+        for name, stopwords in edits.items():
+            start = time.perf_counter()
+            full = vectorize_descriptions(descriptions, stopwords, n_jobs=args.jobs)
+            full_s = time.perf_counter() - start
+            start = time.perf_counter()
+            masked = counts.vectorize(stopwords)
+            masked_s = time.perf_counter() - start
+            print(f"{name:<14} {full_s:>13.2f} {masked_s:>9.2f} {full_s / masked_s:>7.0f}x {str(same_tfidf(full, masked)):>10}",
+                  flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# benchmarks/bench_tokenize.py
+
+"""
+Benchmark for the parallel tokenization engine.
+
+- Builds a corpus by repeating the descriptions in the michelin_full artifact
+- Tokenizes it with 1..N worker processes
+- Checks every parallel run against the serial output
+- Prints wall time, throughput and speedup per worker count
+
+Usage:
+    python -m benchmarks.bench_tokenize --docs 20000 --chunk-size 256
+"""
+
+import argparse
+import os
+import time
+from app.artifacts import read_artifact
+from app.nlp_topic_modeling import STOPWORDS_PATH, load_stopwords, tokenize_descriptions
+
+def worker_counts(max_workers):
+    counts = [1]
+    while counts[-1] * 2 <= max_workers:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_workers:
+        counts.append(max_workers)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tokenization scaling across cores.")
+    parser.add_argument("--docs", type=int, default=20000, help="Number of descriptions in the synthetic corpus.")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Descriptions per worker task.")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1, help="Largest worker count to try.")
+    args = parser.parse_args()
+
+    base = read_artifact("michelin_full", columns=["description"])["description"].tolist()
+    corpus = (base * (args.docs // len(base) + 1))[:args.docs]
+    stopwords_custom = load_stopwords(STOPWORDS_PATH)
+
+    print(f"Corpus: {len(corpus)} descriptions, chunk size {args.chunk_size}")
+    print(f"{'workers':>8} {'seconds':>10} {'docs/s':>10} {'speedup':>8}")
+
+    reference = None
+    serial_time = None
+    for n_jobs in worker_counts(args.max_workers):
+        start = time.perf_counter()
+        tokens = tokenize_descriptions(corpus, stopwords_custom, n_jobs=n_jobs, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - start
+
+        if reference is None:
+            reference, serial_time = tokens, elapsed
+        elif tokens != reference:
+            raise AssertionError(f"Output with {n_jobs} workers differs from the serial run.")
+
+        print(f"{n_jobs:>8} {elapsed:>10.2f} {len(corpus) / elapsed:>10.0f} {serial_time / elapsed:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# benchmarks/bench_topic_report.py
+
+"""
+Benchmark for topic summarisation over large vocabularies.
+
+- Per-topic: the old loop, a full argsort of each topic row, with
+  get_feature_names_out() rebuilt for every top word
+- Vectorized: top_terms, one partial selection (np.argpartition) over all topics
+- Runs on a random topic-word matrix and a fitted vectorizer of each vocabulary size
+  (no LDA fit needed) and checks that both return the same words
+
+Usage:
+    python -m benchmarks.bench_topic_report --vocab 10k,100k,1M --topics 8,50
+"""
+
+import argparse
+import time
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.nlp_topic_modeling import TOP_WORDS
+from app.topic_report import top_terms
+from benchmarks.suite import parse_size
+
+class _Model:
+    # Stands in for a fitted LatentDirichletAllocation: only components_ is read
+    def __init__(self, components):
+        self.components_ = components
+
+def per_topic(model, vectorizer, k):
+    return [[vectorizer.get_feature_names_out()[i] for i in topic.argsort()[:-k - 1:-1]] for topic in model.components_]
+
+def vectorized(model, vectorizer, k):
+    return top_terms(model, vectorizer.get_feature_names_out(), k)
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-topic argsort against partial top-k selection.")
+    parser.add_argument("--vocab", default="10k,100k,1M", help="Comma-separated vocabulary sizes, e.g. 10k,100k.")
+    parser.add_argument("--topics", default="8,50", help="Comma-separated topic counts.")
+    parser.add_argument("--top-words", type=int, default=TOP_WORDS, help="Words per topic.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'vocab':>9} {'topics':>7} {'per-topic s':>12} {'top_terms s':>12} {'speedup':>8}")
+    for n_terms in (parse_size(s) for s in args.vocab.split(",")):
+        vectorizer = TfidfVectorizer().fit([" ".join(f"w{i}" for i in range(n_terms))])
+        for n_topics in (int(s) for s in args.topics.split(",")):
+            model = _Model(rng.gamma(0.1, size=(n_topics, n_terms)) + 0.01)
+            old, old_s = timed(per_topic, model, vectorizer, args.top_words)
+            new, new_s = timed(vectorized, model, vectorizer, args.top_words)
+            if [[str(w) for w in words] for words in old] != new:
+                raise AssertionError(f"Top words differ ({n_terms} terms, {n_topics} topics).")
+            print(f"{n_terms:>9} {n_topics:>7} {old_s:>12.3f} {new_s:>12.4f} {old_s / new_s:>7.0f}x", flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+# benchmarks/suite.py
+
+"""
+Benchmark suite covering every pipeline stage on synthetic corpora.
+
+- Generates a corpus per size with benchmarks.synthetic (no network access)
+- Times each stage separately: tokenize (custom_tokenizer), stem (stem_tokens),
+  tfidf, fused_tfidf (vectorize_descriptions), lda_fit, lda_assign, topic_report,
+  merge_scene_labels, scene_lookup (SceneLookup), filter_index, filter_query,
+  spatial_index and spatial_query; fast stages are repeated and the best run kept
+- Records peak traced memory per stage in a second, tracemalloc-instrumented run
+- Writes machine-readable JSON and compares it against a stored baseline;
+  exits with status 1 if any stage regressed beyond the tolerance
+
+Usage:
+    python -m benchmarks.suite --sizes 1k,100k
+    python -m benchmarks.suite --sizes 1k,100k,1M --no-memory
+    python -m benchmarks.suite --sizes 1k --save-baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import time
+import tracemalloc
+import nltk
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import LatentDirichletAllocation
+from app.apply_scene_tags import SceneLookup, attach_scene_labels
+from app.filter_index import FilterIndex
+from app.nltk_resources import ensure_nltk_data
+from app.nlp_topic_modeling import (
+    NUM_TOPICS, STOPWORDS_PATH, TOP_WORDS, load_stopwords, tokenize_descriptions, vectorize_descriptions,
+    vectorize_tokens,
+)
+from app.spatial_index import SpatialIndex
+from app.stemmer_custom import StemCache, stem_cache, stem_tokens
+from app.topic_report import TopicTally, build_topic_report
+from benchmarks.synthetic import generate_corpus, load_profile
+
+# Paths
+RESULTS_DIR = os.path.join("benchmarks", "results")
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+
+# Defaults
+DEFAULT_SIZES = "1k,100k"
+LDA_MAX_DOCS = 100_000
+FILTER_QUERIES = 200
+SPATIAL_QUERIES = 200
+TOLERANCE = 0.25
+MIN_SECONDS = 0.25
+
+# Fast stages are repeated until they have run this long (or MAX_REPEATS times); the minimum is kept
+REPEAT_SECONDS = 1.0
+MAX_REPEATS = 5
+
+def parse_size(text):
+    """Parse "1k", "100k" or "1M" into a row count."""
+    match = re.fullmatch(r"(\d+)([kKmM]?)", text.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"Invalid size: {text}")
+    return int(match.group(1)) * {"": 1, "k": 1_000, "m": 1_000_000}[match.group(2).lower()]
+
+def _words(text, stopwords_custom):
+    # custom_tokenizer up to (not including) stemming
+    text = re.sub(r"[^a-zA-Z\s]", "", text.lower())
+    return [t for t in nltk.word_tokenize(text) if t not in stopwords_custom and len(t) > 2]
+
+def stage_tokenize(ctx):
+    stem_cache.clear()
+    ctx["tokens"] = tokenize_descriptions(ctx["df"]["description"], ctx["stopwords"])
+
+def stage_stem(ctx):
+    cache = StemCache()
+    for words in ctx["words"]:
+        stem_tokens(words, cache=cache)
+
+def stage_tfidf(ctx):
+    ctx["vectorizer"], ctx["X"] = vectorize_tokens(ctx["tokens"])
+
+def stage_fused_tfidf(ctx):
+    stem_cache.clear()
+    vectorize_descriptions(ctx["df"]["description"], ctx["stopwords"])
+
+def stage_lda_fit(ctx):
+    lda = LatentDirichletAllocation(n_components=NUM_TOPICS, random_state=42)
+    ctx["lda"] = lda.fit(ctx["X"][:ctx["lda_docs"]])
+
+def stage_lda_assign(ctx):
+    ctx["df"]["dominant_topic"] = np.argmax(ctx["lda"].transform(ctx["X"]), axis=1)
+
+def stage_topic_report(ctx):
+    tally = TopicTally(NUM_TOPICS)
+    tally.update(ctx["lda"].transform(ctx["X"][:ctx["lda_docs"]]))
+    build_topic_report(ctx["lda"], ctx["vectorizer"].get_feature_names_out(), tally, ctx["df"]["restaurant"], TOP_WORDS)
+
+def stage_merge_scene_labels(ctx):
+    attach_scene_labels(ctx["df"], ctx["labels"])
+
+def stage_scene_lookup(ctx):
+    SceneLookup(ctx["labels"]).apply(ctx["df"])
+
+def stage_filter_index(ctx):
+    ctx["filter_index"] = FilterIndex(ctx["df"])
+
+def stage_filter_query(ctx):
+    for stars, prices, cuisines in ctx["filter_queries"]:
+        ctx["filter_index"].query(stars, prices, cuisines)
+
+def stage_spatial_index(ctx):
+    ctx["spatial_index"] = SpatialIndex(ctx["df"]["lat"].to_numpy(), ctx["df"]["lon"].to_numpy())
+
+def stage_spatial_query(ctx):
+    index = ctx["spatial_index"]
+    for lat, lon in ctx["spatial_queries"]:
+        index.bbox(lat - 0.01, lon - 0.01, lat + 0.01, lon + 0.01)
+        index.nearest(lat, lon, k=10)
+
+# Run in order; later stages use earlier outputs
+STAGES = [
+    ("tokenize", stage_tokenize),
+    ("stem", stage_stem),
+    ("tfidf", stage_tfidf),
+    ("fused_tfidf", stage_fused_tfidf),
+    ("lda_fit", stage_lda_fit),
+    ("lda_assign", stage_lda_assign),
+    ("topic_report", stage_topic_report),
+    ("merge_scene_labels", stage_merge_scene_labels),
+    ("scene_lookup", stage_scene_lookup),
+    ("filter_index", stage_filter_index),
+    ("filter_query", stage_filter_query),
+    ("spatial_index", stage_spatial_index),
+    ("spatial_query", stage_spatial_query),
+]
+
+def build_context(n_rows, seed, profile, lda_max_docs):
+    rng = np.random.default_rng(seed)
+    df = generate_corpus(n_rows, seed=seed, profile=profile)
+    stopwords_custom = load_stopwords(STOPWORDS_PATH)
+    cuisines = profile["cuisines"]
+    return {
+        "df": df,
+        "stopwords": stopwords_custom,
+        "words": [_words(text, stopwords_custom) for text in df["description"]],
+        "lda_docs": min(n_rows, lda_max_docs),
+        "labels": pd.DataFrame({
+            "topic_id": range(NUM_TOPICS),
+            "consumer_type": [f"Type {i}" for i in range(NUM_TOPICS)],
+            "consumer_scene": [f"Scene {i}" for i in range(NUM_TOPICS)],
+        }),
+        "filter_queries": [
+            (
+                [int(s) for s in rng.choice([1, 2, 3], rng.integers(1, 4), replace=False)],
+                [int(p) for p in rng.choice([1, 2, 3, 4], rng.integers(1, 5), replace=False)],
+                list(rng.choice(cuisines, rng.integers(1, 4), replace=False)) if rng.random() < 0.7 else None,
+            )
+            for _ in range(FILTER_QUERIES)
+        ],
+        "spatial_queries": list(zip(df["lat"].to_numpy()[:SPATIAL_QUERIES], df["lon"].to_numpy()[:SPATIAL_QUERIES])),
+    }
+
+def run_size(n_rows, seed, profile, lda_max_docs, measure_memory):
+    """
+    Run every stage on one corpus size.
+
+    Returns:
+        list: One result dict per stage.
+    """
+    print(f"\nGenerating {n_rows} restaurants...", flush=True)
+    ctx = build_context(n_rows, seed, profile, lda_max_docs)
+    results = []
+    for name, stage in STAGES:
+        timings = []
+        while not timings or (sum(timings) < REPEAT_SECONDS and len(timings) < MAX_REPEATS):
+            start = time.perf_counter()
+            stage(ctx)
+            timings.append(time.perf_counter() - start)
+        seconds = min(timings)
+
+        peak_mb = None
+        if measure_memory:
+            tracemalloc.start()
+            stage(ctx)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+
+        result = {"size": n_rows, "stage": name, "seconds": seconds, "runs": len(timings), "peak_mb": peak_mb}
+        if name == "lda_fit":
+            result["docs"] = ctx["lda_docs"]
+        results.append(result)
+        memory = f"{peak_mb:>9.1f} MB" if peak_mb is not None else ""
+        print(f"  {name:<20} {seconds:>9.3f} s {memory}", flush=True)
+    return results
+
+def compare(results, baseline, tolerance, min_seconds):
+    """
+    Compare results with a baseline run.
+
+    Returns:
+        list: Messages for stages that regressed.
+    """
+    previous = {(r["size"], r["stage"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\nComparison with baseline from {baseline.get('created', '?')}:")
+    for r in results:
+        old = previous.get((r["size"], r["stage"]))
+        if old is None:
+            continue
+        ratio = r["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        line = f"  {r['size']:>8} {r['stage']:<20} {old['seconds']:>9.3f} s -> {r['seconds']:>9.3f} s ({ratio:>5.2f}x)"
+        slower = ratio > 1 + tolerance and r["seconds"] >= min_seconds
+        if r.get("peak_mb") and old.get("peak_mb"):
+            mem_ratio = r["peak_mb"] / old["peak_mb"]
+            line += f"  memory {mem_ratio:>5.2f}x"
+            if mem_ratio > 1 + tolerance and r["peak_mb"] >= 1:
+                regressions.append(f"{r['stage']} at {r['size']} rows: peak memory {mem_ratio:.2f}x baseline")
+        if slower:
+            regressions.append(f"{r['stage']} at {r['size']} rows: {ratio:.2f}x slower than baseline")
+        print(line + ("  REGRESSION" if slower else ""))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic corpora.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated corpus sizes, e.g. 1k,100k,1M.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic corpora.")
+    parser.add_argument("--lda-max-docs", type=int, default=LDA_MAX_DOCS, help="Documents LDA is fitted on per size.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass (halves run time).")
+    parser.add_argument("--output", default=None, help="Results file (default: benchmarks/results/suite-<time>.json).")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline results to compare against.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Allowed slowdown before flagging a regression.")
+    parser.add_argument("--min-seconds", type=float, default=MIN_SECONDS, help="Stages faster than this are not flagged.")
+    args = parser.parse_args()
+
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+    try:
+        ensure_nltk_data("punkt_tab")
+    except LookupError as e:
+        sys.exit(str(e))
+
+    profile = load_profile()
+    results = []
+    for n_rows in sizes:
+        results.extend(run_size(n_rows, args.seed, profile, args.lda_max_docs, not args.no_memory))
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"suite-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_seconds)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+
+    if regressions:
+        print("\nRegressions:\n  " + "\n  ".join(regressions))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# benchmarks/synthetic.py
+
+"""
+Synthetic restaurant corpus modelled on michelin_full.
+
+- Same columns and dtypes as the michelin_full artifact
+- Description lengths, star, price and tag distributions sampled from the real rows
+- Description words drawn from a Zipf distribution whose head is the real
+  vocabulary (by frequency) and whose tail is generated pseudo-words, so the
+  vocabulary grows with the corpus (Heaps' law) as a real one would
+- Coordinates and addresses resampled from real rows with jitter
+- Deterministic for a given seed; needs no network access
+"""
+
+from collections import Counter
+import numpy as np
+import pandas as pd
+from app.artifacts import read_artifact
+
+# Vocabulary size grows as (rows / real rows) ** HEAPS_BETA
+HEAPS_BETA = 0.5
+ZIPF_EXPONENT = 1.0
+ZIPF_OFFSET = 2.7
+
+# Rows generated per batch (bounds memory for the word-index arrays)
+GENERATE_BATCH = 20_000
+
+CONSONANTS = list("bcdfghjklmnprstvwz")
+VOWELS = list("aeiou")
+
+def load_profile(source="michelin_full"):
+    """
+    Empirical distributions of the real corpus.
+
+    Args:
+        source (str): Artifact to profile.
+
+    Returns:
+        dict: Words by frequency, description lengths, tag counts, cuisine
+        frequencies, stars, prices, coordinates and addresses.
+    """
+    df = read_artifact(source)
+    words = Counter(w for text in df["description"].dropna() for w in text.split())
+    tags = df["tag"].fillna("").str.split(",").apply(lambda ts: [t.strip() for t in ts if t.strip()])
+    cuisines = Counter(c for ts in tags for c in ts)
+    return {
+        "n_rows": len(df),
+        "words": [w for w, _ in words.most_common()],
+        "lengths": df["description"].dropna().str.split().str.len().to_numpy(),
+        "tag_counts": tags.str.len().to_numpy(),
+        "cuisines": list(cuisines),
+        "cuisine_weights": np.array(list(cuisines.values()), dtype=float),
+        "stars": df["star"].to_numpy(),
+        "prices": df["price($)"].to_numpy(),
+        "lat": df["lat"].to_numpy(),
+        "lon": df["lon"].to_numpy(),
+        "addresses": df["address"].to_numpy(),
+    }
+
+def _pseudo_words(n, rng, exclude=()):
+    # Pronounceable, alphabetic, at least 4 letters: survive the tokenizer's filters
+    syllables = np.array([c + v for c in CONSONANTS for v in VOWELS], dtype=object)
+    words = dict.fromkeys(exclude)
+    target = len(words) + n
+    while len(words) < target:
+        batch = target - len(words)
+        picks = syllables[rng.integers(0, len(syllables), (batch, 4))]
+        lengths = rng.integers(2, 5, batch)
+        words.update(dict.fromkeys("".join(row[:k]) for row, k in zip(picks, lengths)))
+    return list(words)[len(exclude):target]
+
+def build_vocabulary(n_rows, profile, rng):
+    """
+    Vocabulary and Zipf word probabilities for a corpus of n_rows.
+
+    Returns:
+        tuple: (np.ndarray of words, np.ndarray of probabilities)
+    """
+    real = profile["words"]
+    size = max(len(real), int(len(real) * (n_rows / profile["n_rows"]) ** HEAPS_BETA))
+    vocabulary = np.array(real + _pseudo_words(size - len(real), rng, exclude=real), dtype=object)
+    weights = 1 / (np.arange(size) + ZIPF_OFFSET) ** ZIPF_EXPONENT
+    return vocabulary, weights / weights.sum()
+
+def generate_corpus(n_rows, seed=0, profile=None):
+    """
+    Generate a synthetic restaurant table.
+
+    Args:
+        n_rows (int): Number of restaurants.
+        seed (int): Random seed.
+        profile (dict): Output of load_profile(); loaded if omitted.
+
+    Returns:
+        pd.DataFrame: Table with the michelin_full columns.
+    """
+    profile = profile or load_profile()
+    rng = np.random.default_rng(seed)
+    vocabulary, probabilities = build_vocabulary(n_rows, profile, rng)
+
+    cuisines = np.array(profile["cuisines"], dtype=object)
+    log_p = np.log(profile["cuisine_weights"] / profile["cuisine_weights"].sum())
+
+    descriptions, tags = [], []
+    for start in range(0, n_rows, GENERATE_BATCH):
+        batch = min(GENERATE_BATCH, n_rows - start)
+        lengths = rng.choice(profile["lengths"], batch)
+        words = vocabulary[rng.choice(len(vocabulary), lengths.sum(), p=probabilities)]
+        for chunk in np.split(words, np.cumsum(lengths)[:-1]):
+            descriptions.append(" ".join(chunk) + ".")
+
+        # Weighted sampling of k distinct cuisines per row (Gumbel top-k)
+        counts = np.maximum(rng.choice(profile["tag_counts"], batch), 1)
+        ranked = np.argsort(-(log_p + rng.gumbel(size=(batch, len(log_p)))), axis=1)
+        tags.extend(", ".join(cuisines[row[:k]]) for row, k in zip(ranked, counts))
+
+    source = rng.integers(0, profile["n_rows"], n_rows)
+    return pd.DataFrame({
+        "restaurant": [f"Restaurant {i:07d}" for i in range(n_rows)],
+        "lat": profile["lat"][source] + rng.normal(0, 0.01, n_rows),
+        "lon": profile["lon"][source] + rng.normal(0, 0.01, n_rows),
+        "address": profile["addresses"][source],
+        "price($)": rng.choice(profile["prices"], n_rows),
+        "tag": tags,
+        "star": rng.choice(profile["stars"], n_rows),
+        "description": descriptions,
+    })
@@ -1,16 +1,19 @@
 # pages/1_Data_Process.py
 
 import streamlit as st
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import PorterStemmer
 import pandas as pd
 import numpy as np
 from collections import Counter
 from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
+from app import data_access
+from app.nltk_resources import ensure_nltk_data
+from app.stemmer_custom import get_stem_cache
 
-# Download required NLTK resources
-nltk.download("stopwords")
+# NLTK's English stopwords: checked (and installed if missing) once per process, not on every rerun
+def load_english_stopwords():
+    ensure_nltk_data("stopwords")
+    from nltk.corpus import stopwords
+    return set(stopwords.words("english"))
 
 # Set up Streamlit page configuration
 st.set_page_config(page_title="🔤 Text Processing Journey", page_icon="📝", layout="wide")
@@ -21,8 +24,8 @@ Maguy Le Coze and Eric Ripert’s icon has been entertaining the city’s movers
 """
 
 tokens = text.split()
-stop_words = set(stopwords.words("english"))
-stemmer = PorterStemmer()
+stop_words = data_access.load_derived("english_stopwords", load_english_stopwords, [])
+stemmer = get_stem_cache()  # Porter stems, warmed from the pipeline's persisted cache
 
 # Session state to track processing step
 if "step" not in st.session_state:
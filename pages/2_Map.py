@@ -1,48 +1,155 @@
 # pages/2_Map.py
 
+import os
 import streamlit as st
-import pandas as pd
+import numpy as np
 import pydeck as pdk
-import os
+from app import data_access, instrumentation
+from app.artifacts import read_artifact
+from app.city_partitions import CITY_MANIFEST_PATH, cities_exist, cities_in_view, read_manifest, view_bounds
+from app.doc_topics import IdIndex, restaurant_ids
+from app.filter_index import FilterIndex
+from app.map_aggregation import HexBinIndex, choose_detail
+from app.map_payload import COORD_DECIMALS, CompactDeck, layer_data
+from app.search_index import SEARCH_DIR, SearchIndex, description_lookup, search_index_exists, search_rows
+from app.visualization import build_spatial_index, fit_view
 
 # ---------------------- Setup ----------------------
 st.set_page_config(page_title="Michelin Restaurants Map", layout="wide")
-st.title("📍 Michelin-Starred Restaurants in NYC")
 
 # ---------------------- Load Data ----------------------
-DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "michelin_full.xlsx")
-df = pd.read_excel(DATA_PATH)
+# Only the columns the map, tooltip and table use (skips the long descriptions)
+MAP_COLUMNS = ["restaurant", "lat", "lon", "address", "price($)", "tag", "star"]
+
+# Fields sent to the browser: what the layers and tooltips read
+POINT_FIELDS = ["restaurant", "lat", "lon", "price_display", "star", "tag"]
+HEXBIN_FIELDS = ["polygon", "count", "star_mix", "fill"]
+
+ALL_CITIES = "All cities"
 
 # Price formatting for display
 def format_price(p):
     return {1: "Under $25", 2: "$25–49", 3: "$50–99", 4: "$100+"}.get(p, "N/A")
 
-df["price_display"] = df["price($)"].apply(format_price)
+def build_map_data(cities=None):
+    if cities is None:
+        df = read_artifact("michelin_full", columns=MAP_COLUMNS)
+    else:
+        df = data_access.load_partitions(cities, columns=MAP_COLUMNS)
+    df["price_display"] = df["price($)"].apply(format_price)
+    return df
+
+# Loaded once per process and shared across sessions; reloaded when the data file changes.
+# With city partitions, only the cities in view are loaded (each one cached separately)
+def load_map_data(cities=None):
+    scope = "" if cities is None else ":" + ",".join(cities)
+    sources = data_access.artifact_sources("michelin_full") if cities is None else data_access.partition_sources(cities)
+    return data_access.load_derived("map_restaurants", lambda: build_map_data(cities), sources, scope=scope), scope, sources
+
+city_manifest = None
+if cities_exist():
+    city_manifest = data_access.load_derived("city_manifest", read_manifest, [CITY_MANIFEST_PATH])
+else:
+    # Grid index over lat/lon for viewport and nearest-restaurant queries
+    df, scope, sources = load_map_data()
+    spatial_index = data_access.load_derived("map_spatial_index", lambda: build_spatial_index(df), sources, scope=scope)
+    south, west, north, east = (float(v) for v in spatial_index.bounds())
+
+# Full-text index over the descriptions (built by the pipeline's search stage)
+search = None
+if search_index_exists():
+    search_sources = [os.path.join(SEARCH_DIR, "manifest.json")]
+    search = data_access.load_derived("search_index", SearchIndex, search_sources)
+
+# ---------------------- Sidebar: Area ----------------------
+with st.sidebar:
+    filters = st.container()
+    st.header("📍 Area")
+    place = "NYC"
+    if city_manifest is not None:
+        city_slugs = {entry["name"]: slug for slug, entry in city_manifest["cities"].items()}
+        place = st.selectbox("City 🏙️", options=[ALL_CITIES] + sorted(city_slugs))
+        chosen = list(city_slugs.values()) if place == ALL_CITIES else [city_slugs[place]]
+        bounds = view_bounds(city_manifest, chosen)
+        if bounds is None:
+            st.warning(f"No restaurants in {place} have coordinates yet.")
+            st.stop()
+        south, west, north, east = bounds
+    lat_range = st.slider("Latitude", min_value=south, max_value=north, value=(south, north), step=0.001, format="%.3f")
+    lon_range = st.slider("Longitude", min_value=west, max_value=east, value=(west, east), step=0.001, format="%.3f")
+    area = st.container()
+
+st.title(f"📍 Michelin-Starred Restaurants in {place}")
+
+if city_manifest is not None:
+    # Only the partitions of cities overlapping the selected area are read
+    in_view = cities_in_view(city_manifest, lat_range[0], lon_range[0], lat_range[1], lon_range[1], chosen)
+    df, scope, sources = load_map_data(in_view)
+    spatial_index = data_access.load_derived("map_spatial_index", lambda: build_spatial_index(df), sources, scope=scope)
 
 # Extract unique cuisines
-all_cuisines = sorted({c.strip() for tags in df["tag"].dropna() for c in tags.split(",")})
+all_cuisines = data_access.load_derived(
+    "map_cuisines", lambda: sorted({c.strip() for tags in df["tag"].dropna() for c in tags.split(",")}), sources, scope=scope
+)
 all_cuisines.insert(0, "ALL")
 
+# Star/price/cuisine bitsets, rebuilt only when the data changes
+filter_index = data_access.load_derived("map_filter_index", lambda: FilterIndex(df), sources, scope=scope)
+
+# Per-zoom hexbin assignments for the aggregated (level-of-detail) view
+hexbin_index = data_access.load_derived("map_hexbin_index", lambda: HexBinIndex(df), sources, scope=scope)
+
+if search is not None:
+    map_ids = data_access.load_derived("map_ids", lambda: restaurant_ids(df), sources, scope=scope)
+    map_id_index = data_access.load_derived("map_id_index", lambda: IdIndex(map_ids), sources, scope=scope)
+
 # ---------------------- Sidebar Filters ----------------------
-with st.sidebar:
+with filters:
     st.header("🎛️ Filters")
+    query = st.text_input("Search descriptions 🔎", placeholder='tasting menu, "sea urchin"', disabled=search is None,
+                          help='Words must all appear; "quoted phrases" must appear as written.')
     stars = st.multiselect("Michelin Stars ⭐", options=[1, 2, 3], default=[1, 2, 3])
     prices = st.multiselect("Price Range 💵", options=[1, 2, 3, 4], default=[3, 4])
     cuisines = st.multiselect("Cuisine 🍽️", options=all_cuisines, default=["ALL"])
     tile_style = st.selectbox("Map Tile Style 🗺️", options=[
         "Carto Light", "Carto Dark"
     ], index=0)
+    detail_mode = st.radio("Detail 🔬", options=["Auto", "Points", "Hexbins"], index=0, horizontal=True,
+                           help="Auto draws hexbins when there are too many points to show individually.")
+
+with area:
+    focus = st.selectbox("Near a restaurant 🔎", options=["—"] + sorted(df["restaurant"].dropna().unique()))
+    k_nearest = st.slider("Nearest restaurants", min_value=1, max_value=30, value=10, disabled=focus == "—")
 
 # ---------------------- Filtering Logic ----------------------
-filtered_df = df.copy()
-if stars:
-    filtered_df = filtered_df[filtered_df["star"].isin(stars)]
-if prices:
-    filtered_df = filtered_df[filtered_df["price($)"].isin(prices)]
-if "ALL" not in cuisines:
-    filtered_df = filtered_df[filtered_df["tag"].apply(
-        lambda t: any(c in [x.strip() for x in str(t).split(",")] for c in cuisines)
-    )]
+with instrumentation.span("map.filter", rows=len(df)) as filter_span:
+    rows = filter_index.query(
+        stars=stars,
+        prices=prices,
+        cuisines=None if "ALL" in cuisines else cuisines,
+    )
+
+    # Restrict to the viewport, then optionally to the restaurants nearest the chosen one
+    mask = np.zeros(len(df), dtype=bool)
+    mask[rows] = True
+    if search is not None and query.strip():
+        search_hits, _ = search_rows(search, query, map_id_index)
+        search_mask = np.zeros(len(df), dtype=bool)
+        search_mask[search_hits] = True
+        mask = mask & search_mask
+        rows = np.flatnonzero(mask)
+    if lat_range != (south, north) or lon_range != (west, east):
+        rows = spatial_index.bbox(lat_range[0], lon_range[0], lat_range[1], lon_range[1], mask=mask)
+        mask[:] = False
+        mask[rows] = True
+
+    if focus != "—":
+        anchor = np.flatnonzero(df["restaurant"].to_numpy() == focus)[0]
+        rows, distances = spatial_index.nearest(df["lat"].iat[anchor], df["lon"].iat[anchor], k=k_nearest, mask=mask)
+        filtered_df = df.iloc[rows].assign(distance_km=distances.round(2))
+    else:
+        filtered_df = df.iloc[rows]
+    filter_span.matches = len(filtered_df)
 
 # ---------------------- Map Tile Style ----------------------
 tile_urls = {
@@ -55,43 +162,80 @@ tile_url = tile_urls[tile_style]
 st.markdown(f"### 📌 {len(filtered_df)} restaurants match your selection.")
 
 if not filtered_df.empty:
-    # Scatter layer for restaurants
-    scatter_layer = pdk.Layer(
-        "ScatterplotLayer",
-        data=filtered_df,
-        get_position='[lon, lat]',
-        get_fill_color='[255, 0, 0, 160]',
-        get_radius=100,
-        pickable=True,
-    )
-
-    # Viewport centered on restaurant locations
-    view_state = pdk.ViewState(
-        latitude=filtered_df['lat'].mean(),
-        longitude=filtered_df['lon'].mean(),
-        zoom=11,
-        pitch=0,
-    )
-
-    # Hover tooltip
-    tooltip = {
-        "html": "<b>{restaurant}</b><br/>💰 {price_display}<br/>⭐ {star} Stars<br/><i>{tag}</i>",
-        "style": {"backgroundColor": "white", "color": "black", "fontSize": "12px"}
-    }
-
-    # Render the map with Carto base style
-    deck = pdk.Deck(
-        layers=[scatter_layer],
-        initial_view_state=view_state,
-        tooltip=tooltip,
-        map_provider='carto',
-        map_style=tile_url
-    )
-    st.pydeck_chart(deck)
+    # Viewport fitted to the restaurants shown
+    view = fit_view(filtered_df["lat"], filtered_df["lon"])
+    view_state = pdk.ViewState(**view, pitch=0)
+
+    with instrumentation.span("map.deck", rows=len(filtered_df)) as deck_span:
+        if choose_detail(len(filtered_df), view["zoom"], detail_mode.lower()) == "hexbins":
+            # One hexagon per bin, shaded by restaurant count
+            bins_df = hexbin_index.aggregate(rows, view["zoom"], decimals=COORD_DECIMALS)
+            shade = np.log1p(bins_df["count"]) / np.log1p(bins_df["count"].max())
+            bins_df["fill"] = [[255, 0, 0, int(a)] for a in 60 + 170 * shade]
+            layer = pdk.Layer(
+                "PolygonLayer",
+                data=layer_data(bins_df, HEXBIN_FIELDS),
+                get_polygon="polygon",
+                get_fill_color="fill",
+                get_line_color=[255, 255, 255],
+                line_width_min_pixels=1,
+                pickable=True,
+            )
+            tooltip = {
+                "html": "<b>{count} restaurants</b><br/>{star_mix}",
+                "style": {"backgroundColor": "white", "color": "black", "fontSize": "12px"}
+            }
+        else:
+            # Scatter layer for restaurants
+            layer = pdk.Layer(
+                "ScatterplotLayer",
+                data=layer_data(filtered_df, POINT_FIELDS),
+                get_position='[lon, lat]',
+                get_fill_color='[255, 0, 0, 160]',
+                get_radius=100,
+                pickable=True,
+            )
+            tooltip = {
+                "html": "<b>{restaurant}</b><br/>💰 {price_display}<br/>⭐ {star} Stars<br/><i>{tag}</i>",
+                "style": {"backgroundColor": "white", "color": "black", "fontSize": "12px"}
+            }
+
+        # Render the map with Carto base style
+        deck = CompactDeck(
+            layers=[layer],
+            initial_view_state=view_state,
+            tooltip=tooltip,
+            map_provider='carto',
+            map_style=tile_url
+        )
+        deck_span.layer = layer.type
+
+    with instrumentation.span("map.render", rows=len(filtered_df)):
+        st.pydeck_chart(deck)
 
 else:
     st.warning("😕 No restaurants match your filters. Try adjusting the options.")
 
+# ---------------------- Search Results ----------------------
+if search is not None and query.strip():
+    shown = search_hits[np.isin(search_hits, rows)]
+    st.markdown("### 🔎 Best Description Matches")
+    if len(shown) == 0:
+        st.caption("No descriptions match among the restaurants shown.")
+    else:
+        cities = None if city_manifest is None else in_view
+        descriptions = data_access.load_derived("search_descriptions", lambda: description_lookup(cities=cities),
+                                                sources, scope=scope)
+        for row in shown[:5]:
+            st.markdown(f"**{df['restaurant'].iat[row]}** · {'⭐' * int(df['star'].iat[row])}")
+            st.caption(search.highlight(descriptions.get(map_ids[row], ""), query, window=40))
+
 # ---------------------- Optional Raw Data ----------------------
 with st.expander("🔍 See Filtered Raw Data"):
     st.dataframe(filtered_df)
+
+with st.expander("⏱️ Data Cache Metrics"):
+    st.dataframe(data_access.metrics())
+    if instrumentation.enabled():
+        st.caption("Stage timings (FW_INSTRUMENT)")
+        st.dataframe(instrumentation.summary())
@@ -1,21 +1,47 @@
 # pages/3_Marketing_Map.py
 
+import os
 import streamlit as st
+import numpy as np
 import pandas as pd
 import pydeck as pdk
-import os
+from app import data_access, instrumentation
+from app.artifacts import read_artifact
+from app.city_partitions import (
+    CITY_MANIFEST_PATH, MAP_TABLE, cities_exist, cities_in_view, modelled_cities, read_manifest, view_bounds,
+)
+from app.doc_topics import (
+    DOC_TOPIC_DIR, DocTopicStore, IdIndex, doc_topics_exist, restaurant_ids, select_mixture, topic_groups,
+)
+from app.map_aggregation import HexBinIndex, choose_detail
+from app.map_payload import COORD_DECIMALS, CompactDeck, layer_data
+from app.search_index import SEARCH_DIR, SearchIndex, description_lookup, search_index_exists, search_rows
+from app.similarity_index import SIMILARITY_DIR, SimilarityIndex, similarity_index_exists
+from app.topic_report import TOPIC_REPORT_PATH, join_topic_summary
+from app.visualization import build_spatial_index, fit_view
 
 # ---------------- Setup ----------------
 st.set_page_config(page_title="🍽️ Consumer Scenes Map", layout="wide")
 st.title("🎯 Scene-Based Map of Michelin Restaurants")
 
 # ---------------- Load Data ----------------
-BASE_DIR = os.path.dirname(__file__)
-DATA_PATH = os.path.join(BASE_DIR, '..', 'data')
+# Loaded once per process and shared across sessions; reloaded when a file changes
+SCENE_MAP_COLUMNS = ["restaurant", "lat", "lon", "address", "price($)", "tag", "star", "dominant_topic", "consumer_scene"]
+
+# Fields sent to the browser: what the layers and tooltips read
+POINT_FIELDS = ["restaurant", "lat", "lon", "price_display", "star", "tag", "clean_scene"]
+HEXBIN_FIELDS = ["polygon", "count", "star_mix", "dominant_scene", "color"]
 
-df = pd.read_csv(os.path.join(DATA_PATH, 'merged_michelin_data.csv'))
-topics_df = pd.read_csv(os.path.join(DATA_PATH, 'LDA_topics.csv'))
-manual_labels_df = pd.read_csv(os.path.join(DATA_PATH, 'manual_scene_labels.csv'))
+ALL_CITIES = "All cities"
+
+topics_df = data_access.load_csv('LDA_topics.csv')
+# Restaurant counts, distinctive words and exemplars from the last LDA run, next to the hand-written themes
+if os.path.exists(TOPIC_REPORT_PATH):
+    topics_df = data_access.load_derived(
+        "topic_summary", lambda: join_topic_summary(topics_df, pd.read_csv(TOPIC_REPORT_PATH)),
+        [os.path.join("data", "LDA_topics.csv"), TOPIC_REPORT_PATH]
+    )
+manual_labels_df = data_access.load_csv('manual_scene_labels.csv')
 
 # ---------------- Section 1: LDA Topics ----------------
 st.markdown("## 📚 Step 1: LDA Topics Summary")
@@ -40,15 +66,13 @@ def style_scene(row):
     color = scene_colors_hex.get(scene, "")
     return [f"background-color: {color}" if color else "" for _ in row]
 
-st.table(manual_labels_df.style.apply(style_scene, axis=1))
+# top_words only ties the labels to the model they were written for (Step 1 lists them)
+st.table(manual_labels_df.drop(columns="top_words", errors="ignore").style.apply(style_scene, axis=1))
 
 # ---------------- Section 3: Consumer Scene Map ----------------
 st.markdown("## 🗺️ Step 3: Map by Consumer Scene")
 
-# A. Scene simplification for map legend
-df["clean_scene"] = df["consumer_scene"].str.extract(r"^(.*?)\s*\(")[0].fillna(df["consumer_scene"])
-
-# B. Color mapping
+# A. Color mapping
 scene_colors_rgb = {
     "Business Fine Dining": [75, 192, 192],
     "Romantic & Intimate Dining": [255, 99, 132],
@@ -56,67 +80,246 @@ scene_colors_rgb = {
     "Social Dining with Friends": [255, 205, 86]
 }
 
-df = df[df["clean_scene"].isin(scene_colors_rgb)].copy()
-df["price_display"] = df["price($)"].apply(lambda x: "$100+" if x == 4 else "$50–99")
-df["color"] = df["clean_scene"].map(scene_colors_rgb)
+# B. Scene simplification for map legend (computed once per data version, not per rerun)
+def build_scene_map_data(cities=None):
+    if cities is None:
+        df = read_artifact("merged_michelin_data", columns=SCENE_MAP_COLUMNS)
+    else:
+        df = data_access.load_partitions(cities, MAP_TABLE, columns=SCENE_MAP_COLUMNS)
+    df["clean_scene"] = df["consumer_scene"].str.extract(r"^(.*?)\s*\(")[0].fillna(df["consumer_scene"])
+    df = df[df["clean_scene"].isin(scene_colors_rgb)].copy()
+    df["price_display"] = df["price($)"].apply(lambda x: "$100+" if x == 4 else "$50–99")
+    return df
+
+# With city partitions, only the modelled cities in view are loaded (each one cached separately)
+def load_scene_map_data(cities=None):
+    scope = "" if cities is None else ":" + ",".join(cities)
+    sources = (data_access.artifact_sources("merged_michelin_data") if cities is None
+               else data_access.partition_sources(cities, MAP_TABLE))
+    return data_access.load_derived("scene_map_data", lambda: build_scene_map_data(cities), sources, scope=scope), scope, sources
+
+# Until a city has been modelled the single-file table is shown
+city_manifest = None
+if cities_exist():
+    city_manifest = data_access.load_derived("city_manifest", read_manifest, [CITY_MANIFEST_PATH])
+    city_slugs = {city_manifest["cities"][slug]["name"]: slug for slug in modelled_cities(city_manifest)}
+    city_manifest = city_manifest if city_slugs else None
+if city_manifest is not None:
+    city = st.selectbox("🏙️ City", options=[ALL_CITIES] + sorted(city_slugs))
+    chosen = list(city_slugs.values()) if city == ALL_CITIES else [city_slugs[city]]
+    bounds = view_bounds(city_manifest, chosen)
+    if bounds is None:
+        st.warning(f"No restaurants in {city} have coordinates yet.")
+        st.stop()
+    south, west, north, east = bounds
+else:
+    df, scope, scene_sources = load_scene_map_data()
+    spatial_index = data_access.load_derived("scene_spatial_index", lambda: build_spatial_index(df), scene_sources, scope=scope)
+    south, west, north, east = (float(v) for v in spatial_index.bounds())
+
+# Full-text index over the descriptions (built by the pipeline's search stage)
+search = None
+if search_index_exists():
+    search = data_access.load_derived("search_index", SearchIndex, [os.path.join(SEARCH_DIR, "manifest.json")])
 
 # C. Filter UI
 with st.expander("🎛️ Filter by Scene", expanded=True):
     selected = st.multiselect("Select Scenes:", list(scene_colors_rgb.keys()), default=list(scene_colors_rgb.keys()))
+    query = st.text_input("🔎 Search descriptions", placeholder='tasting menu, "sea urchin"', disabled=search is None,
+                          help='Words must all appear; "quoted phrases" must appear as written.')
+    lat_col, lon_col = st.columns(2)
+    lat_range = lat_col.slider("Latitude", min_value=south, max_value=north, value=(south, north), step=0.001, format="%.3f")
+    lon_range = lon_col.slider("Longitude", min_value=west, max_value=east, value=(west, east), step=0.001, format="%.3f")
+
+if city_manifest is not None:
+    # Only the partitions of cities overlapping the selected area are read
+    in_view = cities_in_view(city_manifest, lat_range[0], lon_range[0], lat_range[1], lon_range[1], chosen)
+    df, scope, scene_sources = load_scene_map_data(in_view)
+    spatial_index = data_access.load_derived("scene_spatial_index", lambda: build_spatial_index(df), scene_sources, scope=scope)
+    if df.empty and in_view:
+        st.caption("These restaurants have no scenes yet: their topics are unlabelled, or the labels were written for "
+                   "another topic model. Label the topics (a city's own model in its scene_labels.csv), keeping "
+                   "their top_words, then run `python -m app.main run cities`.")
+
+hexbin_index = data_access.load_derived(
+    "scene_hexbin_index", lambda: HexBinIndex(df, scene_col="clean_scene"), scene_sources, scope=scope
+)
+scene_ids = data_access.load_derived("scene_map_ids", lambda: restaurant_ids(df), scene_sources, scope=scope)
+scene_id_index = data_access.load_derived("scene_map_id_index", lambda: IdIndex(scene_ids), scene_sources, scope=scope)
+
+# Each restaurant's share of every scene (its topic mixture summed by scene), aligned with df by restaurant ID
+def build_scene_shares():
+    scene_of_topic = manual_labels_df.set_index("topic_id")["consumer_scene"]
+    scene_of_topic = scene_of_topic.str.extract(r"^(.*?)\s*\(")[0].fillna(scene_of_topic)
+    groups = topic_groups(scene_of_topic, list(scene_colors_rgb))
+    return DocTopicStore().group_shares(scene_ids, groups, len(scene_colors_rgb))
+
+scene_shares = None
+if doc_topics_exist():
+    share_sources = scene_sources + [os.path.join(DOC_TOPIC_DIR, "manifest.json"), os.path.join("data", "manual_scene_labels.csv")]
+    scene_shares = data_access.load_derived("scene_shares", build_scene_shares, share_sources, scope=scope)
+
+# Mixed scenes, e.g. "at least 30% Romantic and 30% Gourmet", from the stored topic mixtures
+mix_mask = None
+with st.expander("🧪 Filter by Scene Mix"):
+    if scene_shares is None:
+        st.caption("Run the LDA pipeline to store each restaurant's topic mixture and enable these filters.")
+    else:
+        mix_mode = st.radio("Select restaurants by", ["Minimum share per scene", "Weighted mix"], horizontal=True)
+        mix_cols = st.columns(len(scene_colors_rgb))
+        if mix_mode == "Minimum share per scene":
+            min_share = [col.slider(scene, 0, 100, 0, step=5, format="%d%%", key=f"min_share_{i}") / 100
+                         for i, (col, scene) in enumerate(zip(mix_cols, scene_colors_rgb))]
+            mix_mask = select_mixture(scene_shares, min_share=min_share)
+        else:
+            weights = [col.slider(scene, 0.0, 1.0, 0.0, step=0.1, key=f"mix_weight_{i}")
+                       for i, (col, scene) in enumerate(zip(mix_cols, scene_colors_rgb))]
+            min_score = st.slider("Minimum weighted share", 0, 100, 50, step=5, format="%d%%",
+                                  help="Sum of each scene's share times its weight; weights of 1 add scenes together.") / 100
+            mix_mask = select_mixture(scene_shares, weights=weights, min_score=min_score)
 
 # D. Map style selection (light or dark)
-map_style_choice = st.radio("🗺️ Map Style", options=["Light", "Dark"], index=0, horizontal=True)
+style_col, detail_col = st.columns(2)
+map_style_choice = style_col.radio("🗺️ Map Style", options=["Light", "Dark"], index=0, horizontal=True)
+detail_mode = detail_col.radio("🔬 Detail", options=["Auto", "Points", "Hexbins"], index=0, horizontal=True,
+                               help="Auto draws hexbins, colored by their dominant scene, when there are too many points.")
 map_style_value = "light" if map_style_choice == "Light" else "dark"
 
 # E. Filter Data
-filtered_df = df[df["clean_scene"].isin(selected)]
+# Only restaurants inside the selected viewport are sent to the map
+with instrumentation.span("scene_map.filter", rows=len(df)) as filter_span:
+    scene_mask = df["clean_scene"].isin(selected).to_numpy()
+    if mix_mask is not None:
+        scene_mask = scene_mask & mix_mask
+    if search is not None and query.strip():
+        search_hits, _ = search_rows(search, query, scene_id_index)
+        search_mask = np.zeros(len(df), dtype=bool)
+        search_mask[search_hits] = True
+        scene_mask = scene_mask & search_mask
+    rows = spatial_index.bbox(lat_range[0], lon_range[0], lat_range[1], lon_range[1], mask=scene_mask)
+    filtered_df = df.iloc[rows]
+    filter_span.matches = len(filtered_df)
 st.markdown(f"Showing **{len(filtered_df)}** restaurants.")
 
 # F. Pydeck Map
 if not filtered_df.empty:
-    layer = pdk.Layer(
-        "ScatterplotLayer",
-        data=filtered_df,
-        get_position='[lon, lat]',
-        get_fill_color='color',
-        get_radius=100,
-        pickable=True
-    )
+    view = fit_view(filtered_df["lat"], filtered_df["lon"])
+    view_state = pdk.ViewState(**view)
 
-    view_state = pdk.ViewState(
-        latitude=filtered_df["lat"].mean(),
-        longitude=filtered_df["lon"].mean(),
-        zoom=11
-    )
+    with instrumentation.span("scene_map.deck", rows=len(filtered_df)):
+        if choose_detail(len(filtered_df), view["zoom"], detail_mode.lower()) == "hexbins":
+            # One hexagon per bin, colored by its most common scene
+            bins_df = hexbin_index.aggregate(rows, view["zoom"], decimals=COORD_DECIMALS)
+            bins_df["color"] = bins_df["dominant_scene"].map(scene_colors_rgb)
+            layers = [pdk.Layer(
+                "PolygonLayer",
+                data=layer_data(bins_df, HEXBIN_FIELDS),
+                get_polygon="polygon",
+                get_fill_color="color",
+                get_line_color=[255, 255, 255],
+                line_width_min_pixels=1,
+                opacity=0.7,
+                pickable=True
+            )]
+            tooltip_html = """
+                <b>{count} restaurants</b><br/>
+                ⭐ {star_mix}<br/>
+                <i>Main scene: {dominant_scene}</i>
+            """
+        else:
+            # One layer per scene: its color is sent once instead of once per restaurant
+            layers = [
+                pdk.Layer(
+                    "ScatterplotLayer",
+                    id=f"scene-{i}",
+                    data=layer_data(filtered_df[filtered_df["clean_scene"] == scene], POINT_FIELDS),
+                    get_position='[lon, lat]',
+                    get_fill_color=color,
+                    get_radius=100,
+                    pickable=True
+                )
+                for i, (scene, color) in enumerate(scene_colors_rgb.items()) if scene in selected
+            ]
+            tooltip_html = """
+                <b>{restaurant}</b><br/>
+                Price: {price_display}<br/>
+                ⭐ Stars: {star}<br/>
+                Cuisine: {tag}<br/>
+                <i>Scene: {clean_scene}</i>
+            """
 
-    tooltip = {
-        "html": """
-            <b>{restaurant}</b><br/>
-            Price: {price_display}<br/>
-            ⭐ Stars: {star}<br/>
-            Cuisine: {tag}<br/>
-            <i>Scene: {clean_scene}</i>
-        """,
-        "style": {
-            "backgroundColor": "white",
-            "color": "black",
-            "padding": "10px",
-            "fontSize": "12px"
+        tooltip = {
+            "html": tooltip_html,
+            "style": {
+                "backgroundColor": "white",
+                "color": "black",
+                "padding": "10px",
+                "fontSize": "12px"
+            }
         }
-    }
-
-    deck = pdk.Deck(
-        layers=[layer],
-        initial_view_state=view_state,
-        tooltip=tooltip,
-        map_provider='carto',
-        map_style=map_style_value
-    )
 
-    st.pydeck_chart(deck)
+        deck = CompactDeck(
+            layers=layers,
+            initial_view_state=view_state,
+            tooltip=tooltip,
+            map_provider='carto',
+            map_style=map_style_value
+        )
+
+    with instrumentation.span("scene_map.render", rows=len(filtered_df)):
+        st.pydeck_chart(deck)
 else:
     st.warning("😕 No restaurants match your filter.")
 
-# G. Optional Raw Data Table
+# G. Search matches, best BM25 score first, with the matching words highlighted
+if search is not None and query.strip():
+    st.markdown("### 🔎 Best Description Matches")
+    shown = search_hits[np.isin(search_hits, rows)]
+    if len(shown) == 0:
+        st.caption("No descriptions match among the restaurants shown.")
+    else:
+        if city_manifest is None:
+            descriptions = data_access.load_derived(
+                "search_descriptions", description_lookup, data_access.artifact_sources("michelin_full")
+            )
+        else:
+            descriptions = data_access.load_derived(
+                "search_descriptions", lambda: description_lookup(cities=in_view), data_access.partition_sources(in_view),
+                scope=scope,
+            )
+        for row in shown[:5]:
+            st.markdown(f"**{df['restaurant'].iat[row]}** · {df['clean_scene'].iat[row]}")
+            st.caption(search.highlight(descriptions.get(scene_ids[row], ""), query, window=40))
+
+# H. More Like This: precomputed nearest neighbours by description and topic mixture
+if similarity_index_exists() and not df.empty:
+    st.markdown("### 🔎 More Like This")
+    similarity_sources = [os.path.join(SIMILARITY_DIR, "manifest.json")]
+    similarity = data_access.load_derived("similarity_index", SimilarityIndex, similarity_sources)
+
+    names = sorted(df["restaurant"].unique())
+    default = names.index("Le Bernardin") if "Le Bernardin" in names else 0
+    like_col, count_col = st.columns([3, 1])
+    anchor = like_col.selectbox("Restaurants similar to", names, index=default)
+    n_similar = count_col.number_input("How many", min_value=1, max_value=int(similarity.manifest["k"]), value=5)
+
+    with instrumentation.span("scene_map.similar"):
+        anchor_id = scene_ids[np.flatnonzero(df["restaurant"].to_numpy() == anchor)[0]]
+        neighbor_ids, scores = similarity.similar(anchor_id, int(n_similar))
+        rows = scene_id_index.positions(neighbor_ids)
+        similar_df = df.iloc[rows[rows >= 0]][["restaurant", "clean_scene", "star", "tag", "price_display"]]
+        similar_df = similar_df.assign(similarity=scores[rows >= 0].round(3))
+    if similar_df.empty:
+        st.caption("No similar restaurants among the scenes shown on this map.")
+    else:
+        st.dataframe(similar_df, hide_index=True)
+
+# I. Optional Raw Data Table
 with st.expander("🧾 Show Data Table"):
     st.dataframe(filtered_df)
+
+with st.expander("⏱️ Data Cache Metrics"):
+    st.dataframe(data_access.metrics())
+    if instrumentation.enabled():
+        st.caption("Stage timings (FW_INSTRUMENT)")
+        st.dataframe(instrumentation.summary())